@@ -5,39 +5,203 @@ Akinator de coches — con aprendizaje, persistencia y galería + preguntas GUI
 - Botón "Empezar preguntas": dentro de la MISMA ventana aparece el cuestionario Sí/No
 - La predicción (resultado) también se muestra en la MISMA ventana (con imagen)
 - En paralelo: imprime catálogo completo en la terminal (nombre + imagen)
-- Modo aprendizaje opcional al inicio (agregar coche + pregunta especial si hay duplicado)
-- Persistencia en 'knowledge.json'
+- Modo aprendizaje opcional al inicio (agregar coche + preguntas especiales encadenadas si hay duplicado)
+- Atributos opcionales (año, CV, origen, tracción): preguntas de umbral que parten a la mitad
+  a los candidatos que los bits no separan
+- Persistencia en 'knowledge.json', que se recarga en caliente si otro proceso o un editor
+  lo cambia (sólo se aplica la diferencia a los índices)
 Requisitos: Python 3.8+, Pillow (pip install pillow)
 """
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from itertools import chain, islice
+from operator import itemgetter
+from types import MappingProxyType
 from pathlib import Path
+import argparse
+import atexit
+import ctypes
+import ctypes.util
+import hashlib
+import heapq
 import json
 import io
+import logging
+import logging.handlers
+import math
+import multiprocessing
+import os
+import pprint
+import queue
+import runpy
+import select
+import struct
+import threading
+import time
+import unicodedata
 
 # --- GUI ---
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
 
-# --- Carga imágenes desde URL con headers (evitar 403) ---
-try:
-    import urllib.request as urlreq
-except Exception:
-    urlreq = None
+from motor_reglas import MemoriaTrabajo, MotorReglas
+
+# --- Descarga de imágenes por HTTP(S) con conexiones persistentes (ver ImageDownloader) ---
+import http.client
+import random
+import ssl
+from urllib.parse import urljoin, urlsplit
 
 import sys
 from pathlib import Path
 
+# Bloqueo entre procesos de knowledge.json
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 # Carpeta donde está el EXE (o el .py si estás desarrollando)
 if getattr(sys, "frozen", False):
     RUN_DIR = Path(sys.executable).parent
 else:
     RUN_DIR = Path(__file__).parent
 
-DB_PATH = RUN_DIR / "knowledge.json"
+# AKINATOR_DB permite que varios kioscos (o el exe de dist/) compartan una base en un volumen común
+DB_PATH = Path(os.environ.get("AKINATOR_DB") or RUN_DIR / "knowledge.json")
+TABLE_PATH = RUN_DIR / "knowledge_tabla.py"   # tabla de decisión compilada (ver compile_decision_table)
+# Imágenes descargadas ya redimensionadas (ver load_image y --warm-images)
+IMAGE_CACHE_DIR = Path(os.environ.get("AKINATOR_IMG_CACHE") or RUN_DIR / "img_cache")
 
 MAX_IMG_SIZE = (800, 500)  # ancho, alto máximos dentro de la ventana
+THUMB_SIZE = (160, 100)    # miniatura que se muestra mientras se navega rápido
+GALLERY_SETTLE_MS = 120    # la imagen completa se carga cuando las teclas paran este tiempo
+GALLERY_FRAME_CACHE = 24   # imágenes completas de la galería que se guardan (LRU)
+THUMB_CACHE = 1024         # miniaturas en memoria (LRU), compartidas por galería y cuadrícula
+GRID_CELL = (THUMB_SIZE[0] + 16, THUMB_SIZE[1] + 34)   # celda de la cuadrícula: miniatura + nombre
+GRID_PHOTO_CACHE = 400     # PhotoImage de miniaturas vivas (las visibles nunca se desalojan)
+PLACEHOLDER_CACHE = 512    # placeholders ya dibujados por (nombre, tamaño) (LRU)
+PLACEHOLDER_FONTS = ("arial.ttf", "DejaVuSans.ttf")   # se usa la primera que exista
+
+# --------------------------
+# Trazas de rendimiento (spans)
+# --------------------------
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "start", "children")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.children: Dict[str, float] = {}   # nombre de hijo → ms acumulados
+
+    def __enter__(self):
+        self.tracer._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.start) * 1000
+        stack = self.tracer._stack()
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if parent is not None:
+            parent.children[self.name] = parent.children.get(self.name, 0.0) + ms
+        self.tracer._record(self, ms, parent, exc_type)
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+class Tracer:
+    """
+    Spans con tiempo de los caminos calientes (descarga, decodificación, redimensión,
+    PhotoImage, save_db). Apagado, span() devuelve siempre el mismo contexto vacío: sólo
+    cuesta una llamada. Encendido, cada span es una línea JSON en un archivo rotativo, y
+    los spans sin padre son "cuadros" (un render de la galería o del resultado) de los que
+    se guarda el desglose del último y los totales recientes para el p95.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.overlay = False
+        self.last: Dict[str, Tuple[float, Dict[str, float]]] = {}   # cuadro → (ms, desglose)
+        self.recent: Dict[str, deque] = {}                          # cuadro → últimos totales
+        self._local = threading.local()
+        self._log: Optional[logging.Logger] = None
+
+    def configure(self, path: Optional[Path] = None, overlay: bool = False,
+                  max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        """Enciende las trazas: a `path` (JSONL que rota al pasar max_bytes) y/o en pantalla."""
+        if path is not None:
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                           encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log = logging.getLogger("akinator.trazas")
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            self._log.handlers[:] = [handler]
+        self.overlay = overlay
+        self.enabled = self._log is not None or overlay
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, attrs)
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, sp: _Span, ms: float, parent: Optional[_Span], exc_type):
+        if parent is None:
+            self.last[sp.name] = (ms, dict(sp.children))
+            self.recent.setdefault(sp.name, deque(maxlen=200)).append(ms)
+        if self._log is not None:
+            rec = {"ts": round(time.time(), 6), "span": sp.name, "ms": round(ms, 3),
+                   "parent": parent.name if parent else None, "thread": threading.current_thread().name}
+            if sp.attrs:
+                rec.update(sp.attrs)
+            if exc_type is not None:
+                rec["error"] = exc_type.__name__
+            self._log.info(json.dumps(rec, ensure_ascii=False, default=str))
+
+    def p95(self, frame: str) -> Optional[float]:
+        totals = self.recent.get(frame)
+        if not totals:
+            return None
+        ordered = sorted(totals)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def overlay_text(self, frame: str) -> str:
+        """'⏱ 84.2 ms (descarga 70.1 · decodificar 9.8 · …) · p95 120.5 ms de 37'."""
+        if not self.overlay or frame not in self.last:
+            return ""
+        ms, parts = self.last[frame]
+        detail = " · ".join(f"{k} {v:.1f}" for k, v in sorted(parts.items(), key=lambda kv: -kv[1]))
+        return (f"⏱ {ms:.1f} ms" + (f" ({detail})" if detail else "")
+                + f" · p95 {self.p95(frame):.1f} ms de {len(self.recent[frame])}")
+
+TRACER = Tracer()
+if os.environ.get("AKINATOR_TRACE"):
+    TRACER.configure(Path(os.environ["AKINATOR_TRACE"]))
 
 # --------------------------
 # Utilidades de I/O (CLI)
@@ -65,6 +229,10 @@ def hamming(a: Tuple[int, ...], b: Tuple[int, ...]) -> int:
 def bits_to_key5(bits5: Tuple[int, int, int, int, int]) -> str:
     return "-".join(str(x) for x in bits5)
 
+def bits_to_key(bits: Tuple[int, ...]) -> str:
+    """Clave de un nodo del trie de desempate: el camino de respuestas, p. ej. '0-1-0-0-1-1'."""
+    return "-".join(str(x) for x in bits)
+
 def parse_bits_str(bits_str: str) -> Tuple[int, ...]:
     return tuple(int(x) for x in bits_str.split("-"))
 
@@ -114,17 +282,307 @@ def seed_initial_db() -> Dict:
     return {"cars": cars, "duplex_rules": duplex_rules}
 
 def load_db() -> Dict:
-    if DB_PATH.exists():
-        try:
-            return json.loads(DB_PATH.read_text(encoding="utf-8"))
-        except Exception:
-            pass
+    try:
+        db = knowledge_store().load()
+    except Exception as e:
+        print(f"[BASE] No se pudo leer {DB_PATH.name}: {e}")
+        db = None
+    if db is not None:
+        return db
     db = seed_initial_db()
-    save_db(db)
+    save_db_async(db)
     return db
 
 def save_db(db: Dict):
-    DB_PATH.write_text(json.dumps(db, ensure_ascii=False, indent=2), encoding="utf-8")
+    """Escritura síncrona (con bloqueo y mezcla); el juego usa save_db_async (KnowledgeWriter)."""
+    knowledge_store().save(db)
+
+@contextmanager
+def file_lock(lock_path: Path):
+    """Bloqueo exclusivo consultivo entre procesos (fcntl.flock, o msvcrt en Windows)."""
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK se rinde tras ~10 s; se sigue esperando
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _car_key(car: Dict) -> str:
+    return car["name"].strip().casefold()
+
+def _merge_items(base: Dict, ours: Dict, theirs: Dict, conflicts: List[str], what: str) -> Dict:
+    """
+    Mezcla a tres vías de dos diccionarios clave → valor. Gana el lado que cambió respecto
+    a `base`; si cambiaron los dos de forma distinta, se queda lo que ya estaba en disco
+    (theirs) y se anota el conflicto. Modificar gana a borrar.
+    """
+    merged = {}
+    for key in list(theirs) + [k for k in ours if k not in theirs]:
+        b, o, t = base.get(key), ours.get(key), theirs.get(key)
+        if o == t or o == b:
+            value = t
+        elif t == b:
+            value = o
+        else:
+            value = t if t is not None else o
+            conflicts.append(f"{what} {key!r}")
+        if value is not None:
+            merged[key] = value
+    return merged
+
+def merge_knowledge(base: Dict, ours: Dict, theirs: Dict) -> Tuple[Dict, List[str]]:
+    """
+    Mezcla a tres vías de la base: `base` es la versión de la que partió este proceso,
+    `ours` la suya actual y `theirs` la que hay en disco. Los coches se identifican por
+    nombre y las reglas por camino; el orden de `theirs` se conserva y lo nuevo de
+    `ours` va al final (los índices de coche de otros procesos no cambian).
+    """
+    conflicts: List[str] = []
+    by_name = lambda db: {_car_key(c): c for c in db.get("cars", [])}
+    cars = _merge_items(by_name(base), by_name(ours), by_name(theirs), conflicts, "coche")
+    rules = _merge_items(base.get("duplex_rules", {}), ours.get("duplex_rules", {}),
+                         theirs.get("duplex_rules", {}), conflicts, "regla")
+    merged = {**theirs, **{k: v for k, v in ours.items() if k not in ("cars", "duplex_rules", "version")}}
+    merged["cars"] = list(cars.values())
+    merged["duplex_rules"] = rules
+    return merged, conflicts
+
+class KnowledgeStore:
+    """
+    knowledge.json compartido entre procesos:
+    - cada escritura se prepara en un temporal (con fsync) y entra con os.replace (atómica),
+    - el bloqueo (knowledge.json.lock) sólo se toma para comprobar y reemplazar,
+    - 'version' sube en cada escritura; si el archivo cambió desde la última lectura o
+      escritura de este proceso, se mezcla a tres vías en vez de pisar lo ajeno.
+    """
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.base: Dict = {"cars": [], "duplex_rules": {}}   # de qué versión partió este proceso
+        self.version = 0
+        self.conflicts: List[str] = []
+        self._stat = None
+        self._diverged = False           # el disco tiene cambios ajenos que este proceso no cargó
+        self._mutex = threading.Lock()   # entre hilos del mismo proceso
+
+    def _disk_stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def is_current(self) -> bool:
+        """
+        True si el archivo es el que este proceso escribió o leyó por última vez y no
+        hay cambios ajenos mezclados al guardar que aún no se cargaron (ver KnowledgeWatcher).
+        """
+        return not self._diverged and self._disk_stat() == self._stat
+
+    def _read(self) -> Optional[Dict]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> Optional[Dict]:
+        with self._mutex, file_lock(self.lock_path):
+            db = self._read()
+            self._stat = self._disk_stat()
+        self._diverged = False
+        if db is not None:
+            self.base = snapshot_db(db)
+            self.version = db.get("version", 0)
+        return db
+
+    def reload(self, ours: Dict) -> Tuple[Optional[Dict], bool]:
+        """
+        Recarga en caliente: mezcla el disco con `ours` (lo que este proceso tiene en
+        memoria) y adopta el disco como nueva base. Devuelve (mezcla, True si la mezcla
+        tiene cambios propios que el disco aún no tiene), o (None, False) si no hay archivo.
+        """
+        with self._mutex:
+            with file_lock(self.lock_path):
+                theirs = self._read()
+                self._stat = self._disk_stat()
+            if theirs is None:
+                return None, False
+            merged, _ = merge_knowledge(self.base, snapshot_db(ours), theirs)
+            self.base = snapshot_db(theirs)
+            self.version = theirs.get("version", 0)
+            self._diverged = False
+        pending = merged["cars"] != theirs["cars"] or merged["duplex_rules"] != theirs.get("duplex_rules", {})
+        return merged, pending
+
+    def _write_temp(self, db: Dict) -> Path:
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(db, ensure_ascii=False, indent=2).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp
+
+    def save(self, ours: Dict) -> Dict:
+        """Escribe `ours` (mezclado con lo ajeno si hizo falta); devuelve lo que quedó en disco."""
+        with TRACER.span("save_db", cars=len(ours.get("cars", []))), self._mutex:
+            ours = snapshot_db(ours)
+            written = {**ours, "version": self.version + 1}
+            tmp = self._write_temp(written)          # fuera del bloqueo
+            try:
+                with file_lock(self.lock_path):
+                    theirs = None
+                    if self._diverged or self._disk_stat() != self._stat:
+                        try:
+                            theirs = self._read() or {"cars": [], "duplex_rules": {}}
+                        except ValueError as e:   # dañado o a medio escribir por otra herramienta
+                            print(f"[BASE] {self.path.name} ilegible ({e}); se reemplaza con la versión en memoria")
+                    if theirs is not None:
+                        written, conflicts = merge_knowledge(self.base, ours, theirs)
+                        written["version"] = max(self.version, theirs.get("version", 0)) + 1
+                        if conflicts:
+                            self.conflicts.extend(conflicts)
+                            print(f"[BASE] Conflictos al mezclar (se conserva lo del disco): {', '.join(conflicts)}")
+                        os.replace(self._write_temp(written), self.path)
+                        self._diverged = True   # lo ajeno no está en `ours`: la próxima vez también se mezcla
+                    else:
+                        os.replace(tmp, self.path)
+                        self._diverged = False
+                    self._stat = self._disk_stat()
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+            self.base = ours
+            self.version = written["version"]
+            return written
+
+_STORE: Optional[KnowledgeStore] = None
+
+def knowledge_store() -> KnowledgeStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = KnowledgeStore()
+    return _STORE
+
+def snapshot_db(db: Dict) -> Dict:
+    """
+    Copia superficial para guardar en otro hilo. Es consistente porque los coches no se
+    modifican en el sitio: un coche que cambia se reemplaza por un dict nuevo.
+    """
+    return {**db, "cars": list(db["cars"]), "duplex_rules": dict(db.get("duplex_rules", {}))}
+
+class KnowledgeWriter:
+    """
+    Escribe knowledge.json en un hilo aparte. Los cambios seguidos se juntan en una sola
+    escritura (la de la última versión): se espera `debounce` s sin cambios nuevos, pero
+    nunca más de `max_delay` s desde el primer cambio pendiente.
+    flush() es la barrera de durabilidad: vuelve cuando todo lo enviado antes está en disco.
+    """
+
+    def __init__(self, store: Optional["KnowledgeStore"] = None, debounce: float = 0.5, max_delay: float = 3.0):
+        self.store = store or knowledge_store()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.writes = 0
+        self.last_error: Optional[Exception] = None
+        self._cond = threading.Condition()
+        self._pending: Optional[Dict] = None
+        self._on_write = None
+        self._first = self._last = 0.0
+        self._submitted = 0      # versiones enviadas
+        self._written = 0        # última versión escrita (o fallida)
+        self._urgent = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="guardar-knowledge", daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot: Dict, on_write=None):
+        """Encola `snapshot` (ver snapshot_db); `on_write(escrito)` corre con lo que quedó en disco."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("KnowledgeWriter cerrado")
+            now = time.monotonic()
+            if self._pending is None:
+                self._first = now
+            self._pending = snapshot
+            self._on_write = on_write
+            self._last = now
+            self._submitted += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que se escriba todo lo enviado hasta ahora. False si venció o falló."""
+        with self._cond:
+            target = self._submitted
+            if self._written < target:
+                self._urgent = True
+                self._cond.notify_all()
+                if not self._cond.wait_for(lambda: self._written >= target, timeout):
+                    return False
+            return self.last_error is None
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        ok = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        return ok
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                while not (self._urgent or self._closed):
+                    wait = min(self._last + self.debounce, self._first + self.max_delay) - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                snapshot, on_write, version = self._pending, self._on_write, self._submitted
+                self._pending = self._on_write = None
+                self._urgent = False
+            error = None
+            try:
+                written = self.store.save(snapshot)
+                if on_write is not None:
+                    on_write(written)
+            except Exception as e:   # cualquier fallo se informa; el hilo sigue y flush() no queda colgado
+                error = e
+                print(f"[GUARDAR] No se pudo escribir {self.store.path.name}: {e}")
+            with self._cond:
+                self.writes += 1
+                self.last_error = error
+                self._written = version
+                self._cond.notify_all()
+
+_WRITER: Optional[KnowledgeWriter] = None
+
+def knowledge_writer() -> KnowledgeWriter:
+    """Escritor compartido del proceso; al salir se vacía (atexit)."""
+    global _WRITER
+    if _WRITER is None:
+        _WRITER = KnowledgeWriter()
+        atexit.register(_WRITER.close, timeout=10)   # nunca colgar la salida esperando al disco
+    return _WRITER
+
+def save_db_async(db: Dict, on_write=None):
+    knowledge_writer().submit(snapshot_db(db), on_write)
 
 # ------------------------------------
 # Núcleo del sistema experto (lógica)
@@ -137,12 +595,36 @@ Q_BASE = [
     "5) ¿Tu coche usa motor trasero?",
 ]
 
-def show_catalog_cli(cars: List[Dict]):
-    print("\n=== Catálogo de coches disponibles (también hay galería GUI) ===")
-    for i, c in enumerate(cars, 1):
-        img = f"  [imagen: {c['img']}]" if c.get("img") else ""
-        print(f"{i:2d}. {c['name']}{img}")
-    print("================================================================\n")
+CATALOG_PAGE = 40   # coches por página del catálogo en la terminal (0 = todos, sin preguntar)
+
+def show_catalog_cli(cars: List[Dict], page_size: int = CATALOG_PAGE, out=None):
+    """
+    Imprime el catálogo por páginas, cada una con una sola escritura. Con una terminal
+    interactiva pregunta antes de la siguiente; si no, muestra sólo la primera página.
+    Lo que tarda en aparecer el menú no depende del tamaño del catálogo.
+    """
+    out = out or sys.stdout
+    total = len(cars)
+    width = max(2, len(str(total)))
+    rows = enumerate(cars, 1)
+    out.write("\n=== Catálogo de coches disponibles (también hay galería GUI) ===\n")
+    shown = 0
+    while shown < total:
+        lines = []
+        for i, c in islice(rows, page_size or 1000):
+            img = f"  [imagen: {c['img']}]" if c.get("img") else ""
+            lines.append(f"{i:{width}d}. {c['name']}{img}\n")
+        shown += len(lines)
+        out.write("".join(lines))
+        out.flush()
+        if not page_size or shown >= total:
+            continue
+        if not (sys.stdin.isatty() and out.isatty()):
+            out.write(f"… y {total - shown} más (--catalog-page 0 para verlos todos)\n")
+            break
+        if input(f"-- {shown}/{total} · Enter: más, q: seguir -- ").strip().lower().startswith("q"):
+            break
+    out.write("================================================================\n\n")
 
 def find_candidates(db: Dict, bits5: Tuple[int, int, int, int, int]) -> List[Dict]:
     res = []
@@ -152,15 +634,21 @@ def find_candidates(db: Dict, bits5: Tuple[int, int, int, int, int]) -> List[Dic
             res.append(c)
     return res
 
-def tiebreak_with_rule(db: Dict, bits5: Tuple[int, int, int, int, int], candidates: List[Dict], ans6: int) -> List[Dict]:
+def tiebreak_with_rule(db: Dict, bits: Tuple[int, ...], candidates: List[Dict], ans: int) -> List[Dict]:
+    """
+    Baja un nivel en el trie de desempate: de los `candidates` (coches cuyo binario empieza
+    por `bits`) quedan los que siguen por la respuesta `ans`. Sirve para el 6º bit y los siguientes.
+    """
+    depth = len(bits)
+    path = tuple(bits) + (ans,)
     filtered = []
     for c in candidates:
         cb = parse_bits_str(c["bits"])
-        if len(cb) == 6 and cb[5] == ans6:
+        if cb[:depth + 1] == path:
             filtered.append(c)
     if not filtered:
-        # mantener los sin 6º bit si no se pudo filtrar explícitamente
-        filtered = [c for c in candidates if len(parse_bits_str(c["bits"])) == 5] or candidates
+        # mantener los que terminan en este nivel si no se pudo filtrar explícitamente
+        filtered = [c for c in candidates if len(parse_bits_str(c["bits"])) == depth] or candidates
     return filtered
 
 def suggest_nearest(db: Dict, bits5: Tuple[int, int, int, int, int], k: int = 6) -> List[Tuple[int, Dict]]:
@@ -171,66 +659,1471 @@ def suggest_nearest(db: Dict, bits5: Tuple[int, int, int, int, int], k: int = 6)
     scored.sort(key=lambda x: x[0])
     return scored[:k]
 
+# ------------------------------------
+# Base de conocimiento como reglas (motor_reglas)
+# ------------------------------------
+def build_rule_network(db: Dict) -> MotorReglas:
+    """
+    Expresa el catálogo como reglas de encadenamiento hacia adelante:
+      respuesta(q, bit) x5                 → candidato(i)
+      respuesta(q, bit) x L  (L = 6, 7...)  → rama(L, i)
+    Las respuestas de desempate son respuesta(5, bit), respuesta(6, bit), ... así que
+    los coches con el mismo camino comparten los nodos de sus respuestas a cualquier profundidad.
+    """
+    red = MotorReglas()
+    for i, c in enumerate(db["cars"]):
+        cb = parse_bits_str(c["bits"])
+        base = [("respuesta", q, b) for q, b in enumerate(cb)]
+        red.agregar_regla(f"coche:{c['name']}", base[:5], [("candidato", i)])
+        for depth in range(6, len(cb) + 1):
+            red.agregar_regla(f"desempate{depth}:{c['name']}", base[:depth], [("rama", depth, i)])
+    return red
+
+def concluded_cars(memoria: MemoriaTrabajo, cars: List[Dict], *conclusion) -> List[Dict]:
+    """Coches para los que la memoria concluyó `conclusion` + (i,) (en orden del catálogo)."""
+    idxs = sorted(lig["?i"] for lig in memoria.consultar(conclusion + ("?i",)))
+    return [cars[i] for i in idxs]
+
+def tiebreak_with_engine(memoria: MemoriaTrabajo, cars: List[Dict], candidates: List[Dict],
+                         bits: Tuple[int, ...], ans: int) -> List[Dict]:
+    """Igual que tiebreak_with_rule, pero con la respuesta de desempate como hecho del motor."""
+    depth = len(bits)
+    memoria.afirmar(("respuesta", depth, ans))
+    memoria.ejecutar()
+    filtered = concluded_cars(memoria, cars, "rama", depth + 1)
+    if not filtered:
+        # mantener los que terminan en este nivel si no se pudo filtrar explícitamente
+        filtered = [c for c in candidates if len(parse_bits_str(c["bits"])) == depth] or candidates
+    return filtered
+
+# ------------------------------------
+# Tabla de decisión compilada (knowledge_tabla.py)
+# ------------------------------------
+# Las preguntas de desempate ('duplex_rules') forman un trie: la clave es el camino de
+# respuestas ("1-1-0-0-1" pregunta el 6º bit, "1-1-0-0-1-1" el 7º, ...). Compilado, el
+# trie es un arreglo plano de nodos:
+#   NODES[n] = (pregunta o None, hijo si "No", hijo si "Sí", resultado)
+# Los nodos 0..31 son los 32 patrones de 5 bits; bajar un nivel es un acceso por índice.
+# Cada resultado ya es final:
+#   ("unico", (i,))  |  ("varios", (i, j, ...))  |  ("cercanos", ((dist, i), ...))
+TABLE_FORMAT = 2
+TABLE_NEAREST = 6
+
+def db_fingerprint(db: Dict) -> str:
+    """SHA-256 del contenido de la base (JSON canónico, sin el sello 'version')."""
+    content = {k: v for k, v in db.items() if k != "version"}
+    canon = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+def pattern_index(bits5: Tuple[int, ...]) -> int:
+    n = 0
+    for b in bits5:
+        n = (n << 1) | b
+    return n
+
+def index_pattern(n: int) -> Tuple[int, int, int, int, int]:
+    return tuple((n >> (4 - q)) & 1 for q in range(5))
+
+def _table_entry(db: Dict, bits5: Tuple[int, ...], result: List[Dict], pos: Dict[int, int]) -> Tuple:
+    if len(result) == 1:
+        return ("unico", (pos[id(result[0])],))
+    if result:
+        return ("varios", tuple(pos[id(c)] for c in result))
+    return ("cercanos", tuple((dist, pos[id(c)]) for dist, c in suggest_nearest(db, bits5, k=TABLE_NEAREST)))
+
+def _path_memory(red: MotorReglas, bits: Tuple[int, ...]) -> MemoriaTrabajo:
+    memoria = red.nueva_memoria()
+    for q, b in enumerate(bits):
+        memoria.afirmar(("respuesta", q, b))
+    memoria.ejecutar()
+    return memoria
+
+def compile_decision_table(db: Dict) -> Dict:
+    """
+    Evalúa una vez cada camino de respuestas con el motor de reglas (los 32 patrones y
+    todas las ramas del trie de desempate) y guarda el resultado final de cada nodo.
+    """
+    cars = db["cars"]
+    rules = db.get("duplex_rules", {})
+    red = build_rule_network(db)
+    pos = {id(c): i for i, c in enumerate(cars)}
+    nodes = []
+    pending = deque()
+
+    def add_node(bits: Tuple[int, ...], result: List[Dict]) -> int:
+        rule = rules.get(bits_to_key(bits))
+        nodes.append([rule["question"] if rule else None, -1, -1, _table_entry(db, bits[:5], result, pos)])
+        pending.append((len(nodes) - 1, bits, result))
+        return len(nodes) - 1
+
+    for n in range(32):
+        bits5 = index_pattern(n)
+        add_node(bits5, concluded_cars(_path_memory(red, bits5), cars, "candidato"))
+    while pending:
+        n, bits, result = pending.popleft()
+        if nodes[n][0] is None:
+            continue
+        for ans in (0, 1):
+            child = tiebreak_with_engine(_path_memory(red, bits), cars, result, bits, ans)
+            nodes[n][1 + ans] = add_node(bits + (ans,), child)
+    return {"FORMAT": TABLE_FORMAT, "SHA256": db_fingerprint(db), "NODES": tuple(map(tuple, nodes))}
+
+def write_decision_table(compiled: Dict, path: Path = TABLE_PATH):
+    lines = [
+        "# -*- coding: utf-8 -*-",
+        "# Generado por P3_akinator.py a partir de knowledge.json. No editar a mano:",
+        "# se vuelve a compilar solo cuando cambia el SHA-256 de la base.",
+        "# NODES[n] = (pregunta o None, hijo si No, hijo si Sí, resultado); 0..31 = patrones de 5 bits.",
+        "",
+    ]
+    for name in ("FORMAT", "SHA256", "NODES"):
+        lines.append(f"{name} = {pprint.pformat(compiled[name], width=100)}")
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+def load_decision_table(db: Dict) -> Dict:
+    """
+    Tabla compilada vigente para `db`: la de junto al EXE/.py o la empaquetada por
+    PyInstaller si su SHA-256 coincide; si no, se recompila y se intenta guardar.
+    """
+    fingerprint = db_fingerprint(db)
+    paths = [TABLE_PATH]
+    bundled = getattr(sys, "_MEIPASS", None)
+    if bundled:
+        paths.append(Path(bundled) / TABLE_PATH.name)
+    for path in paths:
+        if not path.exists():
+            continue
+        try:
+            compiled = runpy.run_path(str(path))
+        except Exception as e:
+            print(f"[TABLA] {path.name} ilegible: {e}")
+            continue
+        if compiled.get("FORMAT") == TABLE_FORMAT and compiled.get("SHA256") == fingerprint:
+            return compiled
+    compiled = compile_decision_table(db)
+    try:
+        write_decision_table(compiled)
+    except OSError as e:
+        print(f"[TABLA] No se pudo guardar {TABLE_PATH.name}: {e}")
+    return compiled
+
+# ------------------------------------
+# Atributos numéricos y categóricos (índices por rango)
+# ------------------------------------
+# Además de los bits, un coche puede tener atributos ("year", "hp", "origin", "drivetrain").
+# Con ellos se generan preguntas de umbral ("¿antes de 1995?") o de categoría, eligiendo
+# el corte que deja a los candidatos más cerca de la mitad: ~log2(N) preguntas.
+#   atributo: (tipo, etiqueta para el modo aprendizaje, plantilla de la pregunta)
+ATTRIBUTES = {
+    "year": ("num", "Año de lanzamiento", "¿Tu coche salió antes de {v}?"),
+    "hp": ("num", "Potencia en CV", "¿Tu coche tiene menos de {v} CV?"),
+    "origin": ("cat", "País de origen", "¿Tu coche es de {v}?"),
+    "drivetrain": ("cat", "Tracción (trasera/delantera/total)", "¿Tu coche tiene tracción {v}?"),
+}
+
+def attribute_question(attr: str, value) -> str:
+    return ATTRIBUTES[attr][2].format(v=value)
+
+def matches_attribute(car: Dict, attr: str, value, ans: int) -> bool:
+    """Sí = valor < umbral (numéricos) o valor == categoría. Sin el atributo, no se descarta."""
+    v = car.get(attr)
+    if v is None:
+        return True
+    hit = v < value if ATTRIBUTES[attr][0] == "num" else v == value
+    return hit == bool(ans)
+
+def ask_attribute_values() -> Dict:
+    """Atributos opcionales de un coche nuevo (vacío = no lo sé)."""
+    values = {}
+    for attr, (kind, label, _) in ATTRIBUTES.items():
+        while True:
+            s = ask_text(f"{label} (opcional, deja vacío): ", allow_empty=True)
+            if not s:
+                break
+            if kind == "cat":
+                values[attr] = s
+                break
+            try:
+                values[attr] = int(s)
+                break
+            except ValueError:
+                print("  → Escribe un número entero.")
+    return values
+
+_second = itemgetter(1)   # (valor, id) → id
+
+class AttributeIndex:
+    """
+    Índices de atributos sobre el catálogo (ids = posición en db["cars"]):
+      - numéricos: claves (valor, id) ordenadas; un rango sale con dos bisect.
+      - categóricos: valor → ids ordenados.
+    No se modifica una vez construido: with_car()/without_car() devuelven otro índice que
+    comparte todo salvo un bloque de cada lista que el coche toca (PersistentSortedList).
+    """
+
+    def __init__(self, cars: List[Dict]):
+        self.cars = cars
+        self.live = len(cars)   # coches vigentes (el vector de una versión puede tener huecos)
+        self.numeric: Dict[str, PersistentSortedList] = {}
+        self.categories: Dict[str, Dict[object, PersistentSortedList]] = {}
+        self.missing: Dict[str, PersistentSortedList] = {}   # ids sin el atributo
+        for attr, (kind, _, _) in ATTRIBUTES.items():
+            known = sorted((c[attr], i) for i, c in enumerate(cars) if c.get(attr) is not None)
+            self.missing[attr] = PersistentSortedList(i for i, c in enumerate(cars) if c.get(attr) is None)
+            if kind == "num":
+                self.numeric[attr] = PersistentSortedList(known)
+            else:
+                cats: Dict[object, List[int]] = {}
+                for v, i in known:
+                    cats.setdefault(v, []).append(i)
+                self.categories[attr] = {v: PersistentSortedList(ids) for v, ids in cats.items()}
+
+    def _derive(self, cars) -> "AttributeIndex":
+        new = object.__new__(AttributeIndex)
+        new.cars = cars
+        new.live = self.live
+        new.numeric = dict(self.numeric)
+        new.categories = dict(self.categories)
+        new.missing = dict(self.missing)
+        return new
+
+    def with_car(self, cars, i: int) -> "AttributeIndex":
+        """Índice para `cars`, donde cars[i] es un coche que este índice aún no tiene."""
+        new = self._derive(cars)
+        new.live += 1
+        car = cars[i]
+        for attr, (kind, _, _) in ATTRIBUTES.items():
+            v = car.get(attr)
+            if v is None:
+                new.missing[attr] = self.missing[attr].insert(i)
+            elif kind == "num":
+                new.numeric[attr] = self.numeric[attr].insert((v, i))   # a igual valor, en orden de id
+            else:
+                cats = new.categories[attr] = dict(self.categories[attr])
+                cats[v] = cats.get(v, PersistentSortedList()).insert(i)
+        return new
+
+    def without_car(self, cars, i: int, car: Dict) -> "AttributeIndex":
+        """Índice sin el coche i (`car` son los datos con los que estaba indexado)."""
+        new = self._derive(cars)
+        new.live -= 1
+        for attr, (kind, _, _) in ATTRIBUTES.items():
+            v = car.get(attr)
+            try:
+                if v is None:
+                    new.missing[attr] = self.missing[attr].remove(i)
+                elif kind == "num":
+                    new.numeric[attr] = self.numeric[attr].remove((v, i))
+                else:
+                    cats = new.categories[attr] = dict(self.categories[attr])
+                    rest = cats[v].remove(i)
+                    if rest:
+                        cats[v] = rest
+                    else:
+                        del cats[v]
+            except (KeyError, ValueError):
+                raise ValueError(f"El coche {i} no está indexado con {attr}={v!r}") from None
+        return new
+
+    def range_ids(self, attr: str, lo=None, hi=None) -> List[int]:
+        """Ids con lo <= valor < hi (None = sin límite)."""
+        keys = self.numeric[attr]
+        i, j = self._range(keys, lo, hi)
+        return self._ids(keys, i, j)
+
+    @staticmethod
+    def _ids(keys: "PersistentSortedList", i: int, j: int) -> List[int]:
+        return list(chain.from_iterable(map(_second, part) for part in keys.slices(i, j)))
+
+    @staticmethod
+    def _range(keys: "PersistentSortedList", lo, hi) -> Tuple[int, int]:
+        # (v,) va antes que cualquier (v, id): bisect por valor sobre las claves (valor, id)
+        i = keys.bisect_left((lo,)) if lo is not None else 0
+        j = keys.bisect_left((hi,)) if hi is not None else len(keys)
+        return i, j
+
+    def _answer_ids(self, attr: str, value, ans: int, limit: int):
+        """Ids que responden `ans`, o None si son `limit` o más (conviene revisar candidato a candidato)."""
+        if ATTRIBUTES[attr][0] == "num":
+            keys = self.numeric[attr]
+            i, j = self._range(keys, None, value) if ans else self._range(keys, value, None)
+            return self._ids(keys, i, j) if j - i < limit else None
+        if not ans:
+            return None
+        ids = self.categories[attr].get(value, ())
+        return ids if len(ids) < limit else None
+
+    def filter(self, candidates: List[int], attr: str, value, ans: int) -> List[int]:
+        """
+        Candidatos compatibles con la respuesta. Si el rango del índice es más chico que
+        la lista de candidatos se intersecta con él (los que no tienen el atributo se
+        conservan); si no, se revisa cada candidato.
+        """
+        ids = self._answer_ids(attr, value, ans, len(candidates))
+        if ids is not None:
+            inside = set(ids)
+            inside.update(self.missing[attr])
+            return [i for i in candidates if i in inside]
+        return [i for i in candidates if matches_attribute(self.cars[i], attr, value, ans)]
+
+    def best_question(self, candidates: List[int]) -> Optional[Tuple[str, object]]:
+        """(atributo, umbral o categoría) cuyo peor lado deja menos candidatos; None si ninguno parte."""
+        whole = len(candidates) == self.live
+        best, best_score = None, len(candidates)
+        for attr, (kind, _, _) in ATTRIBUTES.items():
+            if kind == "num":
+                if whole:
+                    keys = self.numeric[attr]
+                    n = len(keys)
+                    value_at = lambda k, keys=keys: keys[k][0]
+                else:
+                    known = sorted(self.cars[i][attr] for i in candidates if self.cars[i].get(attr) is not None)
+                    n = len(known)
+                    value_at = known.__getitem__
+                unknown = len(candidates) - n
+                if n < 2:
+                    continue
+                # cortes alrededor de la mediana; "sí" = los k valores menores que el k-ésimo
+                mid = value_at(n // 2)
+                if whole:
+                    cuts = (keys.bisect_left((mid,)), keys.bisect_right((mid, math.inf)))
+                else:
+                    cuts = (bisect_left(known, mid), bisect_right(known, mid))
+                options = [(max(k, n - k), value_at(k)) for k in cuts if 0 < k < n]
+            else:
+                if whole:
+                    counts = {v: len(ids) for v, ids in self.categories[attr].items()}
+                else:
+                    counts = Counter(self.cars[i][attr] for i in candidates if self.cars[i].get(attr) is not None)
+                known_n = sum(counts.values())
+                unknown = len(candidates) - known_n
+                options = [(max(n, known_n - n), v) for v, n in counts.items() if 0 < n < known_n]
+            for score, value in options:
+                if score + unknown < best_score:
+                    best, best_score = (attr, value), score + unknown
+        return best
+
+# ------------------------------------
+# Base en vivo: versiones inmutables (aprendizaje desde la ventana)
+# ------------------------------------
+class PersistentVector:
+    """
+    Vector inmutable por bloques: append/set copian sólo el bloque tocado y la lista de
+    bloques; el resto se comparte con la versión anterior (copia en escritura).
+    """
+    __slots__ = ("_chunks", "_len")
+    CHUNK = 256
+
+    def __init__(self, items=()):
+        items = list(items)
+        self._chunks = tuple(tuple(items[i:i + self.CHUNK]) for i in range(0, len(items), self.CHUNK))
+        self._len = len(items)
+
+    @classmethod
+    def _make(cls, chunks: Tuple, length: int) -> "PersistentVector":
+        v = object.__new__(cls)
+        v._chunks = chunks
+        v._len = length
+        return v
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        return self._chunks[i // self.CHUNK][i % self.CHUNK]
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def append(self, x) -> "PersistentVector":
+        if self._len % self.CHUNK:
+            chunks = self._chunks[:-1] + (self._chunks[-1] + (x,),)
+        else:
+            chunks = self._chunks + ((x,),)
+        return self._make(chunks, self._len + 1)
+
+    def set(self, i: int, x) -> "PersistentVector":
+        c, j = divmod(i, self.CHUNK)
+        chunk = self._chunks[c]
+        chunks = self._chunks[:c] + (chunk[:j] + (x,) + chunk[j + 1:],) + self._chunks[c + 1:]
+        return self._make(chunks, self._len)
+
+class PersistentSortedList:
+    """
+    Lista ordenada inmutable por bloques (como PersistentVector): insert/remove copian
+    sólo el bloque tocado y las tuplas de bloques; bisect y acceso por posición no arman
+    la lista completa. Un bloque que crece al doble de CHUNK se parte en dos.
+    """
+    __slots__ = ("_chunks", "_firsts", "_starts", "_len")
+    CHUNK = 256
+
+    def __init__(self, items=()):
+        """`items` ya ordenados."""
+        items = list(items)
+        self._set(tuple(tuple(items[i:i + self.CHUNK]) for i in range(0, len(items), self.CHUNK)))
+
+    def _set(self, chunks: Tuple):
+        self._chunks = chunks
+        self._firsts = tuple(c[0] for c in chunks)   # para ubicar el bloque de una clave
+        starts, n = [], 0
+        for c in chunks:
+            starts.append(n)
+            n += len(c)
+        self._starts = tuple(starts)                  # para ubicar el bloque de una posición
+        self._len = n
+
+    @classmethod
+    def _make(cls, chunks: Tuple) -> "PersistentSortedList":
+        v = object.__new__(cls)
+        v._set(chunks)
+        return v
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, pos: int):
+        if pos < 0:
+            pos += self._len
+        if not 0 <= pos < self._len:
+            raise IndexError(pos)
+        c = bisect_right(self._starts, pos) - 1
+        return self._chunks[c][pos - self._starts[c]]
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def slices(self, i: int, j: int) -> List[Tuple]:
+        """Los elementos en las posiciones [i, j), como trozos de bloque (sin recorrerlos uno a uno)."""
+        out = []
+        if i >= j:
+            return out
+        c = bisect_right(self._starts, i) - 1
+        while c < len(self._chunks) and self._starts[c] < j:
+            start = self._starts[c]
+            out.append(self._chunks[c][max(0, i - start):j - start])
+            c += 1
+        return out
+
+    def bisect_left(self, key) -> int:
+        c = bisect_left(self._firsts, key) - 1
+        return 0 if c < 0 else self._starts[c] + bisect_left(self._chunks[c], key)
+
+    def bisect_right(self, key) -> int:
+        c = bisect_right(self._firsts, key) - 1
+        return 0 if c < 0 else self._starts[c] + bisect_right(self._chunks[c], key)
+
+    def _chunk_of(self, key) -> int:
+        return max(0, bisect_right(self._firsts, key) - 1)
+
+    def insert(self, key) -> "PersistentSortedList":
+        if not self._chunks:
+            return self._make(((key,),))
+        c = self._chunk_of(key)
+        chunk = list(self._chunks[c])
+        insort(chunk, key)
+        if len(chunk) > 2 * self.CHUNK:
+            new = (tuple(chunk[:self.CHUNK]), tuple(chunk[self.CHUNK:]))
+        else:
+            new = (tuple(chunk),)
+        return self._make(self._chunks[:c] + new + self._chunks[c + 1:])
+
+    def remove(self, key) -> "PersistentSortedList":
+        """Copia sin `key`; ValueError si no está."""
+        if not self._chunks:
+            raise ValueError(f"{key!r} no está en la lista")
+        c = self._chunk_of(key)
+        chunk = self._chunks[c]
+        j = bisect_left(chunk, key)
+        if j == len(chunk) or chunk[j] != key:
+            raise ValueError(f"{key!r} no está en la lista")
+        rest = chunk[:j] + chunk[j + 1:]
+        return self._make(self._chunks[:c] + ((rest,) if rest else ()) + self._chunks[c + 1:])
+
+class KnowledgeSnapshot:
+    """
+    Una versión inmutable de la base con su trie compilado e índices. Las partidas leen la
+    versión con la que empezaron sin bloqueos; aprender o recargar crea otra versión que
+    comparte con ésta todo lo que no cambia: los bloques de los vectores, los grupos de
+    otros patrones de 5 bits y las listas de atributos que no se tocan. Sólo se recalculan
+    los subárboles de los patrones afectados (proporcional a esos grupos, no al catálogo).
+    Los ids de coche son estables: un coche borrado deja un hueco (None) en `cars`.
+    """
+    __slots__ = ("version", "cars", "rules", "nodes", "paths", "buckets", "attrs", "ids_by_name",
+                 "holes", "nearest_nodes", "extra")
+
+    @classmethod
+    def from_db(cls, db: Dict) -> "KnowledgeSnapshot":
+        snap = object.__new__(cls)
+        snap.version = 0
+        snap.cars = PersistentVector(db["cars"])
+        snap.rules = MappingProxyType(dict(db.get("duplex_rules", {})))
+        nodes = load_decision_table(db)["NODES"]
+        snap.nodes = PersistentVector(nodes)
+        paths: List[Tuple[int, ...]] = [()] * len(nodes)   # nodo → camino de respuestas
+        stack = [(n, index_pattern(n)) for n in range(32)]
+        while stack:
+            n, bits = stack.pop()
+            paths[n] = bits
+            _, no, yes, _ = nodes[n]
+            for ans, child in ((0, no), (1, yes)):
+                if child >= 0:
+                    stack.append((child, bits + (ans,)))
+        snap.paths = PersistentVector(paths)
+        buckets: List[List[int]] = [[] for _ in range(32)]   # patrón de 5 bits → ids (ordenados)
+        for i, c in enumerate(db["cars"]):
+            buckets[pattern_index(parse_bits_str(c["bits"])[:5])].append(i)
+        snap.buckets = tuple(PersistentVector(b) for b in buckets)
+        snap.attrs = AttributeIndex(snap.cars)
+        snap.ids_by_name = MappingProxyType({_car_key(c): i for i, c in enumerate(db["cars"])})
+        snap.holes = ()   # ids borrados (ordenados): los huecos de `cars`
+        snap.nearest_nodes = frozenset(n for n, node in enumerate(nodes) if node[3][0] == "cercanos")
+        snap.extra = MappingProxyType({k: v for k, v in db.items() if k not in ("cars", "duplex_rules")})
+        return snap
+
+    def as_db(self) -> Dict:
+        """La base como dict de knowledge.json (para guardarla)."""
+        return {**self.extra, "cars": [c for c in self.cars if c is not None], "duplex_rules": dict(self.rules)}
+
+    def live_ids(self, start: int = 0, step: int = 1):
+        """Ids de coches vigentes desde `start` en la dirección `step` (salta los huecos)."""
+        i = start
+        while 0 <= i < len(self.cars):
+            if self.cars[i] is not None:
+                yield i
+            i += step
+
+    def live_rank(self, i: int) -> int:
+        """Posición (desde 1) del coche i entre los vigentes, sin recorrer el catálogo."""
+        return i + 1 - bisect_right(self.holes, i)
+
+    def group(self, bits: Tuple[int, ...]) -> List[int]:
+        """Ids de los coches cuyo binario empieza por `bits` (en orden del catálogo)."""
+        bits = tuple(bits)
+        return [i for i in self.buckets[pattern_index(bits[:5])]
+                if parse_bits_str(self.cars[i]["bits"])[:len(bits)] == bits]
+
+    def needs_question(self, bits: Tuple[int, ...]) -> bool:
+        """True si ya hay coches en ese camino: el nuevo necesita una pregunta que lo separe."""
+        return bool(self.group(bits))
+
+    def learned(self, bits: Tuple[int, ...], name: str, img: Optional[str] = None, extra: Optional[Dict] = None,
+                question: Optional[str] = None, ans: Optional[int] = None) -> Tuple["KnowledgeSnapshot", int]:
+        """
+        Versión nueva con el coche al que llevan las respuestas `bits` (el camino de una hoja
+        del trie). Si ese camino ya tiene coches, `question` se vuelve la pregunta de
+        desempate del nodo y `ans` es la respuesta del coche nuevo; los que ya estaban
+        quedan del otro lado. Devuelve (versión nueva, id del coche).
+        """
+        bits = tuple(bits)
+        if not name.strip():
+            raise ValueError("El nombre no puede estar vacío")
+        if name.strip().casefold() in self.ids_by_name:
+            raise ValueError(f"Ya existe un coche llamado {name!r}")
+        snap = self._begin()
+        if self.needs_question(bits):
+            key = bits_to_key(bits)
+            if key in self.rules:
+                raise ValueError(f"El camino {key} ya tiene pregunta especial")
+            if not question or ans not in (0, 1):
+                raise ValueError("Hace falta una pregunta especial (y su respuesta) para separar este grupo")
+            snap.rules = MappingProxyType({**self.rules, key: {"question": question}})
+            bits += (ans,)
+        roots = set()
+        i = snap._add({"name": name, "bits": bits_to_key(bits), "img": img, **(extra or {})}, roots)
+        snap._finish(roots)
+        return snap, i
+
+    def with_db(self, db: Dict) -> Tuple["KnowledgeSnapshot", Dict[str, List]]:
+        """
+        Versión nueva igual a `db` (p. ej. knowledge.json recargado), aplicando sólo la
+        diferencia: coches agregados, borrados o cambiados (por nombre) y reglas cambiadas.
+        Los agregados van al final. Devuelve (versión, {"added"/"removed"/"changed": ids, "rules": claves}).
+        """
+        new_rules = db.get("duplex_rules", {})
+        changes: Dict[str, List] = {"added": [], "removed": [], "changed": [], "rules": []}
+        snap = self._begin()
+        roots = set()
+        # Lo normal es que el archivo conserve el orden: mientras los nombres coincidan en
+        # posición se compara directamente, sin armar diccionarios por nombre
+        olds = ((i, c) for i, c in enumerate(self.cars) if c is not None)
+        rest: List[Tuple[int, Dict]] = []
+        same = 0
+        for i, car in olds:
+            new = db["cars"][same] if same < len(db["cars"]) else None
+            if new is None or car["name"] != new["name"]:
+                rest.append((i, car))
+                rest.extend(olds)
+                break
+            if car != new:
+                snap._replace(i, new, roots)
+                changes["changed"].append(i)
+            same += 1
+        new_cars = {_car_key(c): c for c in db["cars"][same:]}
+        for i, car in rest:
+            new = new_cars.pop(_car_key(car), None)
+            if new is None:
+                snap._remove(i, roots)
+                changes["removed"].append(i)
+            elif new != car:
+                snap._replace(i, new, roots)
+                changes["changed"].append(i)
+        for car in new_cars.values():
+            changes["added"].append(snap._add(car, roots))
+        for key in set(self.rules) | set(new_rules):
+            if self.rules.get(key) != new_rules.get(key):
+                changes["rules"].append(key)
+                roots.add(pattern_index(parse_bits_str(key)[:5]))
+        if changes["rules"]:
+            snap.rules = MappingProxyType(dict(new_rules))
+        extra = {k: v for k, v in db.items() if k not in ("cars", "duplex_rules")}
+        if not any(changes.values()):
+            return self, changes
+        snap.extra = MappingProxyType(extra)
+        snap._finish(roots)
+        return snap, changes
+
+    # Los métodos de abajo sólo se usan mientras se arma una versión nueva (_begin → _finish)
+    def _begin(self) -> "KnowledgeSnapshot":
+        snap = object.__new__(KnowledgeSnapshot)
+        for name in self.__slots__:
+            setattr(snap, name, getattr(self, name))
+        snap.version = self.version + 1
+        snap.buckets = list(self.buckets)
+        snap.ids_by_name = dict(self.ids_by_name)
+        snap.holes = list(self.holes)
+        return snap
+
+    def _finish(self, roots: set):
+        for root in roots:
+            self._refresh(root, self.group(index_pattern(root)))
+        self._refresh_nearest()
+        self.buckets = tuple(self.buckets)
+        self.ids_by_name = MappingProxyType(self.ids_by_name)
+        self.holes = tuple(sorted(self.holes))
+
+    def _bucket_insert(self, root: int, i: int):
+        bucket = list(self.buckets[root])
+        insort(bucket, i)
+        self.buckets[root] = PersistentVector(bucket)
+
+    def _add(self, car: Dict, roots: set) -> int:
+        i = len(self.cars)
+        self.cars = self.cars.append(car)
+        self.ids_by_name[_car_key(car)] = i
+        root = pattern_index(parse_bits_str(car["bits"])[:5])
+        self.buckets[root] = self.buckets[root].append(i)   # el id nuevo es el mayor
+        self.attrs = self.attrs.with_car(self.cars, i)
+        roots.add(root)
+        return i
+
+    def _remove(self, i: int, roots: set):
+        old = self.cars[i]
+        self.cars = self.cars.set(i, None)
+        del self.ids_by_name[_car_key(old)]
+        self.holes.append(i)
+        root = pattern_index(parse_bits_str(old["bits"])[:5])
+        self.buckets[root] = PersistentVector(x for x in self.buckets[root] if x != i)
+        self.attrs = self.attrs.without_car(self.cars, i, old)
+        roots.add(root)
+
+    def _replace(self, i: int, car: Dict, roots: set):
+        old = self.cars[i]
+        self.cars = self.cars.set(i, car)
+        old_root = pattern_index(parse_bits_str(old["bits"])[:5])
+        root = pattern_index(parse_bits_str(car["bits"])[:5])
+        if root != old_root:
+            self.buckets[old_root] = PersistentVector(x for x in self.buckets[old_root] if x != i)
+            self._bucket_insert(root, i)
+        self.attrs = self.attrs.without_car(self.cars, i, old).with_car(self.cars, i)
+        roots.update((old_root, root))
+
+    def _nearest(self, bits5: Tuple[int, ...]) -> Tuple:
+        """Las TABLE_NEAREST sugerencias (dist, id) más cercanas, a partir de los 32 grupos."""
+        by_dist: Dict[int, List[int]] = {}
+        for p in range(32):
+            by_dist.setdefault(hamming(bits5, index_pattern(p)), []).append(p)
+        out = []
+        for dist in sorted(by_dist):
+            need = TABLE_NEAREST - len(out)
+            if need <= 0:
+                break
+            # a igual distancia manda el orden del catálogo (cada grupo ya está ordenado)
+            merged = heapq.merge(*(islice(self.buckets[p], need) for p in by_dist[dist]))
+            out.extend((dist, i) for i in islice(merged, need))
+        return tuple(out)
+
+    def _entry(self, bits5: Tuple[int, ...], ids: List[int]) -> Tuple:
+        if len(ids) == 1:
+            return ("unico", (ids[0],))
+        if ids:
+            return ("varios", tuple(ids))
+        return ("cercanos", self._nearest(bits5))
+
+    def _refresh(self, root: int, ids: List[int]):
+        """Recalcula el subárbol de `root` con los candidatos `ids`."""
+        nearest = set(self.nearest_nodes)
+        stack = [(root, ids)]
+        while stack:
+            n, ids = stack.pop()
+            bits = self.paths[n]
+            rule = self.rules.get(bits_to_key(bits))
+            _, no, yes, _ = self.nodes[n]
+            children = [no, yes]
+            if rule is not None:
+                where = {id(self.cars[i]): i for i in ids}
+                group = [self.cars[i] for i in ids]
+                for ans in (0, 1):
+                    if children[ans] < 0:
+                        children[ans] = len(self.nodes)
+                        self.nodes = self.nodes.append((None, -1, -1, ("varios", ())))
+                        self.paths = self.paths.append(bits + (ans,))
+                    sub = tiebreak_with_rule({"cars": self.cars}, bits, group, ans)
+                    stack.append((children[ans], [where[id(c)] for c in sub]))
+            else:
+                # la regla desapareció: su subárbol queda huérfano
+                orphans = [c for c in children if c >= 0]
+                while orphans:
+                    o = orphans.pop()
+                    nearest.discard(o)
+                    orphans.extend(c for c in self.nodes[o][1:3] if c >= 0)
+                children = [-1, -1]
+            entry = self._entry(bits[:5], ids)
+            self.nodes = self.nodes.set(n, (rule["question"] if rule else None, children[0], children[1], entry))
+            if entry[0] == "cercanos":
+                nearest.add(n)
+            else:
+                nearest.discard(n)
+        self.nearest_nodes = frozenset(nearest)
+
+    def _refresh_nearest(self):
+        """Recalcula las sugerencias de los nodos sin coincidencias (cada uno mira 32 grupos)."""
+        for n in self.nearest_nodes:
+            question, no, yes, entry = self.nodes[n]
+            near = self._nearest(self.paths[n][:5])
+            if entry != ("cercanos", near):
+                self.nodes = self.nodes.set(n, (question, no, yes, ("cercanos", near)))
+
+class LiveKnowledge:
+    """
+    Referencia a la versión vigente de la base. Leer es tomar `current` (una asignación
+    atómica en CPython) y seguir con esa versión; los escritores se turnan con un lock,
+    arman la versión nueva y reemplazan la referencia.
+    """
+
+    def __init__(self, db: Dict):
+        self.current = KnowledgeSnapshot.from_db(db)
+        self._write_lock = threading.Lock()
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """callback(versión, cambios) tras cada recarga; corre en el hilo del vigilante."""
+        self._subscribers.append(callback)
+
+    def learn(self, bits: Tuple[int, ...], name: str, **kwargs) -> Tuple[KnowledgeSnapshot, int]:
+        with self._write_lock:
+            snap, i = self.current.learned(bits, name, **kwargs)
+            self.current = snap
+        return snap, i
+
+    def reload(self, store: Optional[KnowledgeStore] = None) -> Dict[str, List]:
+        """
+        Recarga knowledge.json y aplica a la versión vigente sólo la diferencia. Lo
+        aprendido aquí que el disco aún no tiene se conserva y se vuelve a encolar.
+        """
+        store = store or knowledge_store()
+        with self._write_lock:
+            db, pending = store.reload(self.current.as_db())
+            if db is None:
+                return {}
+            snap, changes = self.current.with_db(db)
+            self.current = snap
+        if pending:
+            self.persist(snap)
+        if any(changes.values()):
+            for callback in self._subscribers:
+                callback(snap, changes)
+        return changes
+
+    def persist(self, snap: Optional[KnowledgeSnapshot] = None):
+        """Encola knowledge.json y la tabla compilada de `snap` para el escritor en segundo plano."""
+        snap = snap or self.current
+        snapshot = snap.as_db()
+        nodes = tuple(snap.nodes)
+
+        def write_table(written: Dict):
+            # si se mezcló con cambios de otro proceso, la tabla se recompila al volver a abrir
+            if written["cars"] == snapshot["cars"] and written["duplex_rules"] == snapshot["duplex_rules"]:
+                write_decision_table({"FORMAT": TABLE_FORMAT, "SHA256": db_fingerprint(written), "NODES": nodes})
+
+        knowledge_writer().submit(snapshot, on_write=write_table)
+
+# ------------------------------------
+# Búsqueda por nombre
+# ------------------------------------
+def fold_name(text: str) -> str:
+    """Sin acentos, mayúsculas ni espacios de más: '  Citroën  DS ' → 'citroen ds'."""
+    text = unicodedata.normalize("NFKD", text)
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).casefold().split())
+
+class NameIndex:
+    """
+    Índice de nombres de coche para buscar al teclear (sin acentos ni mayúsculas):
+    - prefijos: lista ordenada de (texto, id) con el nombre completo y lo que sigue desde
+      cada palabra ('romeo giulia' de 'alfa romeo giulia'); un prefijo es un rango que se
+      encuentra con bisect,
+    - n-gramas: trigrama → ids, para encontrar la consulta en medio de un nombre
+      (se cruzan los trigramas más raros y se comprueba cada candidato).
+    Agregar o quitar un coche sólo toca sus propias entradas.
+    """
+    N = 3
+
+    def __init__(self, cars=()):
+        self.folded: Dict[int, str] = {}
+        self._words: List[Tuple[str, int]] = []
+        self._grams: Dict[str, set] = {}
+        entries = []
+        for i, c in enumerate(cars):
+            if c is not None:
+                entries.extend(self._index(i, c["name"]))
+        entries.sort()
+        self._words = entries
+
+    @classmethod
+    def _entries(cls, folded: str, i: int) -> List[Tuple[str, int]]:
+        starts = [k + 1 for k, c in enumerate(folded) if c == " "]
+        return [(folded, i)] + [(folded[k:], i) for k in starts]
+
+    def _index(self, i: int, name: str) -> List[Tuple[str, int]]:
+        folded = self.folded[i] = fold_name(name)
+        for g in {folded[k:k + self.N] for k in range(len(folded) - self.N + 1)}:
+            self._grams.setdefault(g, set()).add(i)
+        return self._entries(folded, i)
+
+    def add(self, i: int, name: str):
+        if i in self.folded:
+            self.remove(i)
+        for entry in self._index(i, name):
+            insort(self._words, entry)
+
+    def remove(self, i: int):
+        folded = self.folded.pop(i, None)
+        if folded is None:
+            return
+        for entry in self._entries(folded, i):
+            pos = bisect_left(self._words, entry)
+            if pos < len(self._words) and self._words[pos] == entry:
+                del self._words[pos]
+        for g in {folded[k:k + self.N] for k in range(len(folded) - self.N + 1)}:
+            ids = self._grams.get(g)
+            if ids is not None:
+                ids.discard(i)
+                if not ids:
+                    del self._grams[g]
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[int]:
+        """Ids que coinciden: primero por prefijo (en orden alfabético), luego en medio del nombre."""
+        q = fold_name(query)
+        if not q:
+            return []
+        found: Dict[int, None] = {}   # conserva el orden de llegada y no repite
+        pos = bisect_left(self._words, (q,))
+        while pos < len(self._words) and self._words[pos][0].startswith(q):
+            found[self._words[pos][1]] = None
+            if limit is not None and len(found) >= limit:
+                return list(found)
+            pos += 1
+        if len(q) < self.N:
+            return list(found)
+        grams = [self._grams.get(q[k:k + self.N]) for k in range(len(q) - self.N + 1)]
+        if not all(grams):
+            return list(found)
+        grams.sort(key=len)
+        candidates = grams[0]
+        for other in grams[1:]:
+            if len(candidates) <= 4096:
+                break
+            candidates = candidates & other   # en C: quedan menos que comprobar uno a uno
+        middle = []
+        for i in candidates:
+            if i not in found and q in self.folded[i]:
+                middle.append(i)
+                if limit is not None and len(found) + len(middle) >= limit:
+                    break
+        middle.sort()
+        return list(found) + middle
+
+# ------------------------------------
+# Recarga en caliente de knowledge.json
+# ------------------------------------
+class _Inotify:
+    """inotify(7) por ctypes sobre la carpeta del archivo (os.replace cambia el inodo del archivo)."""
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, directory: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch")
+
+    def wait(self, timeout: float) -> List[str]:
+        """Nombres de archivo con eventos (vacío si venció el tiempo)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        names, pos = [], 0
+        while pos + self._EVENT.size <= len(data):
+            _, _, _, length = self._EVENT.unpack_from(data, pos)
+            pos += self._EVENT.size
+            names.append(os.fsdecode(data[pos:pos + length].rstrip(b"\0")))
+            pos += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class KnowledgeWatcher:
+    """
+    Vigila knowledge.json y, cuando cambia, lo recarga y aplica sólo la diferencia a
+    `live` (LiveKnowledge). Usa inotify en Linux; en otros sistemas, o si falla, compara
+    (inodo, tamaño, mtime) cada `interval` segundos.
+    """
+
+    def __init__(self, live: "LiveKnowledge", store: Optional[KnowledgeStore] = None,
+                 interval: float = 1.0, settle: float = 0.1):
+        self.live = live
+        self.store = store or knowledge_store()
+        self.interval = interval
+        self.settle = settle      # espera para juntar ráfagas de eventos de una misma escritura
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._inotify = None
+        if sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify(self.store.path.parent)
+            except (OSError, AttributeError) as e:
+                print(f"[RECARGA] inotify no disponible ({e}); se usará sondeo por mtime")
+        self._thread = threading.Thread(target=self._run, name="vigilar-knowledge", daemon=True)
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "sondeo"
+
+    def start(self) -> "KnowledgeWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        if self._inotify is not None:
+            self._inotify.close()
+
+    def _changed(self, last) -> bool:
+        if self._inotify is not None:
+            return self.store.path.name in self._inotify.wait(self.interval)
+        self._stop.wait(self.interval)
+        return self.store._disk_stat() != last
+
+    def _run(self):
+        last = self.store._disk_stat()
+        while not self._stop.is_set():
+            if not self._changed(last):
+                continue
+            self._stop.wait(self.settle)
+            if self._inotify is not None:
+                self._inotify.wait(0)   # descartar los eventos de la misma ráfaga
+            last = self.store._disk_stat()
+            if self.store.is_current():
+                continue   # lo escribió este mismo proceso (KnowledgeWriter): nada que recargar
+            try:
+                changes = self.live.reload(self.store)
+            except (OSError, ValueError) as e:
+                print(f"[RECARGA] {self.store.path.name} ilegible, se ignora: {e}")
+                continue
+            self.reloads += 1
+            if changes and any(changes.values()):
+                print(f"[RECARGA] +{len(changes['added'])} -{len(changes['removed'])} "
+                      f"~{len(changes['changed'])} coches, {len(changes['rules'])} reglas")
+
+# ------------------------------------
+# Descargas HTTP con conexiones persistentes
+# ------------------------------------
+class DownloadError(RuntimeError):
+    """La descarga falló; `retry` dice si vale la pena volver a intentar."""
+
+    def __init__(self, msg: str, retry: bool, status: Optional[int] = None):
+        super().__init__(msg)
+        self.retry = retry
+        self.status = status   # código HTTP, si hubo respuesta
+
+class ImageDownloader:
+    """
+    Descargador compartido de imágenes:
+    - un pool de conexiones keep-alive por host (http.client), así las imágenes del mismo
+      host no repiten la conexión TCP ni el handshake TLS,
+    - como mucho `per_host` descargas a la vez por host (semáforo),
+    - reintentos con espera exponencial y jitter ("full jitter") ante errores de red, 429 y 5xx;
+      una conexión reusada que el servidor ya cerró se reemplaza sin contar como intento.
+    """
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                      "AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/121.0 Safari/537.36",
+        "Accept": "image/*,*/*;q=0.8",
+    }
+    MAX_REDIRECTS = 5
+
+    def __init__(self, per_host: int = 4, pool_size: int = 4, retries: int = 4, backoff: float = 0.25,
+                 max_backoff: float = 8.0, timeout: float = 20.0):
+        self.per_host = per_host
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.connects = 0          # conexiones nuevas abiertas (para medir el reuso)
+        self.requests = 0
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._limits: Dict[Tuple[str, str, int], threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._ssl = ssl.create_default_context()
+
+    @staticmethod
+    def _host_key(url: str) -> Tuple[str, str, int]:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise DownloadError(f"URL no soportada: {url}", retry=False)
+        return parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)
+
+    def _limit(self, key) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._limits.get(key)
+            if sem is None:
+                sem = self._limits[key] = threading.BoundedSemaphore(self.per_host)
+            return sem
+
+    def _checkout(self, key) -> Tuple[http.client.HTTPConnection, bool]:
+        """Conexión del pool (True si es reusada) o una nueva."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+            self.connects += 1
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl), False
+        return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    def _checkin(self, key, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _request(self, url: str, method: str = "GET") -> Tuple[int, Dict[str, str], bytes]:
+        key = self._host_key(url)
+        parts = urlsplit(url)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        with self._limit(key):
+            while True:
+                conn, reused = self._checkout(key)
+                try:
+                    conn.request(method, target, headers=self.HEADERS)
+                    resp = conn.getresponse()
+                    body = resp.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                    conn.close()
+                    if reused:
+                        continue   # el servidor cerró la conexión ociosa: otra, sin esperar
+                    raise DownloadError(f"{type(e).__name__}: {e}", retry=True)
+                except ssl.SSLCertVerificationError as e:
+                    conn.close()
+                    raise DownloadError(f"Certificado inválido: {e}", retry=False)
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    raise DownloadError(f"{type(e).__name__}: {e}", retry=True)
+                with self._lock:
+                    self.requests += 1
+                if resp.will_close:
+                    conn.close()
+                else:
+                    self._checkin(key, conn)
+                return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+
+    def fetch(self, url: str) -> bytes:
+        """Bytes de `url` (siguiendo redirecciones); DownloadError si no se pudo."""
+        return self._send(url, "GET")
+
+    def check(self, url: str):
+        """
+        Comprueba que `url` sigue respondiendo sin bajar la imagen: HEAD (o GET si el
+        servidor no acepta HEAD), con las mismas redirecciones y reintentos; DownloadError si no.
+        """
+        try:
+            self._send(url, "HEAD")
+        except DownloadError as e:
+            if e.status not in (405, 501):
+                raise
+            self._send(url, "GET")
+
+    def _send(self, url: str, method: str) -> bytes:
+        attempt = 0
+        redirects = 0
+        while True:
+            try:
+                status, headers, body = self._request(url, method)
+                if status in (301, 302, 303, 307, 308) and headers.get("location"):
+                    redirects += 1
+                    if redirects > self.MAX_REDIRECTS:
+                        raise DownloadError(f"Demasiadas redirecciones: {url}", retry=False)
+                    url = urljoin(url, headers["location"])
+                    continue
+                if 200 <= status < 300:
+                    return body
+                raise DownloadError(f"HTTP {status}", retry=status == 429 or status >= 500, status=status)
+            except DownloadError as e:
+                attempt += 1
+                if not e.retry or attempt > self.retries:
+                    raise
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+                with TRACER.span("espera", intento=attempt, s=round(delay, 3)):
+                    time.sleep(delay)
+
+    def close(self):
+        with self._lock:
+            idle = [c for conns in self._idle.values() for c in conns]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+_DOWNLOADER: Optional[ImageDownloader] = None
+
+def image_downloader() -> ImageDownloader:
+    global _DOWNLOADER
+    if _DOWNLOADER is None:
+        _DOWNLOADER = ImageDownloader()
+        atexit.register(_DOWNLOADER.close)
+    return _DOWNLOADER
+
 # ------------------------------------
 # Carga de imagen robusta
 # ------------------------------------
+def image_cache_path(url: str, size) -> Path:
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+    return IMAGE_CACHE_DIR / f"{digest}_{size[0]}x{size[1]}.jpg"
+
+def cache_image(url: str, size, im: Image.Image):
+    """Guarda la versión redimensionada (temporal + os.replace: nunca queda un archivo a medias)."""
+    path = image_cache_path(url, size)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    im.save(tmp, "JPEG", quality=90)
+    os.replace(tmp, path)
+
+def decode_resized(data: bytes, max_size) -> Image.Image:
+    """Bytes de imagen → RGB que cabe en max_size, manteniendo proporción."""
+    im = Image.open(io.BytesIO(data))
+    # JPEG: decodificar ya reducida (1/2, 1/4, 1/8) si sobra resolución; se deja el doble
+    # del tamaño final para que LANCZOS tenga de dónde promediar
+    im.draft("RGB", (max_size[0] * 2, max_size[1] * 2))
+    im = im.convert("RGB")
+    im.thumbnail(max_size, Image.LANCZOS)
+    return im
+
+def _decode_job(data: bytes, max_size) -> Tuple[Tuple[int, int], bytes]:
+    # corre en un proceso del pool: devuelve los píxeles crudos (se pasan como bytes, sin PIL)
+    im = decode_resized(data, max_size)
+    return im.size, im.tobytes()
+
+class ImageProcessPool:
+    """
+    Decodificación y redimensión en procesos (fuera del GIL): a cada proceso le llegan los
+    bytes originales y devuelve los píxeles RGB ya reducidos, que aquí se rearman con
+    Image.frombytes (una copia de la imagen chica, no de la original). Los hilos que descargan (miniaturas, precarga) llaman a
+    render() y esperan; así el trabajo de CPU se reparte entre todos los núcleos.
+    """
+    MIN_BYTES = 32 * 1024   # con menos, enviarla cuesta más que decodificarla aquí
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = set()   # futuros sin terminar, para cancelarlos al cerrar
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: no clonar un proceso que ya tiene Tk e hilos corriendo
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def render(self, data: bytes, max_size) -> Image.Image:
+        if len(data) < self.MIN_BYTES:
+            return decode_resized(data, max_size)
+        try:
+            future = self._executor().submit(_decode_job, data, tuple(max_size))
+            self._pending.add(future)
+            future.add_done_callback(self._pending.discard)
+            size, pixels = future.result()
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None   # un proceso murió: el siguiente pedido arma otro pool
+            return decode_resized(data, max_size)
+        return Image.frombytes("RGB", size, pixels)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            for future in list(self._pending):   # cancel_futures de shutdown() es de Python 3.9
+                future.cancel()
+            pool.shutdown(wait=False)
+
+_IMAGE_POOL: Optional[ImageProcessPool] = None
+
+def use_image_processes(workers: Optional[int] = None) -> ImageProcessPool:
+    """Desde aquí render_image() decodifica en un pool de procesos (se arranca al primer uso)."""
+    global _IMAGE_POOL
+    if _IMAGE_POOL is None:
+        _IMAGE_POOL = ImageProcessPool(workers)
+        atexit.register(_IMAGE_POOL.close)
+    return _IMAGE_POOL
+
+def render_image(data: bytes, max_size, source: str) -> Image.Image:
+    """Decodifica y redimensiona manteniendo proporción (en el pool de procesos si está activo)."""
+    try:
+        with TRACER.span("decodificar", bytes=len(data), procesos=_IMAGE_POOL is not None):
+            if _IMAGE_POOL is not None:
+                return _IMAGE_POOL.render(data, max_size)
+            return decode_resized(data, max_size)
+    except Exception as e:
+        raise RuntimeError(f"Error abriendo imagen ({source}): {e}")
+
 def load_image(img_path_or_url: str, max_size=(800, 500)) -> Image.Image:
     """
-    Carga imagen desde ruta local o URL con headers y reintentos.
+    Carga imagen desde ruta local o URL (con image_downloader(): keep-alive y reintentos).
     Redimensiona manteniendo proporción. Lanza excepción si no se puede.
+    Las URL se guardan ya redimensionadas en IMAGE_CACHE_DIR y la próxima vez se leen de ahí.
     """
     if not img_path_or_url:
         raise FileNotFoundError("Sin ruta/URL")
 
-    data = None
     p = Path(img_path_or_url)
 
     if p.exists():
         # Ruta local
-        data = p.read_bytes()
-    elif img_path_or_url.startswith(("http://", "https://")) and urlreq is not None:
-        # URL remota con User-Agent y reintentos
-        last_err = None
-        for attempt in range(3):
-            try:
-                req = urlreq.Request(
-                    img_path_or_url,
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                                      "AppleWebKit/537.36 (KHTML, like Gecko) "
-                                      "Chrome/121.0 Safari/537.36"
-                    },
-                )
-                with urlreq.urlopen(req, timeout=20) as r:
-                    data = r.read()
-                break
-            except Exception as e:
-                last_err = e
-        if data is None:
-            raise RuntimeError(f"No se pudo descargar la imagen: {img_path_or_url} ({last_err})")
-    else:
+        with TRACER.span("leer"):
+            data = p.read_bytes()
+        return render_image(data, max_size, img_path_or_url)
+    if not img_path_or_url.startswith(("http://", "https://")):
         raise FileNotFoundError(f"No es ruta local ni URL válida: {img_path_or_url}")
 
+    cached = image_cache_path(img_path_or_url, max_size)
     try:
-        im = Image.open(io.BytesIO(data))
-        im = im.convert("RGB")
-        im.thumbnail(max_size, Image.LANCZOS)
-        return im
+        with TRACER.span("cache"):
+            im = Image.open(cached)
+            im.load()
+        return im.convert("RGB")
+    except FileNotFoundError:
+        pass
+    except Exception as e:   # archivo dañado: se descarga de nuevo
+        print(f"[IMG] caché inválida para {img_path_or_url}: {e}")
+
+    # URL remota: conexión reusada del host, User-Agent y reintentos con espera
+    try:
+        with TRACER.span("descarga", url=img_path_or_url):
+            data = image_downloader().fetch(img_path_or_url)
+    except DownloadError as e:
+        raise RuntimeError(f"No se pudo descargar la imagen: {img_path_or_url} ({e})")
+    im = render_image(data, max_size, img_path_or_url)
+    try:
+        cache_image(img_path_or_url, max_size, im)
+    except OSError as e:
+        print(f"[IMG] no se pudo guardar en caché: {e}")
+    return im
+
+# ------------------------------------
+# Precarga y revisión de imágenes (--warm-images)
+# ------------------------------------
+def warm_image(car: Dict, sizes=(MAX_IMG_SIZE, THUMB_SIZE), recheck: bool = False) -> Dict:
+    """
+    Descarga, valida y deja en caché las versiones de `sizes` de la imagen de un coche. Si
+    ya están en caché sólo se comprueba que la URL siga viva (HEAD); `recheck` la baja de nuevo.
+    """
+    url = car["img"]
+    row = {"name": car["name"], "img": url, "ok": False}
+    t0 = time.perf_counter()
+    try:
+        if not recheck and all(image_cache_path(url, size).exists() for size in sizes):
+            row["cached"] = True
+            image_downloader().check(url)
+            row.update(ok=True, checked=True)
+            return row
+        data = image_downloader().fetch(url)
+        row["fetch_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        row["bytes"] = len(data)
+        with Image.open(io.BytesIO(data)) as original:
+            row["format"] = original.format
+            row["size"] = list(original.size)
+        im = None
+        for size in sorted(sizes, reverse=True):   # se decodifica una vez; cada tamaño sale del anterior
+            if im is None:
+                im = render_image(data, size, url)
+            else:
+                im = im.copy()
+                im.thumbnail(size, Image.LANCZOS)
+            cache_image(url, size, im)
+        row["ok"] = True
     except Exception as e:
-        raise RuntimeError(f"Error abriendo imagen ({img_path_or_url}): {e}")
+        row["error"] = str(e)
+    finally:
+        row["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return row
+
+def warm_image_cache(cars: List[Dict], workers: int = 16, report: Optional[Path] = None,
+                     recheck: bool = False) -> Dict:
+    """
+    Precarga todas las imágenes remotas del catálogo con `workers` hilos (el descargador
+    limita además las conexiones por host) y devuelve/escribe un informe con fallos,
+    tamaños y latencias. Las que ya están en caché se revisan con HEAD (o se bajan de
+    nuevo con `recheck`), así un enlace muerto aparece aunque quede la copia local.
+    """
+    remote, local = [], []
+    for c in cars:
+        if c.get("img"):
+            (remote if c["img"].startswith(("http://", "https://")) else local).append(c)
+    rows = [{"name": c["name"], "img": c["img"], "ok": Path(c["img"]).exists(), "local": True}
+            for c in local]
+    for row in rows:
+        if not row["ok"]:
+            row["error"] = "no existe el archivo"
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="precarga") as pool:
+        for n, row in enumerate(pool.map(lambda c: warm_image(c, recheck=recheck), remote), 1):
+            rows.append(row)
+            if not row["ok"]:
+                print(f"  ❌ {row['name']}: {row['error']}")
+            if n % 100 == 0 or n == len(remote):
+                print(f"  {n}/{len(remote)} imágenes revisadas")
+    elapsed = time.perf_counter() - t0
+    fetched = sorted(r["fetch_ms"] for r in rows if r.get("fetch_ms") is not None)
+    pct = lambda p: fetched[min(len(fetched) - 1, int(len(fetched) * p / 100))] if fetched else None
+    summary = {
+        "total": len(rows),
+        "ok": sum(r["ok"] for r in rows),
+        "failed": sum(not r["ok"] for r in rows),
+        "already_cached": sum(bool(r.get("cached")) for r in rows),
+        "dead_cached": sum(bool(r.get("cached")) and not r["ok"] for r in rows),
+        "without_image": len(cars) - len(remote) - len(local),
+        "seconds": round(elapsed, 2),
+        "ms_p50": pct(50),
+        "ms_p95": pct(95),
+        "bytes": sum(r.get("bytes", 0) for r in rows),
+        "cache_dir": str(IMAGE_CACHE_DIR),
+    }
+    result = {"summary": summary, "images": rows}
+    if report is not None:
+        report.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    return result
+
+def fit_frame(im: Image.Image, size=MAX_IMG_SIZE, bg=(24, 24, 24)) -> Image.Image:
+    """Centra `im` en un cuadro fijo de `size` (así una sola PhotoImage sirve para todas)."""
+    if im.size == tuple(size):
+        return im
+    frame = Image.new("RGB", size, bg)
+    frame.paste(im, ((size[0] - im.width) // 2, (size[1] - im.height) // 2))
+    return frame
+
+def load_thumbnail(car: Dict, size=THUMB_SIZE) -> Image.Image:
+    """Miniatura encuadrada de un coche (su placeholder si no tiene imagen o no carga)."""
+    if car.get("img"):
+        try:
+            return fit_frame(load_image(car["img"], size), size)
+        except Exception as e:
+            print(f"[IMG] {car['name']}: {e}")
+    return fit_frame(make_placeholder(car["name"], size), size)
+
+_placeholders: "OrderedDict[Tuple[str, Tuple[int, int]], Image.Image]" = OrderedDict()
+_placeholder_fonts: Dict[int, object] = {}   # tamaño en px → fuente (se abre una vez)
+_placeholder_lock = threading.Lock()         # las miniaturas se arman en hilos
 
 def make_placeholder(name: str, size=(800, 500)) -> Image.Image:
-    """Genera un placeholder simple con el nombre del coche."""
-    from PIL import ImageDraw, ImageFont
+    """
+    Placeholder con el nombre del coche. Se dibuja una vez por (nombre, tamaño) y se
+    reutiliza: la imagen devuelta es compartida, no hay que modificarla.
+    """
+    key = (name, tuple(size))
+    with _placeholder_lock:
+        im = _placeholders.get(key)
+        if im is not None:
+            _placeholders.move_to_end(key)
+            return im
+    with TRACER.span("placeholder"):
+        im = _draw_placeholder(name, key[1])
+    with _placeholder_lock:
+        _placeholders[key] = im
+        if len(_placeholders) > PLACEHOLDER_CACHE:
+            _placeholders.popitem(last=False)
+    return im
+
+def _placeholder_font(px: int):
+    from PIL import ImageFont
+    with _placeholder_lock:
+        font = _placeholder_fonts.get(px)
+    if font is not None:
+        return font
+    for path in PLACEHOLDER_FONTS:
+        try:
+            font = ImageFont.truetype(path, px)
+            break
+        except OSError:
+            continue
+    else:
+        try:
+            font = ImageFont.load_default(px)   # Pillow ≥ 10.1: escalable si hay FreeType
+        except (TypeError, AttributeError):
+            font = ImageFont.load_default()     # Pillow anterior: fuente de mapa de bits fija
+    with _placeholder_lock:
+        _placeholder_fonts[px] = font
+    return font
+
+def _draw_placeholder(name: str, size) -> Image.Image:
+    from PIL import ImageDraw
     im = Image.new("RGB", size, (24, 24, 24))
     draw = ImageDraw.Draw(im)
     txt = f"Sin imagen\n{name}"
+    font = _placeholder_font(max(10, size[1] * 26 // 500))   # 26 px en la imagen completa
+    # textbbox reemplaza a multiline_textsize (quitado en Pillow 10); el recuadro puede no
+    # empezar en (0, 0), así que se descuenta su origen al centrar
     try:
-        font = ImageFont.truetype("arial.ttf", 26)
-    except Exception:
-        font = ImageFont.load_default()
-    w, h = draw.multiline_textsize(txt, font=font)
-    draw.multiline_text(((size[0]-w)//2, (size[1]-h)//2), txt, fill=(220, 220, 220), font=font, align="center")
+        left, top, right, bottom = draw.multiline_textbbox((0, 0), txt, font=font, align="center")
+    except (ValueError, AttributeError):   # Pillow < 9.2 no mide fuentes de mapa de bits con textbbox
+        left, top = 0, 0
+        right, bottom = draw.multiline_textsize(txt, font=font)
+    x = (size[0] - (right - left)) // 2 - left
+    y = (size[1] - (bottom - top)) // 2 - top
+    draw.multiline_text((x, y), txt, fill=(220, 220, 220), font=font, align="center")
     return im
 
 # ------------------------------------
@@ -241,11 +2134,16 @@ def game_window(db: Dict):
     Una sola ventana:
     1) Galería (carrusel) con imágenes y botón "Empezar preguntas"
     2) Cuestionario de 5 preguntas Sí/No (y posible 6ª por regla)
-    3) Resultado mostrado con imagen y nombre
+    3) Resultado mostrado con imagen y nombre (y, si no acertó, el jugador le enseña su coche)
     """
-    cars = db["cars"]
-    rules = db.get("duplex_rules", {})
-    N = len(cars)
+    # Versión vigente de la base (inmutable: trie precompilado + índices). Cada partida lee
+    # la versión con la que empezó; aprender crea otra versión y cambia la referencia.
+    knowledge = LiveKnowledge(db)
+    use_image_processes()   # las miniaturas de la cuadrícula se decodifican en todos los núcleos
+    name_index = NameIndex(knowledge.current.cars)   # búsqueda por nombre; se actualiza al aprender/recargar
+    reloads: "queue.Queue[Tuple[KnowledgeSnapshot, Dict]]" = queue.Queue()
+    knowledge.subscribe(lambda snap, changes: reloads.put((snap, changes)))
+    watcher = KnowledgeWatcher(knowledge).start()
 
     root = tk.Tk()
     root.title("Akinator de coches — Galería y preguntas")
@@ -255,18 +2153,36 @@ def game_window(db: Dict):
     container.pack(fill="both", expand=True)
 
     gallery_frame = ttk.Frame(container)
+    grid_frame = ttk.Frame(container)
     quiz_frame = ttk.Frame(container)
     result_frame = ttk.Frame(container)
 
-    for f in (gallery_frame, quiz_frame, result_frame):
+    for f in (gallery_frame, grid_frame, quiz_frame, result_frame):
         f.grid(row=0, column=0, sticky="nsew")
 
     container.columnconfigure(0, weight=1)
     container.rowconfigure(0, weight=1)
 
+    view = {"frame": gallery_frame}   # frame visible (las teclas de la galería sólo actúan en ella)
+
+    def show_frame(frame: ttk.Frame):
+        view["frame"] = frame
+        frame.tkraise()
+
     # ---------- GALERÍA ----------
     # Widgets galería
-    g_img_label = ttk.Label(gallery_frame)
+    g_search = ttk.Frame(gallery_frame)
+    g_search.pack(fill="x")
+    ttk.Label(g_search, text="🔎 Buscar:").pack(side="left")
+    g_query = tk.StringVar()
+    g_query_entry = ttk.Entry(g_search, textvariable=g_query, width=40)
+    g_query_entry.pack(side="left", padx=6)
+    g_hits = tk.Listbox(gallery_frame, height=6, activestyle="dotbox")   # sugerencias (sólo si hay)
+    g_hits_ids: List[int] = []
+
+    # Una sola PhotoImage de tamaño fijo: cada cambio de coche la actualiza con paste()
+    g_photo = ImageTk.PhotoImage("RGB", MAX_IMG_SIZE)
+    g_img_label = ttk.Label(gallery_frame, image=g_photo)
     g_img_label.pack(pady=8)
 
     g_name_label = ttk.Label(gallery_frame, font=("Segoe UI", 16, "bold"))
@@ -280,8 +2196,10 @@ def game_window(db: Dict):
 
     g_btn_prev = ttk.Button(g_controls, text="⬅ Anterior")
     g_btn_next = ttk.Button(g_controls, text="Siguiente ➡")
+    g_btn_grid = ttk.Button(g_controls, text="▦ Cuadrícula")
     g_btn_prev.grid(row=0, column=0, padx=6)
     g_btn_next.grid(row=0, column=1, padx=6)
+    g_btn_grid.grid(row=0, column=2, padx=6)
 
     g_start_btn = ttk.Button(gallery_frame, text="Empezar preguntas", state="disabled")
     g_start_btn.pack(pady=8)
@@ -289,17 +2207,34 @@ def game_window(db: Dict):
     g_status = ttk.Label(gallery_frame, anchor="w", relief="sunken")
     g_status.pack(fill="x")
 
+    def status_text(label: ttk.Label, text: str, frame: str):
+        # con --overlay, debajo del mensaje va el desglose del último render y el p95
+        overlay = TRACER.overlay_text(frame)
+        label.config(text=f"{text}\n{overlay}" if overlay else text)
+
     # Estado galería
     idx = {"i": 0}
-    img_cache_gallery: List[ImageTk.PhotoImage] = [None] * N
-
-    def gallery_render():
-        i = idx["i"]
-        car = cars[i]
-        g_name_label.config(text=car["name"])
-        g_progress_label.config(text=f"{i+1} / {N}")
-
-        # Imagen
+    gallery_frames: "OrderedDict[int, Image.Image]" = OrderedDict()   # id → imagen completa (LRU)
+    gallery_thumbs: "OrderedDict[int, Image.Image]" = OrderedDict()    # id → miniatura (LRU)
+    gallery_pending = {"after": None}
+
+    def gallery_step(i: int, step: int) -> int:
+        """Siguiente id vigente desde i (sin contarlo) en la dirección step, dando la vuelta."""
+        snap = knowledge.current
+        start = len(snap.cars) - 1 if step < 0 else 0
+        j = next(snap.live_ids(i + step, step), None)
+        return j if j is not None else next(snap.live_ids(start, step))
+
+    def gallery_last() -> int:
+        snap = knowledge.current
+        return next(snap.live_ids(len(snap.cars) - 1, -1))
+
+    def gallery_image(i: int, car: Dict) -> Image.Image:
+        """Imagen completa del coche i (de la caché o cargándola) ya encuadrada."""
+        im = gallery_frames.get(i)
+        if im is not None:
+            gallery_frames.move_to_end(i)
+            return im
         if car.get("img"):
             try:
                 im = load_image(car["img"], MAX_IMG_SIZE)
@@ -308,36 +2243,131 @@ def game_window(db: Dict):
                 im = make_placeholder(car["name"], MAX_IMG_SIZE)
         else:
             im = make_placeholder(car["name"], MAX_IMG_SIZE)
+        im = fit_frame(im)
+        gallery_frames[i] = im
+        if len(gallery_frames) > GALLERY_FRAME_CACHE:
+            gallery_frames.popitem(last=False)
+        if i not in gallery_thumbs:
+            remember_thumb(i, im.resize(THUMB_SIZE, Image.BILINEAR))
+        return im
 
-        img_cache_gallery[i] = ImageTk.PhotoImage(im)
-        g_img_label.config(image=img_cache_gallery[i])
+    def remember_thumb(i: int, thumb: Image.Image):
+        gallery_thumbs[i] = thumb
+        gallery_thumbs.move_to_end(i)
+        if len(gallery_thumbs) > THUMB_CACHE:
+            gallery_thumbs.popitem(last=False)
+
+    def gallery_render(settle: bool = False):
+        """
+        Muestra el coche idx["i"]. Con settle=True (navegación con flechas) los textos se
+        actualizan al momento pero la imagen completa espera a que las teclas paren
+        GALLERY_SETTLE_MS: mientras tanto se ve la miniatura ya cargada o el placeholder,
+        y al final sólo se carga el coche en el que se detuvo el jugador.
+        """
+        snap = knowledge.current
+        if snap.cars[idx["i"]] is None:   # se borró al recargar knowledge.json
+            idx["i"] = gallery_step(idx["i"], 1)
+        i = idx["i"]
+        car = snap.cars[i]
+        g_name_label.config(text=car["name"])
+        g_progress_label.config(text=f"{snap.live_rank(i)} / {len(snap.ids_by_name)}")
+
+        if gallery_pending["after"] is not None:
+            root.after_cancel(gallery_pending["after"])
+            gallery_pending["after"] = None
+        if settle and i not in gallery_frames:
+            thumb = gallery_thumbs.get(i)
+            if thumb is not None:
+                g_photo.paste(thumb.resize(MAX_IMG_SIZE, Image.BILINEAR))
+            else:
+                g_photo.paste(fit_frame(make_placeholder(car["name"], MAX_IMG_SIZE)))
+            gallery_pending["after"] = root.after(GALLERY_SETTLE_MS, gallery_settled)
+        else:
+            with TRACER.span("galeria", car=i):
+                im = gallery_image(i, car)
+                with TRACER.span("photoimage"):
+                    g_photo.paste(im)
 
         # Botón empezar activo sólo en el último
-        if i == N - 1:
+        if i == gallery_last():
             g_start_btn.config(state="normal")
-            g_status.config(text="Has llegado al final. Puedes empezar el juego.")
+            status_text(g_status, "Has llegado al final. Puedes empezar el juego.", "galeria")
         else:
             g_start_btn.config(state="disabled")
-            g_status.config(text="Navega con las flechas. Al final podrás empezar.")
+            status_text(g_status, "Navega con las flechas. Al final podrás empezar.", "galeria")
 
-    def gallery_prev():
-        idx["i"] = (idx["i"] - 1) % N
+    def gallery_settled():
+        gallery_pending["after"] = None
         gallery_render()
 
+    def gallery_prev():
+        idx["i"] = gallery_step(idx["i"], -1)
+        gallery_render(settle=True)
+
     def gallery_next():
-        idx["i"] = (idx["i"] + 1) % N
-        gallery_render()
+        idx["i"] = gallery_step(idx["i"], 1)
+        gallery_render(settle=True)
 
     g_btn_prev.config(command=gallery_prev)
     g_btn_next.config(command=gallery_next)
 
+    SEARCH_HITS = 8
+
+    def search_update(event=None):
+        if event is not None and event.keysym in ("Return", "Down", "Escape"):
+            return
+        cars = knowledge.current.cars
+        # (una recarga aún sin aplicar al índice puede haber borrado alguno)
+        g_hits_ids[:] = [i for i in name_index.search(g_query.get(), limit=SEARCH_HITS) if cars[i] is not None]
+        g_hits.delete(0, "end")
+        for i in g_hits_ids:
+            g_hits.insert("end", cars[i]["name"])
+        if g_hits_ids:
+            g_hits.config(height=len(g_hits_ids))
+            g_hits.pack(after=g_search, fill="x", pady=(2, 0))
+        else:
+            g_hits.pack_forget()
+
+    def search_jump(pos: int = 0):
+        if pos < len(g_hits_ids):
+            idx["i"] = g_hits_ids[pos]
+            search_clear()
+            gallery_render()
+
+    def search_clear(event=None):
+        g_query.set("")
+        g_hits_ids.clear()
+        g_hits.pack_forget()
+        root.focus_set()
+
+    def search_focus_hits(event):
+        if g_hits_ids:
+            g_hits.focus_set()
+            g_hits.selection_set(0)
+            g_hits.activate(0)
+
+    g_query_entry.bind("<KeyRelease>", search_update)
+    g_query_entry.bind("<Return>", lambda e: search_jump(0))
+    g_query_entry.bind("<Down>", search_focus_hits)
+    g_query_entry.bind("<Escape>", search_clear)
+    g_hits.bind("<Return>", lambda e: search_jump(g_hits.index("active")))
+    g_hits.bind("<Double-Button-1>", lambda e: search_jump(g_hits.nearest(e.y)))
+    g_hits.bind("<Escape>", search_clear)
+
     def gallery_key(event):
+        if isinstance(event.widget, (tk.Entry, tk.Listbox)):   # escribiendo en un buscador
+            return
+        if view["frame"] is grid_frame:
+            grid_key(event)
+            return
+        if view["frame"] is not gallery_frame:
+            return
         if event.keysym in ("Left", "a", "A"):
             gallery_prev()
         elif event.keysym in ("Right", "d", "D"):
             gallery_next()
         elif event.keysym in ("Return", "space"):
-            if idx["i"] == N - 1 and g_start_btn["state"] == "normal":
+            if idx["i"] == gallery_last() and g_start_btn["state"] == "normal":
                 to_quiz()
 
     root.bind("<Key>", gallery_key)
@@ -345,20 +2375,216 @@ def game_window(db: Dict):
     def to_quiz():
         # Cambia a frame de preguntas
         quiz_render(reset=True)
-        quiz_frame.tkraise()
+        show_frame(quiz_frame)
 
     g_start_btn.config(command=to_quiz)
 
+    # ---------- CUADRÍCULA (catálogos grandes) ----------
+    # Canvas virtualizado: sólo existen los ítems de las filas visibles (y una de margen);
+    # las miniaturas se cargan en hilos y se desalojan por LRU, así la memoria no depende
+    # del tamaño del catálogo.
+    grid_bar = ttk.Frame(grid_frame)
+    grid_bar.pack(fill="x", pady=(0, 6))
+    grid_back_btn = ttk.Button(grid_bar, text="⬅ Vista individual")
+    grid_back_btn.pack(side="left")
+    grid_start_btn = ttk.Button(grid_bar, text="Empezar preguntas", command=to_quiz)
+    grid_start_btn.pack(side="right")
+    ttk.Label(grid_bar, text="🔎").pack(side="left", padx=(10, 2))
+    grid_query = tk.StringVar()
+    grid_query_entry = ttk.Entry(grid_bar, textvariable=grid_query, width=30)
+    grid_query_entry.pack(side="left")
+    grid_info = ttk.Label(grid_bar, font=("Segoe UI", 10))
+    grid_info.pack(side="left", padx=10)
+
+    grid_canvas = tk.Canvas(grid_frame, highlightthickness=0, background="#181818")
+    grid_scroll = ttk.Scrollbar(grid_frame, orient="vertical", command=grid_canvas.yview)
+    grid_scroll.pack(side="right", fill="y")
+    grid_canvas.pack(side="left", fill="both", expand=True)
+
+    grid_state = {"ids": [], "cols": 1, "rows": {}, "after": None, "filter": None}   # rows: fila dibujada → ids
+    grid_photos: "OrderedDict[int, ImageTk.PhotoImage]" = OrderedDict()   # id de coche → miniatura
+    grid_cells: Dict[int, Tuple[int, int]] = {}    # id de coche visible → (fila, ítem imagen)
+    grid_loading = set()                           # ids pedidos a los hilos
+    grid_pending = set()                           # futuros sin terminar (se cancelan al cerrar)
+    grid_loaded: "queue.Queue[Tuple[int, Image.Image]]" = queue.Queue()
+    thumb_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="miniaturas")
+    grid_blank = ImageTk.PhotoImage(Image.new("RGB", THUMB_SIZE, (40, 40, 40)))
+
+    def grid_scrolled(first, last):
+        grid_scroll.set(first, last)
+        if grid_state["after"] is None:   # varios eventos de scroll seguidos → un solo refresco
+            grid_state["after"] = root.after_idle(grid_refresh)
+
+    grid_canvas.config(yscrollcommand=grid_scrolled)
+
+    def grid_photo(i: int) -> ImageTk.PhotoImage:
+        photo = grid_photos.get(i)
+        if photo is not None:
+            grid_photos.move_to_end(i)
+            return photo
+        thumb = gallery_thumbs.get(i)
+        if thumb is None:
+            if i not in grid_loading:
+                grid_loading.add(i)
+                future = thumb_pool.submit(grid_load, i, knowledge.current.cars[i])
+                grid_pending.add(future)
+                future.add_done_callback(grid_pending.discard)
+            return grid_blank
+        photo = grid_photos[i] = ImageTk.PhotoImage(thumb)
+        while len(grid_photos) > GRID_PHOTO_CACHE:
+            old, old_photo = grid_photos.popitem(last=False)
+            if old in grid_cells:          # visible: el canvas la usa, no se puede soltar
+                grid_photos[old] = old_photo
+                break
+        return photo
+
+    def grid_load(i: int, car: Dict):
+        # en un hilo del pool: sólo PIL, nada de Tk; si la fila ya salió de pantalla no se carga
+        try:
+            if i in grid_cells:
+                grid_loaded.put((i, load_thumbnail(car)))
+        except Exception as e:
+            print(f"[IMG] {car['name']}: {e}")
+        finally:
+            grid_loading.discard(i)
+
+    def grid_layout():
+        """Recalcula columnas y alto total; borra las filas dibujadas."""
+        width = max(grid_canvas.winfo_width(), GRID_CELL[0])
+        cols = max(1, width // GRID_CELL[0])
+        grid_state["cols"] = cols
+        rows = -(-len(grid_state["ids"]) // cols)
+        grid_canvas.delete("celda")
+        grid_state["rows"].clear()
+        grid_cells.clear()
+        grid_canvas.config(scrollregion=(0, 0, cols * GRID_CELL[0], rows * GRID_CELL[1]))
+        grid_info.config(text=f"{len(grid_state['ids'])} coches")
+        grid_refresh()
+
+    def grid_refresh():
+        grid_state["after"] = None
+        cw, ch = GRID_CELL
+        cols, ids = grid_state["cols"], grid_state["ids"]
+        top = grid_canvas.canvasy(0)
+        first = max(0, int(top // ch) - 1)
+        last = min(-(-len(ids) // cols), int((top + grid_canvas.winfo_height()) // ch) + 2)
+        drawn = grid_state["rows"]
+        for row in [r for r in drawn if not first <= r < last]:   # filas que salieron: fuera
+            grid_canvas.delete(f"fila{row}")
+            for i in drawn.pop(row):
+                grid_cells.pop(i, None)
+        for row in range(first, last):
+            if row in drawn:
+                continue
+            row_ids = ids[row * cols:(row + 1) * cols]
+            for col, i in enumerate(row_ids):
+                car = knowledge.current.cars[i]
+                if car is None:   # borrado por una recarga que aún no se aplicó a la cuadrícula
+                    continue
+                x, y = col * cw + cw // 2, row * ch
+                tags = ("celda", f"fila{row}", f"coche{i}")
+                grid_cells[i] = (row, 0)   # antes de grid_photo: el hilo que la cargue la busca aquí
+                grid_cells[i] = (row, grid_canvas.create_image(x, y + 6, anchor="n", image=grid_photo(i), tags=tags))
+                name = car["name"]
+                grid_canvas.create_text(x, y + THUMB_SIZE[1] + 10, anchor="n", width=cw - 8, fill="#dddddd",
+                                        text=name if len(name) <= 24 else name[:23] + "…", tags=tags)
+            drawn[row] = row_ids
+
+    def grid_poll():
+        # miniaturas terminadas por los hilos: se crean las PhotoImage aquí (hilo de Tk)
+        while True:
+            try:
+                i, thumb = grid_loaded.get_nowait()
+            except queue.Empty:
+                break
+            remember_thumb(i, thumb)
+            cell = grid_cells.get(i)
+            if cell is not None:
+                grid_canvas.itemconfig(cell[1], image=grid_photo(i))
+        root.after(40, grid_poll)
+
+    def grid_ids() -> List[int]:
+        """Coches de la cuadrícula: los que coinciden con la búsqueda, o todo el catálogo."""
+        query = grid_query.get()
+        if query.strip():
+            return name_index.search(query, limit=None)
+        return list(knowledge.current.live_ids())
+
+    def grid_filter():
+        grid_state["filter"] = None
+        grid_state["ids"] = grid_ids()
+        grid_layout()
+        grid_canvas.yview_moveto(0)
+
+    def grid_query_changed(event=None):
+        # se filtra cuando se deja de teclear un momento, no en cada tecla
+        if grid_state["filter"] is not None:
+            root.after_cancel(grid_state["filter"])
+        grid_state["filter"] = root.after(80, grid_filter)
+
+    grid_query_entry.bind("<KeyRelease>", grid_query_changed)
+
+    def grid_open():
+        grid_state["ids"] = grid_ids()
+        show_frame(grid_frame)
+        grid_canvas.update_idletasks()
+        grid_layout()
+        # que se vea el coche de la vista individual
+        ids = grid_state["ids"]
+        pos = bisect_left(ids, idx["i"]) if not grid_query.get().strip() else (
+            ids.index(idx["i"]) if idx["i"] in ids else 0)
+        rows = max(1, -(-len(ids) // grid_state["cols"]))
+        grid_canvas.yview_moveto((pos // grid_state["cols"]) / rows)
+
+    def grid_close():
+        show_frame(gallery_frame)
+        gallery_render()
+
+    def grid_click(event):
+        for tag in grid_canvas.gettags("current"):
+            if tag.startswith("coche"):
+                idx["i"] = int(tag[5:])
+                grid_close()
+                return
+
+    def grid_wheel(event):
+        if view["frame"] is not grid_frame:
+            return
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            grid_canvas.yview_scroll(-3, "units")
+        else:
+            grid_canvas.yview_scroll(3, "units")
+
+    def grid_key(event):
+        moves = {"Up": (-1, "units"), "Down": (1, "units"), "Prior": (-1, "pages"), "Next": (1, "pages")}
+        if event.keysym in moves:
+            grid_canvas.yview_scroll(*moves[event.keysym])
+        elif event.keysym == "Home":
+            grid_canvas.yview_moveto(0)
+        elif event.keysym == "End":
+            grid_canvas.yview_moveto(1)
+        elif event.keysym == "Escape":
+            grid_close()
+
+    grid_canvas.config(yscrollincrement=GRID_CELL[1] // 4)
+    grid_canvas.tag_bind("celda", "<Button-1>", grid_click)
+    grid_canvas.bind("<Configure>", lambda e: grid_layout() if max(1, e.width // GRID_CELL[0]) != grid_state["cols"]
+                     else grid_refresh())
+    for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+        grid_canvas.bind_all(seq, grid_wheel, add="+")
+    g_btn_grid.config(command=grid_open)
+    grid_back_btn.config(command=grid_close)
+    root.after(40, grid_poll)
+
     # ---------- QUIZ ----------
     # Estado quiz
     quiz_state = {
         "q_idx": 0,            # índice de pregunta base 0..4
-        "answers": [],         # respuestas 1/0 de las 5 base
-        "special_key": None,   # clave 5 bits si hay regla especial
-        "special_q": None,     # texto de la pregunta especial
-        "special_ans": None,   # respuesta 1/0 a la especial
-        "bits5": None,         # tupla bits5
-        "candidates": None,    # candidatos por bits5
+        "answers": [],         # respuestas 1/0 (5 base + las de desempate)
+        "node": None,          # nodo actual del trie compilado (None mientras van las 5 base)
+        "candidates": None,    # ids que quedan si el trie terminó con varios candidatos
+        "attr_q": None,        # (atributo, valor) de la pregunta por atributo en curso
+        "snap": None,          # versión de la base con la que empezó esta partida
     }
 
     q_title = ttk.Label(quiz_frame, text="Preguntas", font=("Segoe UI", 18, "bold"))
@@ -385,11 +2611,10 @@ def game_window(db: Dict):
         if reset:
             quiz_state["q_idx"] = 0
             quiz_state["answers"] = []
-            quiz_state["special_key"] = None
-            quiz_state["special_q"] = None
-            quiz_state["special_ans"] = None
-            quiz_state["bits5"] = None
+            quiz_state["node"] = None
             quiz_state["candidates"] = None
+            quiz_state["attr_q"] = None
+            quiz_state["snap"] = knowledge.current
 
         # Si aún estamos en preguntas base
         if quiz_state["q_idx"] < 5:
@@ -400,66 +2625,63 @@ def game_window(db: Dict):
             q_no.config(state="normal")
             return
 
-        # Ya contestó 5 -> calcular bits5 y ver candidatos / posible especial
-        if quiz_state["bits5"] is None:
-            bits5 = tuple(quiz_state["answers"])
-            quiz_state["bits5"] = bits5
-            candidates = find_candidates(db, bits5)
-            quiz_state["candidates"] = candidates
-            key = bits_to_key5(bits5)
-
-            if key in rules:
-                # hay pregunta especial
-                quiz_state["special_key"] = key
-                quiz_state["special_q"] = rules[key]["question"]
-                # formular especial
-                q_text.config(text=quiz_state["special_q"])
-                q_progress.config(text="Pregunta especial (desempate)")
+        # Ya contestó 5 -> entrar al trie por el patrón de 5 bits
+        if quiz_state["node"] is None:
+            quiz_state["node"] = pattern_index(quiz_state["answers"])
+
+        snap = quiz_state["snap"]
+        question, _, _, entry = snap.nodes[quiz_state["node"]]
+        if question is not None:
+            # hay pregunta de desempate en este nivel
+            q_text.config(text=question)
+            q_progress.config(text=f"Pregunta especial (desempate {len(quiz_state['answers']) - 4})")
+            q_status.config(text="Responde con Sí o No.")
+            q_yes.config(state="normal")
+            q_no.config(state="normal")
+            return
+
+        # hoja con varios candidatos: seguir con preguntas por atributo (año, potencia, ...)
+        if entry[0] == "varios" and quiz_state["candidates"] is None:
+            quiz_state["candidates"] = list(entry[1])
+        cands = quiz_state["candidates"]
+        if cands is not None:
+            attr_q = snap.attrs.best_question(cands) if len(cands) > 1 else None
+            if attr_q is not None:
+                quiz_state["attr_q"] = attr_q
+                q_text.config(text=attribute_question(*attr_q))
+                q_progress.config(text=f"Pregunta por atributo ({len(cands)} candidatos)")
                 q_status.config(text="Responde con Sí o No.")
                 q_yes.config(state="normal")
                 q_no.config(state="normal")
                 return
-
-            # si no hay especial, mostrar resultado directo
-            show_result(bits5, candidates, special_used=False)
+            entry = ("unico", (cands[0],)) if len(cands) == 1 else ("varios", tuple(cands))
+
+        # mostrar resultado
+        answers = tuple(quiz_state["answers"])
+        show_result(answers, entry, special_used=len(answers) > 5 or cands is not None)
+
+    def on_answer(ans: int):
+        if quiz_state["attr_q"] is not None:
+            # atributo: filtrar candidatos con el índice por rango
+            attr, value = quiz_state["attr_q"]
+            quiz_state["attr_q"] = None
+            quiz_state["candidates"] = quiz_state["snap"].attrs.filter(quiz_state["candidates"], attr, value, ans)
+            quiz_render()
             return
-
-        # Si ya se formuló especial y falta responder, no hacemos nada aquí.
-        # El flujo continúa en on_yes/on_no
-
-    def on_yes():
-        # Si estamos en base
+        quiz_state["answers"].append(ans)
         if quiz_state["q_idx"] < 5:
-            quiz_state["answers"].append(1)
+            # base
             quiz_state["q_idx"] += 1
-            quiz_render()
-            return
+        else:
+            # desempate: bajar un nivel en el trie
+            quiz_state["node"] = quiz_state["snap"].nodes[quiz_state["node"]][1 + ans]
+        quiz_render()
 
-        # Si estamos en especial
-        if quiz_state["special_q"] is not None and quiz_state["special_ans"] is None:
-            quiz_state["special_ans"] = 1
-            bits5 = quiz_state["bits5"]
-            cand = quiz_state["candidates"] or []
-            filtered = tiebreak_with_rule(db, bits5, cand, ans6=1)
-            show_result(bits5, filtered, special_used=True)
-            return
+    def on_yes():
+        on_answer(1)
 
     def on_no():
-        # Base
-        if quiz_state["q_idx"] < 5:
-            quiz_state["answers"].append(0)
-            quiz_state["q_idx"] += 1
-            quiz_render()
-            return
-
-        # Especial
-        if quiz_state["special_q"] is not None and quiz_state["special_ans"] is None:
-            quiz_state["special_ans"] = 0
-            bits5 = quiz_state["bits5"]
-            cand = quiz_state["candidates"] or []
-            filtered = tiebreak_with_rule(db, bits5, cand, ans6=0)
-            show_result(bits5, filtered, special_used=True)
-            return
+        on_answer(0)
 
     q_yes.config(command=on_yes)
     q_no.config(command=on_no)
@@ -477,66 +2699,158 @@ def game_window(db: Dict):
     r_extra = ttk.Label(result_frame, font=("Segoe UI", 11), wraplength=720, justify="center")
     r_extra.pack(pady=4)
 
-    r_back_btn = ttk.Button(result_frame, text="Volver a galería")
-    r_back_btn.pack(pady=10)
+    r_btns = ttk.Frame(result_frame)
+    r_btns.pack(pady=10)
+
+    r_back_btn = ttk.Button(r_btns, text="Volver a galería")
+    r_learn_btn = ttk.Button(r_btns, text="¿No era tu coche? Enséñamelo")
+    r_back_btn.grid(row=0, column=0, padx=8)
+    r_learn_btn.grid(row=0, column=1, padx=8)
+
+    # Panel de aprendizaje (oculto hasta que el jugador lo pide)
+    l_frame = ttk.Frame(result_frame)
+    l_name = tk.StringVar()
+    l_img = tk.StringVar()
+    l_question = tk.StringVar()
+    l_ans = tk.IntVar(value=1)
+
+    ttk.Label(l_frame, text="Nombre de tu coche:").grid(row=0, column=0, sticky="e", padx=4, pady=2)
+    ttk.Entry(l_frame, textvariable=l_name, width=48).grid(row=0, column=1, columnspan=2, sticky="w", pady=2)
+    ttk.Label(l_frame, text="URL o ruta de imagen (opcional):").grid(row=1, column=0, sticky="e", padx=4, pady=2)
+    ttk.Entry(l_frame, textvariable=l_img, width=48).grid(row=1, column=1, columnspan=2, sticky="w", pady=2)
+    l_q_label = ttk.Label(l_frame, text="Pregunta (sí/no) que lo distinga:")
+    l_q_entry = ttk.Entry(l_frame, textvariable=l_question, width=48)
+    l_q_yes = ttk.Radiobutton(l_frame, text="Para mi coche es Sí", variable=l_ans, value=1)
+    l_q_no = ttk.Radiobutton(l_frame, text="Para mi coche es No", variable=l_ans, value=0)
+    l_save_btn = ttk.Button(l_frame, text="Aprender")
+    l_save_btn.grid(row=4, column=1, sticky="w", pady=6)
 
     r_status = ttk.Label(result_frame, anchor="w", relief="sunken")
     r_status.pack(fill="x")
 
     img_cache_result: List[ImageTk.PhotoImage] = [None]  # una ranura
 
-    def show_result(bits5: Tuple[int, int, int, int, int], candidates: List[Dict], special_used: bool):
-        # Construir textos
-        if len(candidates) == 1:
-            car = candidates[0]
+    def show_result(bits: Tuple[int, ...], entry: Tuple, special_used: bool):
+        # entry viene de la tabla compilada: ("unico" | "varios" | "cercanos", datos)
+        kind, data = entry
+        cars = quiz_state["snap"].cars
+        if kind == "unico":
+            car = cars[data[0]]
             r_name_label.config(text=car["name"])
             # Imagen del coche predicho
-            if car.get("img"):
-                try:
-                    im = load_image(car["img"], MAX_IMG_SIZE)
-                except Exception as e:
-                    print(f"[IMG RESULT] {car['name']}: {e}")
+            with TRACER.span("resultado", car=data[0]):
+                if car.get("img"):
+                    try:
+                        im = load_image(car["img"], MAX_IMG_SIZE)
+                    except Exception as e:
+                        print(f"[IMG RESULT] {car['name']}: {e}")
+                        im = make_placeholder(car["name"], MAX_IMG_SIZE)
+                else:
                     im = make_placeholder(car["name"], MAX_IMG_SIZE)
-            else:
-                im = make_placeholder(car["name"], MAX_IMG_SIZE)
-            img_cache_result[0] = ImageTk.PhotoImage(im)
-            r_img_label.config(image=img_cache_result[0])
+                with TRACER.span("photoimage"):
+                    img_cache_result[0] = ImageTk.PhotoImage(im)
+                r_img_label.config(image=img_cache_result[0])
 
-            txt = f"Binario detectado: {bits5}"
+            txt = f"Binario detectado: {bits}"
             if special_used:
                 txt += " + (desempate aplicado)"
             r_extra.config(text=txt)
-            r_status.config(text="¡Hecho! Si quieres, vuelve a la galería para revisar los coches.")
-        elif len(candidates) > 1:
+            status_text(r_status, "¡Hecho! Si quieres, vuelve a la galería para revisar los coches.", "resultado")
+        elif kind == "varios":
             # Varios candidatos: listarlos
-            names = "\n".join(f"• {c['name']}" for c in candidates)
+            names = "\n".join(f"• {cars[i]['name']}" for i in data)
             r_name_label.config(text="Hay más de un candidato posible")
             r_img_label.config(image="")
             r_extra.config(text=f"Candidatos:\n{names}\n\nSugerencia: agrega más preguntas especiales para este patrón.")
-            r_status.config(text=f"Patrón {bits5} produjo múltiples resultados.")
+            r_status.config(text=f"Patrón {bits} produjo múltiples resultados.")
         else:
             # Sin coincidencias exactas: sugerencias
             r_name_label.config(text="No encontré coincidencias exactas")
             r_img_label.config(image="")
-            nearest = suggest_nearest(db, bits5, k=6)
-            sug = "\n".join(f"• {c['name']} (dist={dist}, binario={parse_bits_str(c['bits'])[:5]})"
-                            for dist, c in nearest)
+            sug = "\n".join(f"• {cars[i]['name']} (dist={dist}, binario={parse_bits_str(cars[i]['bits'])[:5]})"
+                            for dist, i in data)
             r_extra.config(text=f"Sugerencias cercanas:\n{sug}")
-            r_status.config(text=f"Patrón {bits5} no tiene coincidencias exactas.")
+            r_status.config(text=f"Patrón {bits} no tiene coincidencias exactas.")
 
-        result_frame.tkraise()
+        show_frame(result_frame)
 
     def back_to_gallery():
-        gallery_frame.tkraise()
+        l_frame.pack_forget()
+        show_frame(gallery_frame)
         gallery_render()
 
     r_back_btn.config(command=back_to_gallery)
 
+    def learn_open():
+        # Las respuestas de esta partida (5 base + desempates) son el camino del coche nuevo
+        l_name.set("")
+        l_img.set("")
+        l_question.set("")
+        l_ans.set(1)
+        if knowledge.current.needs_question(tuple(quiz_state["answers"])):
+            l_q_label.grid(row=2, column=0, sticky="e", padx=4, pady=2)
+            l_q_entry.grid(row=2, column=1, columnspan=2, sticky="w", pady=2)
+            l_q_yes.grid(row=3, column=1, sticky="w")
+            l_q_no.grid(row=3, column=2, sticky="w")
+        else:
+            for w in (l_q_label, l_q_entry, l_q_yes, l_q_no):
+                w.grid_remove()
+        l_frame.pack(before=r_status, pady=6)
+        r_status.config(text="Escribe el nombre de tu coche; se aprende con las respuestas que acabas de dar.")
+
+    def learn_save():
+        bits = tuple(quiz_state["answers"])
+        try:
+            snap, i = knowledge.learn(bits, l_name.get().strip(), img=l_img.get().strip() or None,
+                                question=l_question.get().strip() or None, ans=l_ans.get())
+        except ValueError as e:
+            r_status.config(text=f"No se pudo aprender: {e}")
+            return
+        knowledge.persist(snap)
+        name_index.add(i, snap.cars[i]["name"])
+        l_frame.pack_forget()
+        car = snap.cars[i]
+        r_status.config(text=f"✅ Aprendido: {car['name']} ({car['bits']}). Se guarda en segundo plano.")
+
+    r_learn_btn.config(command=learn_open)
+    l_save_btn.config(command=learn_save)
+
     # Render inicial
-    gallery_frame.tkraise()
+    show_frame(gallery_frame)
     gallery_render()
 
+    def poll_reloads():
+        # Las recargas llegan desde el hilo del vigilante; Tk sólo se toca desde aquí
+        shown = None
+        while True:
+            try:
+                snap, changes = reloads.get_nowait()
+            except queue.Empty:
+                break
+            for i in changes["removed"]:
+                name_index.remove(i)
+            for i in changes["changed"] + changes["added"]:
+                name_index.add(i, snap.cars[i]["name"])
+            for i in changes["removed"] + changes["changed"]:
+                gallery_frames.pop(i, None)
+                gallery_thumbs.pop(i, None)
+                grid_photos.pop(i, None)
+            shown = changes
+        if shown is not None:
+            gallery_render()   # el coche mostrado o el último pueden haber cambiado
+            if view["frame"] is grid_frame:
+                grid_state["ids"] = grid_ids()
+                grid_layout()
+            g_status.config(text=f"Base recargada: +{len(shown['added'])} -{len(shown['removed'])} "
+                                 f"~{len(shown['changed'])} coches, {len(shown['rules'])} reglas.")
+        root.after(250, poll_reloads)
+
+    root.after(250, poll_reloads)
     root.mainloop()
+    watcher.stop()
+    for future in list(grid_pending):   # cancel_futures de shutdown() es de Python 3.9
+        future.cancel()
+    thumb_pool.shutdown(wait=False)
 
 # ------------------------------------
 # Modo aprendizaje (agregar coche)
@@ -549,72 +2863,118 @@ def add_new_car_flow(db: Dict):
     print("\n🔧 MODO APRENDIZAJE — Agregar coche nuevo")
     name = ask_text("Nombre del coche: ")
     img = ask_text("URL o ruta de imagen (opcional, deja vacío): ", allow_empty=True) or None
+    print("\nAtributos del coche (sirven para desempatar con preguntas de año, potencia, etc.):")
+    extra = ask_attribute_values()
 
     print("\nAhora responde las 5 preguntas base para tu coche:")
     # reusar CLI para aprendizaje
     bits5 = []
     for q in Q_BASE:
         bits5.append(ask_yesno(q))
-    bits5 = tuple(bits5)
-    key5 = bits_to_key5(bits5)
-
-    existing = find_candidates(db, bits5)
-    has_rule = key5 in db.get("duplex_rules", {})
+    bits = tuple(bits5)
+    rules = db.setdefault("duplex_rules", {})
+
+    # Bajar por el trie de desempate mientras el camino ya tenga pregunta y coches
+    existing = find_candidates(db, bits)
+    while existing:
+        key = bits_to_key(bits)
+        if key not in rules:
+            break
+        q = rules[key]["question"]
+        print(f"\nSe usará la pregunta especial existente para asignar el bit {len(bits) + 1}:")
+        ans = ask_yesno(q)
+        existing = [c for c in existing if parse_bits_str(c["bits"])[:len(bits) + 1] == bits + (ans,)]
+        bits += (ans,)
 
     if not existing:
-        new_bits = "-".join(str(x) for x in bits5)
-        db["cars"].append({"name": name, "bits": new_bits, "img": img})
-        print(f"✅ Añadido sin duplicados: {name}  ({new_bits})")
-        save_db(db)
+        new_bits = bits_to_key(bits)
+        db["cars"].append({"name": name, "bits": new_bits, "img": img, **extra})
+        if len(bits) > 5:
+            print(f"✅ Añadido con desempate por reglas existentes: {name}  ({new_bits})")
+        else:
+            print(f"✅ Añadido sin duplicados: {name}  ({new_bits})")
+        save_db_async(db)
         return
 
-    print(f"⚠️ Encontré {len(existing)} coche(s) con el mismo binario 5 bits: {key5}")
+    # Colisión en un nodo sin pregunta: se inserta una rama nueva en este nivel
+    key = bits_to_key(bits)
+    print(f"⚠️ Encontré {len(existing)} coche(s) con el mismo binario: {key}")
     for c in existing:
         print("   -", c["name"])
 
-    if has_rule:
-        q = db["duplex_rules"][key5]["question"]
-        print("\nSe usará la pregunta especial existente para asignar el 6º bit:")
-        ans6 = ask_yesno(q)
-        new_bits = "-".join(str(x) for x in bits5 + (ans6,))
-        db["cars"].append({"name": name, "bits": new_bits, "img": img})
-        print(f"✅ Añadido con 6º bit por regla existente: {name}  ({new_bits})")
-        save_db(db)
-        return
-
     print("\nNo existe aún una pregunta especial para este binario.")
     qtext = ask_text("Escribe la PREGUNTA ESPECIAL (sí/no) para diferenciar este grupo: ")
     print("\nResponde la pregunta especial para TU coche nuevo:")
-    ans6_new = ask_yesno(qtext)
+    ans_new = ask_yesno(qtext)
 
-    # FIX: clave correcta
-    db.setdefault("duplex_rules", {})
-    db["duplex_rules"][key5] = {"question": qtext}
-    new_bits = "-".join(str(x) for x in bits5 + (ans6_new,))
-    db["cars"].append({"name": name, "bits": new_bits, "img": img})
-    print(f"✅ Añadido con nueva regla y 6º bit: {name}  ({new_bits})")
+    rules[key] = {"question": qtext}
+    new_bits = bits_to_key(bits + (ans_new,))
+    db["cars"].append({"name": name, "bits": new_bits, "img": img, **extra})
+    print(f"✅ Añadido con nueva regla y bit {len(bits) + 1}: {name}  ({new_bits})")
 
-    print("\nOpcional: asigna el 6º bit (sí/no) a los coches existentes de este grupo.")
+    print(f"\nOpcional: asigna el bit {len(bits) + 1} (sí/no) a los coches existentes de este grupo.")
     for c in existing:
         cb = parse_bits_str(c["bits"])
-        if len(cb) == 6:
+        if len(cb) > len(bits):
             continue
         print(f"\nPara: {c['name']}")
-        ans6_old = ask_yesno(qtext)
-        c["bits"] = "-".join(str(x) for x in bits5 + (ans6_old,))
-        print(f"   → Guardado: {c['name']} ({c['bits']})")
+        ans_old = ask_yesno(qtext)
+        # se reemplaza el dict (no se modifica): así la copia que se guarda en otro hilo es consistente
+        c_new = {**c, "bits": bits_to_key(bits + (ans_old,))}
+        db["cars"][next(j for j, x in enumerate(db["cars"]) if x is c)] = c_new
+        print(f"   → Guardado: {c_new['name']} ({c_new['bits']})")
 
-    save_db(db)
+    save_db_async(db)
     print("\n💾 Cambios guardados en knowledge.json")
 
 # ------------------------------------
 # Main
 # ------------------------------------
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Akinator de coches")
+    parser.add_argument("--compile-table", action="store_true",
+                        help=f"solo recompila {TABLE_PATH.name} a partir de knowledge.json y sale")
+    parser.add_argument("--trace", type=Path, metavar="RUTA",
+                        help="escribe spans de tiempo (JSONL rotativo) en RUTA (o variable AKINATOR_TRACE)")
+    parser.add_argument("--overlay", action="store_true",
+                        help="muestra en la barra de estado el desglose del último render y el p95")
+    parser.add_argument("--no-catalog", action="store_true", help="no imprime el catálogo en la terminal")
+    parser.add_argument("--warm-images", action="store_true",
+                        help="descarga y revisa todas las imágenes, las deja en caché, escribe un informe y sale")
+    parser.add_argument("--workers", type=int, default=16, help="descargas simultáneas de --warm-images")
+    parser.add_argument("--timeout", type=float, default=None, help="timeout por descarga de --warm-images (s)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="procesos para decodificar imágenes (por defecto, uno por núcleo)")
+    parser.add_argument("--recheck", action="store_true",
+                        help="con --warm-images, vuelve a bajar también las que ya están en caché (si no, sólo HEAD)")
+    parser.add_argument("--report", type=Path, default=RUN_DIR / "informe_imagenes.json",
+                        help="informe JSON de --warm-images")
+    parser.add_argument("--catalog-page", type=int, default=CATALOG_PAGE, metavar="N",
+                        help=f"coches por página del catálogo (por defecto {CATALOG_PAGE}; 0 = todos de una vez)")
+    args = parser.parse_args(argv)
+    if args.trace or args.overlay:
+        TRACER.configure(args.trace, overlay=args.overlay)
+
     db = load_db()
+    if args.compile_table:
+        write_decision_table(compile_decision_table(db))
+        print(f"💾 Tabla de decisión escrita en {TABLE_PATH}")
+        return
+    if args.warm_images:
+        if args.timeout:
+            image_downloader().timeout = args.timeout
+        use_image_processes(args.processes)
+        print(f"🔥 Precargando imágenes en {IMAGE_CACHE_DIR} ({args.workers} a la vez)…")
+        summary = warm_image_cache(db["cars"], workers=args.workers, report=args.report,
+                                   recheck=args.recheck)["summary"]
+        print(f"✅ {summary['ok']}/{summary['total']} bien, {summary['failed']} con error, "
+              f"{summary['already_cached']} ya estaban en caché ({summary['dead_cached']} con el enlace caído) "
+              f"({summary['seconds']} s). Informe: {args.report}")
+        return
 
     # Mantener la lista en terminal
-    show_catalog_cli(db["cars"])
+    if not args.no_catalog:
+        show_catalog_cli(db["cars"], page_size=args.catalog_page)
 
     print("👋 ¿Quieres agregar un coche nuevo a la base antes de abrir la ventana?")
     if ask_yesno("¿Agregar coche ahora?") == 1:
@@ -623,5 +2983,10 @@ def main():
     # Abrir ventana todo-en-uno (galería + preguntas + resultado)
     game_window(db)
 
+    # Vaciar el escritor en segundo plano antes de salir
+    if _WRITER is not None and not _WRITER.close(timeout=10):
+        print("⚠️ No se pudieron guardar los últimos cambios en knowledge.json")
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support()   # el exe de PyInstaller también arranca los procesos de imágenes
     main()
@@ -5,7 +5,7 @@ a = Analysis(
     ['P3_akinator.py'],
     pathex=[],
     binaries=[],
-    datas=[('knowledge.json', '.')],
+    datas=[('knowledge.json', '.'), ('knowledge_tabla.py', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
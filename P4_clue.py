@@ -14,15 +14,76 @@ Descripción:
 Instrucciones: Ejecuta este archivo con Python 3.
 """
 
+import argparse
+import io
+import json
 import random
+import re
+import shutil
 import sys
+from functools import lru_cache
+from pathlib import Path
 from textwrap import fill
 
+from clue_cuaderno import CLAVES_CATEGORIA, Cuaderno, imprimir_busqueda, plegar
+from clue_partidas import AlmacenPartidas, codificar, decodificar, nueva_partida
+from motor_reglas import MotorReglas
+
+# Carpeta del EXE (o del .py en desarrollo): ahí se guarda la partida en curso
+if getattr(sys, "frozen", False):
+    RUN_DIR = Path(sys.executable).parent
+else:
+    RUN_DIR = Path(__file__).parent
+
+RUTA_PARTIDAS = RUN_DIR / "partidas_clue.db"
+SESION_LOCAL = "local"
+
 # ============ Utilidades de impresión (versión final) ============
+# Todas aceptan `out`: una Pantalla (buffer que se vuelca de una sola vez) o,
+# por defecto, la terminal. El ancho de envoltura sale de la Pantalla o de la terminal.
+
+ANCHO_MAX = 78   # ancho máximo de los párrafos, aunque la terminal sea más ancha
+ANCHO_MIN = 30
+
+def ancho_terminal():
+    """Ancho útil para envolver texto en la terminal actual."""
+    columnas = shutil.get_terminal_size((ANCHO_MAX + 2, 24)).columns
+    return max(ANCHO_MIN, min(ANCHO_MAX, columnas - 2))
+
+@lru_cache(maxsize=2048)
+def envolver(texto, ancho):
+    """textwrap.fill memoizado por (texto, ancho): las pistas largas se envuelven una vez."""
+    return fill(texto, width=ancho)
+
+class Pantalla(io.StringIO):
+    """
+    Buffer de una pantalla completa. Las funciones de impresión escriben aquí y
+    la pantalla se envía con una sola escritura (volcar / vaciar).
+    """
+
+    def __init__(self, ancho=None):
+        super().__init__()
+        self.ancho = ancho or ancho_terminal()
+
+    def vaciar(self) -> str:
+        """Devuelve el contenido acumulado y deja el buffer listo para la siguiente pantalla."""
+        datos = self.getvalue()
+        self.seek(0)
+        self.truncate()
+        return datos
+
+    def volcar(self, destino=None):
+        """Escribe la pantalla acumulada en `destino` (la terminal por defecto)."""
+        destino = destino or sys.stdout
+        destino.write(self.vaciar())
+        destino.flush()
+
+def _ancho(out):
+    return getattr(out, "ancho", None) or ancho_terminal()
 
-def hr(char="─", n=60):
+def hr(char="─", n=60, out=None):
     """Imprime una línea horizontal."""
-    print(char * n)
+    print(char * min(n, _ancho(out)), file=out)
 
 def to_text(value) -> str:
     """Convierte str | list[str] | tuple[str,...] a un único string."""
@@ -34,42 +95,140 @@ def to_text(value) -> str:
         return "\n".join(str(x) for x in value)
     return str(value)
 
-def titulo(texto):
+def titulo(texto, out=None):
     """Título en mayúsculas con líneas =."""
-    hr("=")
-    print(to_text(texto).upper())
-    hr("=")
+    hr("=", out=out)
+    print(to_text(texto).upper(), file=out)
+    hr("=", out=out)
 
-def subtitulo(texto):
+def subtitulo(texto, out=None):
     """Subtítulo con líneas -."""
-    hr("-")
-    print(to_text(texto))
-    hr("-")
+    hr("-", out=out)
+    print(to_text(texto), file=out)
+    hr("-", out=out)
 
-def wrap(text, width=78):
+def wrap(text, width=None, out=None):
     """Imprime texto envuelto. Acepta str, list[str] o tuple[str]."""
-    print(fill(to_text(text), width=width))
+    print(envolver(to_text(text), width or _ancho(out)), file=out)
 
-def pedir_opcion(prompt, opciones_validas):
+# ============ Índice de opciones (entrada por nombre) ============
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def normalizar(texto) -> str:
     """
-    Lee una opción (número o texto) validando contra opciones_validas (lista de claves).
-    - Acepta 1..N
-    - Acepta el nombre exacto (case-insensitive)
+    Pliega acentos, mayúsculas, guiones y comillas tipográficas:
+    'Montaña Rusa “La Serpiente Nocturna”' → 'montana rusa la serpiente nocturna'.
     """
-    while True:
-        sel = input(prompt).strip()
+    return " ".join(_TOKEN.findall(plegar(to_text(texto))))
+
+def _insertar(trie, texto, bit):
+    """Inserta `texto` en el trie; cada nodo guarda (clave None) la máscara de opciones que pasan por él."""
+    nodo = trie
+    for c in texto:
+        nodo = nodo.setdefault(c, {None: 0})
+        nodo[None] |= bit
+
+def _mascara_prefijo(trie, texto) -> int:
+    nodo = trie
+    for c in texto:
+        nodo = nodo.get(c)
+        if nodo is None:
+            return 0
+    return nodo[None]
+
+class IndiceOpciones:
+    """
+    Índice precalculado sobre una lista de opciones de menú. Resuelve una entrada
+    en O(len(entrada)) recorriendo tries cuyos nodos guardan una máscara de bits
+    con las opciones que los alcanzan. Acepta, en este orden:
+    - el número 1..N
+    - el nombre normalizado completo
+    - un prefijo único del nombre ('madame', 'montana rusa')
+    - palabras (o prefijos de palabras) que sólo aparecen en una opción ('murk', 'serp noct')
+    """
+
+    def __init__(self, opciones):
+        self.opciones = tuple(opciones)
+        self._exactas = {}
+        self._nombres = {None: 0}
+        self._palabras = {None: 0}
+        for i, opcion in enumerate(self.opciones):
+            bit = 1 << i
+            norm = normalizar(opcion)
+            self._exactas.setdefault(norm, opcion)
+            _insertar(self._nombres, norm, bit)
+            for palabra in norm.split():
+                _insertar(self._palabras, palabra, bit)
+
+    def __len__(self):
+        return len(self.opciones)
+
+    def _unica(self, mascara):
+        if mascara and mascara & (mascara - 1) == 0:
+            return self.opciones[mascara.bit_length() - 1]
+        return None
+
+    def resolver(self, sel):
+        """Devuelve la opción que corresponde a `sel`, o None si no hay una única coincidencia."""
+        sel = sel.strip()
         if sel.isdigit():
             idx = int(sel) - 1
-            if 0 <= idx < len(opciones_validas):
-                return opciones_validas[idx]
-        # permitir entrada por nombre exacto (case-insensitive)
-        for key in opciones_validas:
-            if sel.lower() == key.lower():
-                return key
-        print("❌ Opción inválida. Intenta de nuevo.")
+            if 0 <= idx < len(self.opciones):
+                return self.opciones[idx]
+        norm = normalizar(sel)
+        if not norm:
+            return None
+        if norm in self._exactas:
+            return self._exactas[norm]
+        unica = self._unica(_mascara_prefijo(self._nombres, norm))
+        if unica is not None:
+            return unica
+        mascara = -1
+        for palabra in norm.split():
+            mascara &= _mascara_prefijo(self._palabras, palabra)
+        return self._unica(mascara)
+
+@lru_cache(maxsize=4096)
+def indice_opciones(opciones):
+    """IndiceOpciones compartido por tupla de opciones (un caso se indexa una sola vez)."""
+    return IndiceOpciones(opciones)
+
+def indices_del_caso(caso):
+    """Índices de las tres categorías de un caso: {'personajes': IndiceOpciones, ...}."""
+    return {clave: indice_opciones(tuple(caso[clave])) for clave in ('personajes', 'lugares', 'objetos')}
+
+def resolver_opcion(sel, opciones_validas):
+    """
+    Traduce una entrada (número o texto) a una de opciones_validas, o None.
+    `opciones_validas` puede ser un IndiceOpciones ya construido o una lista de claves.
+    """
+    if not isinstance(opciones_validas, IndiceOpciones):
+        opciones_validas = indice_opciones(tuple(opciones_validas))
+    return opciones_validas.resolver(sel)
+
+MSG_OPCION_INVALIDA = "❌ Opción inválida. Intenta de nuevo."
+
+def leer_linea(prompt, pantalla=None):
+    """Vuelca la pantalla pendiente junto con el prompt y lee una línea de la terminal."""
+    pantalla = pantalla or Pantalla()
+    pantalla.write(prompt)
+    pantalla.volcar()
+    return input()
+
+def pedir_opcion(prompt, opciones_validas, pantalla=None):
+    """Lee una opción de la terminal hasta que resolver_opcion la acepte."""
+    pantalla = pantalla or Pantalla()
+    while True:
+        eleccion = resolver_opcion(leer_linea(prompt, pantalla), opciones_validas)
+        if eleccion is not None:
+            return eleccion
+        print(MSG_OPCION_INVALIDA, file=pantalla)
 
-def esperar_enter():
-    input("\n[Presiona ENTER para continuar] ")
+PROMPT_ENTER = "\n[Presiona ENTER para continuar] "
+
+def esperar_enter(pantalla=None):
+    leer_linea(PROMPT_ENTER, pantalla)
 
 # ============ Datos del juego ============
 
@@ -1053,6 +1212,10 @@ Micropartículas negras de corte térmico encontradas en la funda de Jinx coinci
 },
 ]
 
+# Los casos escritos a mano usan ids 1..N (los generados empiezan en clue_generador.ID_BASE_GENERADOS)
+for _i, _caso in enumerate(CASOS, 1):
+    _caso.setdefault('id', _i)
+
 PERSONAJES_LISTA = [
     "Madame Murk — Bruja de Humo",
     "Rollo Riptide — Hombre Sirena",
@@ -1079,108 +1242,267 @@ OBJETOS_LISTA = [
 
 # ============ Lógica de preguntas y juego ============
 
-def mostrar_menu_principal(intentos_restantes):
-    hr()
-    print(f"Intentos restantes: {intentos_restantes}")
-    print("¿Qué quieres preguntar?")
-    opciones = ["Personajes", "Lugares", "Objetos", "Acusar ahora"]
-    for i, op in enumerate(opciones, 1):
-        print(f" {i}) {op}")
-    return pedir_opcion("Elige opción (1-4): ", opciones)
-
-def sub_menu_categoria(nombre_cat, opciones_dict):
-    subtitulo(f"{nombre_cat} — Elige un ítem para recibir una pista")
-    keys = list(opciones_dict.keys())
-    for i, k in enumerate(keys, 1):
+OPCIONES_MENU = ["Personajes", "Lugares", "Objetos", "Acusar ahora", "Cuaderno"]
+INDICE_MENU = IndiceOpciones(OPCIONES_MENU)
+PROMPT_MENU = "Elige opción (1-5): "
+PROMPT_CATEGORIA = "Selecciona (1-5 o nombre): "
+PROMPT_CUADERNO = "📓 Buscar en tus pistas (ENTER = todas): "
+CATEGORIA_POR_MENU = {
+    "Personajes": ("PERSONAJES", 'personajes'),
+    "Lugares": ("LUGARES", 'lugares'),
+    "Objetos": ("OBJETOS", 'objetos'),
+}
+# (clave del caso, encabezado, prompt) de cada paso de la acusación
+PASOS_ACUSACION = (
+    ('personajes', "Sospechosos:", "¿Quién lo robó?: "),
+    ('objetos', "Objetos místicos:", "¿Con qué lo extrajo?: "),
+    ('lugares', "Lugares del carnaval:", "¿Dónde ocultó el Núcleo?: "),
+)
+
+def imprimir_inicio(caso, out=None):
+    titulo(caso['nombre'], out=out)
+    wrap(PROBLEMA_GENERAL, out=out)
+
+def imprimir_menu_principal(intentos_restantes, out=None):
+    hr(out=out)
+    print(f"Intentos restantes: {intentos_restantes}", file=out)
+    print("¿Qué quieres preguntar?", file=out)
+    for i, op in enumerate(OPCIONES_MENU, 1):
+        extra = " (no gasta intentos)" if op == "Cuaderno" else ""
+        print(f" {i}) {op}{extra}", file=out)
+
+def mostrar_menu_principal(intentos_restantes, pantalla=None):
+    pantalla = pantalla or Pantalla()
+    imprimir_menu_principal(intentos_restantes, out=pantalla)
+    return pedir_opcion(PROMPT_MENU, INDICE_MENU, pantalla)
+
+def imprimir_categoria(nombre_cat, opciones_dict, out=None):
+    subtitulo(f"{nombre_cat} — Elige un ítem para recibir una pista", out=out)
+    for i, k in enumerate(opciones_dict, 1):
         desc = opciones_dict[k]['desc']
-        print(f" {i}) {k}\n     · {desc}")
-    eleccion = pedir_opcion("Selecciona (1-5 o nombre): ", keys)
+        print(f" {i}) {k}\n     · {desc}", file=out)
+
+def imprimir_pista(eleccion, opciones_dict, out=None):
     pista = opciones_dict[eleccion].get('pista_detallada') or opciones_dict[eleccion]['pista']
-    hr()
-    print(f"🔎 PISTA sobre {eleccion}:")
-    wrap(pista)
+    hr(out=out)
+    print(f"🔎 PISTA sobre {eleccion}:", file=out)
+    wrap(pista, out=out)
+
+def sub_menu_categoria(nombre_cat, opciones_dict, pantalla=None, indice=None):
+    pantalla = pantalla or Pantalla()
+    imprimir_categoria(nombre_cat, opciones_dict, out=pantalla)
+    eleccion = pedir_opcion(PROMPT_CATEGORIA, indice or list(opciones_dict.keys()), pantalla)
+    imprimir_pista(eleccion, opciones_dict, out=pantalla)
     return eleccion
 
-def acusar():
-    subtitulo("Acusación Final — ¡Elige la combinación correcta!")
-    # Seleccionar personaje
-    print("\nSospechosos:")
-    for i, p in enumerate(PERSONAJES_LISTA, 1):
-        print(f" {i}) {p}")
-    sospechoso = pedir_opcion("¿Quién lo robó?: ", PERSONAJES_LISTA)
-
-    # Seleccionar objeto
-    print("\nObjetos místicos:")
-    for i, o in enumerate(OBJETOS_LISTA, 1):
-        print(f" {i}) {o}")
-    objeto = pedir_opcion("¿Con qué lo extrajo?: ", OBJETOS_LISTA)
-
-    # Seleccionar lugar
-    print("\nLugares del carnaval:")
-    for i, l in enumerate(LUGARES_LISTA, 1):
-        print(f" {i}) {l}")
-    lugar = pedir_opcion("¿Dónde ocultó el Núcleo?: ", LUGARES_LISTA)
-
+def imprimir_inicio_acusacion(out=None):
+    print("\n" + "="*60, file=out)
+    print("¡Es momento de ACUSAR!", file=out)
+    print("="*60, file=out)
+    subtitulo("Acusación Final — ¡Elige la combinación correcta!", out=out)
+
+def imprimir_lista(encabezado, opciones, out=None):
+    print("\n" + encabezado, file=out)
+    for i, o in enumerate(opciones, 1):
+        print(f" {i}) {o}", file=out)
+
+def acusar(caso, pantalla=None, indices=None):
+    """Pide la combinación final usando las opciones del propio caso."""
+    pantalla = pantalla or Pantalla()
+    indices = indices or indices_del_caso(caso)
+    imprimir_inicio_acusacion(out=pantalla)
+    elegidos = []
+    for clave, encabezado, prompt in PASOS_ACUSACION:
+        imprimir_lista(encabezado, indices[clave].opciones, out=pantalla)
+        elegidos.append(pedir_opcion(prompt, indices[clave], pantalla))
+    sospechoso, objeto, lugar = elegidos
     return sospechoso, objeto, lugar
 
-def jugar_un_caso(caso):
-    titulo(caso['nombre'])
-    wrap(PROBLEMA_GENERAL)
-    intentos = 5
-    preguntas_realizadas = 0
+_REDES_POR_CASO = {}
+
+def red_del_caso(caso):
+    """
+    Reglas del caso para el motor (una red por id de caso, compartida entre sesiones):
+      acusa(personaje, culpable) + acusa(objeto, objeto_real) + acusa(lugar, lugar_real)
+          → veredicto(correcto)
+    """
+    red = _REDES_POR_CASO.get(caso['id'])
+    if red is None:
+        red = _REDES_POR_CASO[caso['id']] = MotorReglas()
+        red.agregar_regla(
+            "solucion",
+            [
+                ("acusa", "personaje", caso['culpable']),
+                ("acusa", "objeto", caso['objeto_real']),
+                ("acusa", "lugar", caso['lugar_real']),
+            ],
+            [("veredicto", "correcto")],
+        )
+    return red
+
+def es_correcto(caso, sospechoso, objeto, lugar):
+    memoria = red_del_caso(caso).nueva_memoria()
+    memoria.afirmar(("acusa", "personaje", sospechoso))
+    memoria.afirmar(("acusa", "objeto", objeto))
+    memoria.afirmar(("acusa", "lugar", lugar))
+    memoria.ejecutar()
+    return bool(memoria.consultar(("veredicto", "correcto")))
+
+def imprimir_veredicto(caso, correcto, out=None):
+    hr(out=out)
+    if correcto:
+        print("🎉 ¡ACERTASTE LA COMBINACIÓN CORRECTA!", file=out)
+        wrap("Explicación: " + caso['explicacion'], out=out)
+        print("\nScooby-Doo: “Rooo–rooo!” 🐾", file=out)
+    else:
+        print("💀 Combinación incorrecta… el misterio continuará atormentando el Carnaval.", file=out)
+        print("La respuesta correcta era:", file=out)
+        print(f" - Culpable: {caso['culpable']}", file=out)
+        print(f" - Objeto:   {caso['objeto_real']}", file=out)
+        print(f" - Lugar:    {caso['lugar_real']}", file=out)
+        print("\n¡Inténtalo de nuevo!", file=out)
+
+def imprimir_resumen(caso, partida, out=None):
+    """Al reanudar: repite las pistas que el jugador ya había obtenido."""
+    if not partida['preguntas']:
+        return
+    subtitulo("Partida reanudada — pistas ya obtenidas", out=out)
+    for categoria, item in partida['preguntas']:
+        opciones = caso[CLAVES_CATEGORIA[categoria]]
+        imprimir_pista(list(opciones)[item], opciones, out=out)
+
+def jugar_un_caso(caso, partida=None):
+    """
+    Juega (o reanuda) un caso. `partida` se actualiza en cada paso, así que quien
+    llama puede guardar una instantánea si el juego se interrumpe.
+    """
+    pantalla = Pantalla()
+    indices = indices_del_caso(caso)
+    if partida is None:
+        partida = nueva_partida(caso['id'])
+    cuaderno = Cuaderno(caso, partida)
+    if partida['preguntas']:
+        titulo(caso['nombre'], out=pantalla)
+        imprimir_resumen(caso, partida, out=pantalla)
+    else:
+        imprimir_inicio(caso, out=pantalla)
 
-    while intentos > 0:
-        eleccion = mostrar_menu_principal(intentos)
+    while partida['intentos'] > 0 and not partida['acusando']:
+        eleccion = mostrar_menu_principal(partida['intentos'], pantalla)
         if eleccion == "Acusar ahora":
             break
+        if eleccion == "Cuaderno":
+            consulta = leer_linea(PROMPT_CUADERNO, pantalla)
+            imprimir_busqueda(cuaderno.indice, cuaderno.buscar(consulta), consulta, out=pantalla)
+            continue
 
-        if eleccion == "Personajes":
-            sub_menu_categoria("PERSONAJES", caso['personajes'])
-            preguntas_realizadas += 1
-        elif eleccion == "Lugares":
-            sub_menu_categoria("LUGARES", caso['lugares'])
-            preguntas_realizadas += 1
-        elif eleccion == "Objetos":
-            sub_menu_categoria("OBJETOS", caso['objetos'])
-            preguntas_realizadas += 1
+        if eleccion in CATEGORIA_POR_MENU:
+            nombre_cat, clave = CATEGORIA_POR_MENU[eleccion]
+            item = sub_menu_categoria(nombre_cat, caso[clave], pantalla, indices[clave])
+            partida['preguntas'].append(
+                (CLAVES_CATEGORIA.index(clave), indices[clave].opciones.index(item))
+            )
         else:
-            print("Selección no válida.")
+            print("Selección no válida.", file=pantalla)
             continue
 
-        intentos -= 1
-        if intentos > 0:
-            esperar_enter()
+        partida['intentos'] -= 1
+        if partida['intentos'] > 0:
+            esperar_enter(pantalla)
 
     # Fase de acusación
-    print("\n" + "="*60)
-    print("¡Es momento de ACUSAR!")
-    print("="*60)
-    sospechoso, objeto, lugar = acusar()
+    partida['acusando'] = True
+    sospechoso, objeto, lugar = acusar(caso, pantalla, indices)
 
     # Veredicto
-    correcto = (
-        sospechoso == caso['culpable']
-        and objeto == caso['objeto_real']
-        and lugar == caso['lugar_real']
-    )
+    imprimir_veredicto(caso, es_correcto(caso, sospechoso, objeto, lugar), out=pantalla)
+    pantalla.volcar()
+
+# ============ Validación y paquetes de casos ============
+
+CATEGORIAS = (
+    ('personajes', 'culpable'),
+    ('lugares', 'lugar_real'),
+    ('objetos', 'objeto_real'),
+)
+
+def validar_caso(caso):
+    """
+    Revisa que un caso sea jugable y tenga una única solución.
+    Devuelve la lista de errores encontrados (vacía si el caso es válido).
+    """
+    errores = []
+    for campo in ('nombre', 'explicacion'):
+        if not to_text(caso.get(campo)).strip():
+            errores.append(f"falta '{campo}'")
+    for cat, clave_real in CATEGORIAS:
+        opciones = caso.get(cat) or {}
+        if len(opciones) < 2:
+            errores.append(f"'{cat}' necesita al menos 2 opciones")
+        for nombre, datos in opciones.items():
+            if not to_text(datos.get('pista')).strip():
+                errores.append(f"{cat}/{nombre}: sin pista")
+        reales = [nombre for nombre, datos in opciones.items() if datos.get('real')]
+        if len(reales) != 1:
+            errores.append(f"'{cat}' tiene {len(reales)} opciones reales (debe ser 1)")
+        elif caso.get(clave_real) != reales[0]:
+            errores.append(f"'{clave_real}' ({caso.get(clave_real)}) no coincide con la opción real ({reales[0]})")
+    return errores
+
+def cargar_paquete(ruta):
+    """Lee un paquete de casos JSONL (un caso por línea), p. ej. el de clue_generador.py."""
+    casos = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea:
+                casos.append(json.loads(linea))
+    return casos
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CLUE: El Carnaval Tenebroso")
+    parser.add_argument("--paquete", type=Path, help="paquete JSONL de casos generados")
+    parser.add_argument("--servidor", action="store_true",
+                        help="sirve el juego por TCP (ver clue_servidor.py) en lugar de jugar aquí")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=4000)
+    args = parser.parse_args(argv)
+
+    if args.servidor:
+        import clue_servidor
+        clue_servidor.servir(args.host, args.puerto, args.paquete)
+        return
 
-    hr()
-    if correcto:
-        print("🎉 ¡ACERTASTE LA COMBINACIÓN CORRECTA!")
-        wrap("Explicación: " + caso['explicacion'])
-        print("\nScooby-Doo: “Rooo–rooo!” 🐾")
-    else:
-        print("💀 Combinación incorrecta… el misterio continuará atormentando el Carnaval.")
-        print("La respuesta correcta era:")
-        print(f" - Culpable: {caso['culpable']}")
-        print(f" - Objeto:   {caso['objeto_real']}")
-        print(f" - Lugar:    {caso['lugar_real']}")
-        print("\n¡Inténtalo de nuevo!")
-
-def main():
     random.seed()  # semilla desde el sistema
-    caso = random.choice(CASOS)
-    jugar_un_caso(caso)
+    casos = cargar_paquete(args.paquete) if args.paquete else CASOS
+    casos_por_id = {c['id']: c for c in casos}
+
+    almacen = AlmacenPartidas(RUTA_PARTIDAS)
+    partida = None
+    guardada = almacen.cargar(SESION_LOCAL)
+    if guardada:
+        try:
+            partida = decodificar(guardada)
+        except ValueError:
+            partida = None
+        if partida is not None and partida['caso_id'] in casos_por_id:
+            sel = input("💾 Hay una partida guardada. ¿Reanudarla? (sí/no): ")
+            if normalizar(sel) not in {"si", "s", "y", "yes"}:
+                partida = None
+        else:
+            partida = None
+        almacen.borrar(SESION_LOCAL)
+
+    caso = casos_por_id[partida['caso_id']] if partida else random.choice(casos)
+    partida = partida or nueva_partida(caso['id'])
+    try:
+        jugar_un_caso(caso, partida)
+    except (KeyboardInterrupt, EOFError):
+        almacen.guardar(SESION_LOCAL, codificar(partida))
+        print("\n💾 Partida guardada: se ofrecerá reanudarla la próxima vez.")
+        raise KeyboardInterrupt
+    finally:
+        almacen.cerrar()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks del núcleo de P3_akinator con catálogos sintéticos
+Descripción:
+ - generar_catalogo() arma una base como knowledge.json con N coches (de 1k a 10M):
+   'colisiones' es la probabilidad de que un coche repita el camino de otro ya creado
+   (grupo sin separar) y 'densidad_reglas' la de que cada nodo del trie de desempate
+   tenga pregunta especial (duplex_rules).
+ - Para cada tamaño mide find_candidates, suggest_nearest, tiebreak_with_rule,
+   load_db y save_db (estas dos sobre un knowledge.json temporal con KnowledgeStore):
+   operaciones/s, latencia (media, p50, p95, p99, máx.) y pico de memoria de una llamada.
+ - Escribe los resultados en JSON; con --base compara contra una corrida guardada y
+   termina con código 1 si alguna operación empeoró más que --tolerancia.
+
+Uso:
+    python akinator_bench.py --tamaños 1000 100000 --salida bench.json
+    python akinator_bench.py --tamaños 1000 100000 --guardar-base bench_base.json
+    python akinator_bench.py --tamaños 1000 100000 --base bench_base.json --tolerancia 0.25
+(10M coches necesitan varios GB de memoria y minutos por operación de disco.)
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import P3_akinator as ak
+
+OPERACIONES = ("find_candidates", "suggest_nearest", "tiebreak_with_rule", "load_db", "save_db")
+ORIGENES = ("Alemania", "Italia", "Japón", "Estados Unidos", "Reino Unido", "Francia")
+TRACCIONES = ("trasera", "delantera", "total")
+
+# --------------------------
+# Catálogo sintético
+# --------------------------
+def generar_reglas(n: int, densidad: float, rng: random.Random) -> dict:
+    """Trie de preguntas especiales bajo los 32 patrones, hasta ~1 hoja por coche."""
+    prof_max = 5 + max(1, math.ceil(math.log2(max(n, 64) / 32)))
+    reglas = {}
+    pila = [ak.index_pattern(p) for p in range(32)]
+    while pila:
+        bits = pila.pop()
+        if len(bits) < prof_max and rng.random() < densidad:
+            reglas[ak.bits_to_key(bits)] = {"question": f"¿Pregunta sintética {len(reglas) + 1}?"}
+            pila.extend((bits + (0,), bits + (1,)))
+    return reglas
+
+def generar_catalogo(n: int, colisiones: float = 0.2, densidad_reglas: float = 0.3, semilla: int = 0) -> dict:
+    rng = random.Random(semilla)
+    reglas = generar_reglas(n, densidad_reglas, rng)
+    cars = []
+    for i in range(n):
+        if cars and rng.random() < colisiones:
+            bits = cars[rng.randrange(len(cars))]["bits"]
+        else:
+            camino = [rng.randint(0, 1) for _ in range(5)]
+            while ak.bits_to_key(camino) in reglas:   # bajar por el trie hasta una hoja
+                camino.append(rng.randint(0, 1))
+            bits = ak.bits_to_key(camino)
+        cars.append({
+            "name": f"Sintético {i + 1}",
+            "bits": bits,
+            "img": None,
+            "year": rng.randint(1950, 2025),
+            "hp": rng.randint(60, 1200),
+            "origin": rng.choice(ORIGENES),
+            "drivetrain": rng.choice(TRACCIONES),
+        })
+    return {"cars": cars, "duplex_rules": reglas}
+
+# --------------------------
+# Medición
+# --------------------------
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+def medir(funcion, entradas, repeticiones: int, segundos: float) -> dict:
+    """
+    Llama a funcion(*entrada) (rotando las entradas) hasta `repeticiones` veces o hasta
+    agotar `segundos` (al menos una vez); después mide el pico de memoria de una llamada.
+    """
+    latencias = []
+    inicio = time.perf_counter()
+    while len(latencias) < repeticiones:
+        args = entradas[len(latencias) % len(entradas)]
+        t0 = time.perf_counter()
+        funcion(*args)
+        latencias.append(time.perf_counter() - t0)
+        if time.perf_counter() - inicio >= segundos:
+            break
+    total = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    funcion(*entradas[0])
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = [x * 1000 for x in latencias]
+    return {
+        "llamadas": len(ms),
+        "ops_s": len(ms) / total,
+        "lat_ms": {
+            "media": statistics.mean(ms),
+            "p50": percentil(ms, 50),
+            "p95": percentil(ms, 95),
+            "p99": percentil(ms, 99),
+            "max": max(ms),
+        },
+        "memoria_pico_kb": pico / 1024,
+    }
+
+def entradas_desempate(db: dict, rng: random.Random, muestras: int = 64) -> list:
+    """(db, camino, candidatos, respuesta) para caminos con pregunta especial."""
+    claves = rng.sample(sorted(db["duplex_rules"]), min(muestras, len(db["duplex_rules"])))
+    caminos = {ak.parse_bits_str(k): [] for k in claves}
+    for c in db["cars"]:   # una pasada: cada coche cae en los caminos que son prefijo suyo
+        cb = ak.parse_bits_str(c["bits"])
+        for largo in range(5, len(cb) + 1):
+            grupo = caminos.get(cb[:largo])
+            if grupo is not None:
+                grupo.append(c)
+    return [(db, camino, candidatos, rng.randint(0, 1)) for camino, candidatos in caminos.items()]
+
+def correr_tamaño(n: int, args, rng: random.Random, carpeta: Path) -> list:
+    t0 = time.perf_counter()
+    db = generar_catalogo(n, args.colisiones, args.densidad_reglas, args.semilla)
+    print(f"\n== {n} coches, {len(db['duplex_rules'])} reglas (generado en {time.perf_counter() - t0:.1f}s)")
+
+    patrones = [tuple(rng.randint(0, 1) for _ in range(5)) for _ in range(64)]
+    store = ak.KnowledgeStore(carpeta / f"knowledge_{n}.json")
+    store.save(db)
+    casos = {
+        "find_candidates": (ak.find_candidates, [(db, p) for p in patrones]),
+        "suggest_nearest": (ak.suggest_nearest, [(db, p) for p in patrones]),
+        "tiebreak_with_rule": (ak.tiebreak_with_rule, entradas_desempate(db, rng) if db["duplex_rules"] else []),
+        "load_db": (store.load, [()]),
+        "save_db": (store.save, [(db,)]),
+    }
+
+    resultados = []
+    for operacion in args.operaciones:
+        funcion, entradas = casos[operacion]
+        if not entradas:
+            print(f"  {operacion:<20} (sin reglas: se omite)")
+            continue
+        r = medir(funcion, entradas, args.repeticiones, args.segundos)
+        lat = r["lat_ms"]
+        print(f"  {operacion:<20} {r['ops_s']:>10.1f} ops/s  p50={lat['p50']:.3f} p95={lat['p95']:.3f} "
+              f"p99={lat['p99']:.3f} ms  memoria={r['memoria_pico_kb']:.0f} KB")
+        resultados.append({"coches": n, "operacion": operacion, **r})
+    return resultados
+
+# --------------------------
+# Comparación con la base
+# --------------------------
+def comparar(actual: dict, base: dict, tolerancia: float) -> list:
+    """
+    Regresiones: p50, p95 o memoria por encima de base × (1 + tolerancia). El p95 sólo
+    cuenta con al menos 20 llamadas en ambas corridas (con menos es puro ruido).
+    """
+    previos = {(r["coches"], r["operacion"]): r for r in base["resultados"]}
+    regresiones = []
+    for r in actual["resultados"]:
+        b = previos.get((r["coches"], r["operacion"]))
+        if b is None:
+            continue
+        percentiles = ("p50", "p95") if min(r["llamadas"], b["llamadas"]) >= 20 else ("p50",)
+        medidas = [(f"lat {p}", r["lat_ms"][p], b["lat_ms"][p]) for p in percentiles]
+        medidas.append(("memoria", r["memoria_pico_kb"], b["memoria_pico_kb"]))
+        for nombre, ahora, antes in medidas:
+            if antes > 0 and ahora > antes * (1 + tolerancia):
+                regresiones.append(f"{r['operacion']} ({r['coches']} coches): {nombre} "
+                                   f"{antes:.3f} → {ahora:.3f} (+{(ahora / antes - 1) * 100:.0f}%)")
+    return regresiones
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del núcleo del Akinator de coches")
+    parser.add_argument("--tamaños", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="coches por catálogo (p. ej. 1000 10000000)")
+    parser.add_argument("--colisiones", type=float, default=0.2,
+                        help="probabilidad de que un coche repita el camino de otro")
+    parser.add_argument("--densidad-reglas", type=float, default=0.3,
+                        help="probabilidad de pregunta especial por nodo del trie")
+    parser.add_argument("--operaciones", nargs="+", choices=OPERACIONES, default=list(OPERACIONES))
+    parser.add_argument("--repeticiones", type=int, default=200, help="llamadas máximas por operación")
+    parser.add_argument("--segundos", type=float, default=2.0, help="tiempo máximo por operación")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", type=Path, help="JSON con los resultados")
+    parser.add_argument("--guardar-base", type=Path, help="guarda los resultados como base de comparación")
+    parser.add_argument("--base", type=Path, help="base con la que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="empeoramiento admitido (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.semilla)
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="akinator_bench_") as carpeta:
+        for n in args.tamaños:
+            resultados.extend(correr_tamaño(n, args, rng, Path(carpeta)))
+
+    informe = {
+        "meta": {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": {"colisiones": args.colisiones, "densidad_reglas": args.densidad_reglas,
+                           "repeticiones": args.repeticiones, "segundos": args.segundos,
+                           "semilla": args.semilla},
+        },
+        "resultados": resultados,
+    }
+    for ruta in (args.salida, args.guardar_base):
+        if ruta:
+            ruta.write_text(json.dumps(informe, ensure_ascii=False, indent=2), encoding="utf-8")
+            print(f"\nResultados en {ruta}")
+
+    if args.base:
+        regresiones = comparar(informe, json.loads(args.base.read_text(encoding="utf-8")), args.tolerancia)
+        if regresiones:
+            print(f"\n❌ {len(regresiones)} regresión(es) contra {args.base}:")
+            for r in regresiones:
+                print(f" • {r}")
+            sys.exit(1)
+        print(f"\n✅ Sin regresiones contra {args.base} (tolerancia {args.tolerancia:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verificación del descargador de imágenes de P3_akinator contra un servidor local
+Descripción:
+ - Levanta un servidor HTTP/1.1 keep-alive de prueba en 127.0.0.1 (un hilo por conexión)
+   con rutas que simulan los casos que maneja ImageDownloader:
+     /img/N     imagen (bytes) con keep-alive
+     /inestable 503 las dos primeras veces, después 200
+     /mover     302 hacia /img/0
+     /falta     404 (no se debe reintentar)
+     /lenta     tarda un poco; se mide cuántas hay en curso a la vez
+     /cerrar    responde y cierra el socket sin avisar (conexión ociosa muerta en el pool)
+     /sin-head  405 ante HEAD (check() debe probar con GET)
+ - Comprueba reuso de conexiones, reintentos con espera ante 5xx, redirecciones,
+   ausencia de reintentos ante 4xx, el tope de descargas por host y el reemplazo de
+   una conexión reusada que el servidor cerró; y check() (HEAD) para revisar enlaces sin
+   bajar la imagen.
+ - Imprime ✅/❌ por comprobación y termina con código 1 si alguna falla.
+
+Uso:
+    python akinator_descargas.py
+    python akinator_descargas.py --por-host 3 --descargas 50
+"""
+
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import P3_akinator as ak
+
+CUERPO = b"\xff\xd8" + b"x" * 2048   # no hace falta que sea una imagen válida: se miden los bytes
+ESPERA_LENTA = 0.05                   # segundos que tarda /lenta
+
+class ServidorPrueba(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ManejadorPrueba)
+        self.visitas = Counter()   # ruta → pedidos recibidos
+        self.metodos = Counter()   # GET / HEAD → pedidos recibidos
+        self.conexiones = 0
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class ManejadorPrueba(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"     # keep-alive salvo que se pida cerrar
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.conexiones += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, estado: int, cuerpo: bytes = b"", encabezados=()):
+        self.send_response(estado)
+        for k, v in encabezados:
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.visitas[self.path] += 1
+            srv.metodos[self.command] += 1
+            visitas = srv.visitas[self.path]
+        if self.path == "/sin-head" and self.command == "HEAD":
+            self._responder(405)
+        elif self.path.startswith("/img/") or self.path == "/sin-head":
+            self._responder(200, CUERPO, [("Content-Type", "image/jpeg")])
+        elif self.path == "/inestable":
+            self._responder(503 if visitas <= 2 else 200, CUERPO if visitas > 2 else b"")
+        elif self.path == "/mover":
+            self._responder(302, encabezados=[("Location", "/img/0")])
+        elif self.path == "/lenta":
+            with srv.lock:
+                srv.en_curso += 1
+                srv.max_en_curso = max(srv.max_en_curso, srv.en_curso)
+            time.sleep(ESPERA_LENTA)
+            with srv.lock:
+                srv.en_curso -= 1
+            self._responder(200, CUERPO)
+        elif self.path == "/cerrar":
+            self._responder(200, CUERPO)
+            self.close_connection = True   # sin "Connection: close": el cliente cree que sigue viva
+        else:
+            self._responder(404)
+
+    do_HEAD = do_GET
+
+# --------------------------
+# Comprobaciones
+# --------------------------
+def comprobar(resultados: list, nombre: str, ok: bool, detalle: str):
+    resultados.append(ok)
+    print(f"{'✅' if ok else '❌'} {nombre}: {detalle}")
+
+def correr(args) -> bool:
+    srv = ServidorPrueba()
+    threading.Thread(target=srv.serve_forever, name="servidor-prueba", daemon=True).start()
+    nuevo = lambda: ak.ImageDownloader(per_host=args.por_host, backoff=0.01, max_backoff=0.05, timeout=5)
+    resultados = []
+    try:
+        d = nuevo()
+        t0 = time.perf_counter()
+        for i in range(args.descargas):
+            d.fetch(f"{srv.base}/img/{i}")
+        ms = (time.perf_counter() - t0) * 1000 / args.descargas
+        comprobar(resultados, "reuso de conexión", d.connects == 1 and srv.conexiones == 1,
+                  f"{args.descargas} descargas, {d.connects} conexión(es) abiertas ({ms:.2f} ms c/u)")
+
+        antes = srv.visitas["/inestable"]
+        datos = d.fetch(f"{srv.base}/inestable")
+        comprobar(resultados, "reintento ante 503", datos == CUERPO and srv.visitas["/inestable"] - antes == 3,
+                  f"{srv.visitas['/inestable'] - antes} pedidos hasta el 200")
+
+        datos = d.fetch(f"{srv.base}/mover")
+        comprobar(resultados, "redirección", datos == CUERPO and srv.visitas["/mover"] == 1,
+                  "302 → /img/0 seguido")
+
+        try:
+            d.fetch(f"{srv.base}/falta")
+            error = None
+        except ak.DownloadError as e:
+            error = e
+        comprobar(resultados, "sin reintento ante 404",
+                  error is not None and not error.retry and srv.visitas["/falta"] == 1,
+                  f"{srv.visitas['/falta']} pedido(s), error: {error}")
+
+        d = nuevo()
+        with ThreadPoolExecutor(max_workers=args.por_host * 4) as pool:
+            list(pool.map(lambda _: d.fetch(f"{srv.base}/lenta"), range(args.por_host * 8)))
+        comprobar(resultados, "tope por host", srv.max_en_curso <= args.por_host,
+                  f"máximo {srv.max_en_curso} a la vez (tope {args.por_host})")
+
+        d = nuevo()
+        d.fetch(f"{srv.base}/cerrar")
+        time.sleep(0.05)   # que el servidor termine de cerrar el socket
+        antes = srv.visitas["/img/x"]
+        datos = d.fetch(f"{srv.base}/img/x")
+        comprobar(resultados, "conexión ociosa cerrada por el servidor",
+                  datos == CUERPO and d.connects == 2 and srv.visitas["/img/x"] - antes == 1,
+                  f"{d.connects} conexiones, {srv.visitas['/img/x'] - antes} pedido(s) a /img/x")
+
+        d = nuevo()
+        antes = srv.metodos.copy()
+        d.check(f"{srv.base}/img/0")
+        d.check(f"{srv.base}/sin-head")
+        try:
+            d.check(f"{srv.base}/falta")
+            error = None
+        except ak.DownloadError as e:
+            error = e
+        metodos = srv.metodos - antes
+        comprobar(resultados, "revisión con HEAD",
+                  metodos["HEAD"] == 3 and metodos["GET"] == 1 and error is not None and error.status == 404,
+                  f"{metodos['HEAD']} HEAD, {metodos['GET']} GET (por el 405), enlace caído: {error}")
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    return all(resultados)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica pool, reintentos y límites del descargador de imágenes")
+    parser.add_argument("--por-host", type=int, default=3, help="descargas simultáneas por host")
+    parser.add_argument("--descargas", type=int, default=50, help="descargas seguidas para medir el reuso")
+    args = parser.parse_args(argv)
+    if not correr(args):
+        sys.exit(1)
+    print("\nDescargador OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cliente de prueba de carga para clue_servidor.py
+Descripción:
+ - Abre muchas conexiones concurrentes y juega en cada una una partida guionada
+   (preguntas al azar y acusación final), respondiendo a cada prompt del servidor.
+ - Mide la latencia entre cada respuesta enviada y el siguiente prompt recibido.
+ - Al final imprime sesiones completadas, errores, sesiones/s y percentiles.
+
+Uso:
+    python clue_servidor.py --puerto 4000 &
+    python clue_carga.py --puerto 4000 --sesiones 5000 --concurrencia 2000
+(Para miles de conexiones puede hacer falta subir el límite de descriptores: ulimit -n)
+"""
+
+import argparse
+import asyncio
+import codecs
+import random
+import statistics
+import time
+
+# Todos los prompts del juego terminan así (sin salto de línea)
+FINALES_PROMPT = (": ", "] ")
+
+def guion_aleatorio(rng):
+    """Respuestas de una partida completa: 5 preguntas y la acusación."""
+    lineas = [""]                               # nombre de detective: anónimo
+    for i in range(5):
+        lineas.append(str(rng.randint(1, 3)))   # Personajes / Lugares / Objetos
+        lineas.append(str(rng.randint(1, 5)))   # ítem de la categoría
+        if i < 4:
+            lineas.append("")                   # [Presiona ENTER para continuar]
+    lineas.extend(str(rng.randint(1, 5)) for _ in range(3))
+    return lineas
+
+async def sesion_guionada(host, puerto, guion, latencias):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    decodificador = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pasos = iter(guion)
+    cola = ""
+    enviado = None
+    try:
+        while True:
+            bloque = await reader.read(4096)
+            if not bloque:
+                return
+            cola = (cola + decodificador.decode(bloque))[-8:]
+            if not cola.endswith(FINALES_PROMPT):
+                continue
+            ahora = time.perf_counter()
+            if enviado is not None:
+                latencias.append(ahora - enviado)
+            linea = next(pasos, None)
+            if linea is None:
+                return
+            writer.write((linea + "\r\n").encode("utf-8"))
+            await writer.drain()
+            enviado = time.perf_counter()
+            cola = ""
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+async def correr(host, puerto, sesiones, concurrencia, semilla):
+    rng = random.Random(semilla)
+    limite = asyncio.Semaphore(concurrencia)
+    latencias = []
+    errores = []
+
+    async def una(guion):
+        async with limite:
+            try:
+                await sesion_guionada(host, puerto, guion, latencias)
+            except (OSError, asyncio.IncompleteReadError) as e:
+                errores.append(e)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(guion_aleatorio(rng)) for _ in range(sesiones)))
+    duracion = time.perf_counter() - inicio
+
+    completadas = sesiones - len(errores)
+    print(f"Sesiones completadas: {completadas}/{sesiones}  (errores: {len(errores)})")
+    print(f"Duración: {duracion:.2f}s  →  {completadas / duracion:.1f} sesiones/s")
+    if latencias:
+        ms = [x * 1000 for x in latencias]
+        print(f"Latencia por prompt (ms): media={statistics.mean(ms):.2f} "
+              f"p50={percentil(ms, 50):.2f} p95={percentil(ms, 95):.2f} p99={percentil(ms, 99):.2f}")
+    if errores:
+        print(f"Primer error: {errores[0]!r}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor CLUE")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=4000)
+    parser.add_argument("--sesiones", type=int, default=1000, help="partidas totales")
+    parser.add_argument("--concurrencia", type=int, default=500, help="conexiones abiertas a la vez")
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args(argv)
+    asyncio.run(correr(args.host, args.puerto, args.sesiones, args.concurrencia, args.semilla))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cuaderno de pistas con índice invertido — CLUE: El Carnaval Tenebroso
+Descripción:
+ - IndiceInvertido: tokens plegados (sin acentos ni mayúsculas) → lista ordenada de
+   documentos. Cada documento es un texto de un caso: 'pista', 'pista_detallada'
+   o 'explicacion'. Las palabras con guion se indexan por partes y unidas, así
+   'micro-partículas' y 'micropartículas' se encuentran igual.
+ - La última palabra de la consulta se trata como prefijo (búsqueda al teclear):
+   el vocabulario está ordenado y el rango de prefijo se encuentra con bisect. Los
+   prefijos de una o dos letras se unen una sola vez y se guardan.
+ - indice_del_caso() construye el índice de un caso una sola vez y lo comparte
+   entre sesiones; Cuaderno restringe la búsqueda a las pistas que el jugador ya vio.
+ - Para moderadores: búsqueda sobre todo un corpus (CASOS o un paquete JSONL).
+
+Uso (moderadores):
+    python clue_cuaderno.py "ceniza etérea"
+    python clue_cuaderno.py --paquete casos_generados.jsonl "micro-partículas"
+"""
+
+import argparse
+import re
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+
+CLAVES_CATEGORIA = ('personajes', 'lugares', 'objetos')  # mismo orden que las instantáneas
+CAMPOS_OPCION = ('pista', 'pista_detallada')
+LARGO_FRAGMENTO = 160
+LARGO_PREFIJO_CORTO = 2     # prefijos de hasta este largo abarcan mucho vocabulario: se guardan
+
+_PALABRA = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_GUIONES = str.maketrans({c: "-" for c in "‐‑‒–"})
+
+def plegar(texto) -> str:
+    """Quita acentos y mayúsculas: 'Etérea' → 'eterea'."""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+
+def tokens_texto(texto):
+    """Tokens a indexar: las partes de cada palabra con guion y también la palabra unida."""
+    for palabra in _PALABRA.findall(plegar(texto).translate(_GUIONES)):
+        partes = palabra.split("-")
+        yield from partes
+        if len(partes) > 1:
+            yield "".join(partes)
+
+def tokens_consulta(texto):
+    """Tokens de una consulta: las palabras con guion se buscan unidas."""
+    return [palabra.replace("-", "") for palabra in _PALABRA.findall(plegar(texto).translate(_GUIONES))]
+
+def _interseccion(a, b):
+    """Intersección de dos listas ordenadas de enteros."""
+    if len(a) > len(b):
+        a, b = b, a
+    res = []
+    j = 0
+    for x in a:
+        j = bisect_left(b, x, j)
+        if j == len(b):
+            break
+        if b[j] == x:
+            res.append(x)
+    return res
+
+class IndiceInvertido:
+    """Índice invertido sobre los textos de uno o muchos casos."""
+
+    def __init__(self):
+        self.docs = []         # (caso_id, categoria, item, opcion, campo, texto)
+        self.doc_de = {}       # (caso_id, categoria, item, campo) → doc id
+        self._postings = {}    # token → [doc ids] (ordenados)
+        self._vocabulario = None
+        self._cortos = {}      # prefijo corto → docs (unión ya hecha)
+
+    def agregar(self, caso_id, categoria, item, opcion, campo, texto):
+        doc = len(self.docs)
+        self.docs.append((caso_id, categoria, item, opcion, campo, texto))
+        self.doc_de[(caso_id, categoria, item, campo)] = doc
+        for token in set(tokens_texto(texto)):
+            self._postings.setdefault(token, []).append(doc)
+        self._vocabulario = None
+        self._cortos = {}
+        return doc
+
+    def agregar_caso(self, caso):
+        for categoria, clave in enumerate(CLAVES_CATEGORIA):
+            for item, (opcion, datos) in enumerate(caso[clave].items()):
+                for campo in CAMPOS_OPCION:
+                    if datos.get(campo):
+                        self.agregar(caso['id'], categoria, item, opcion, campo, str(datos[campo]))
+        self.agregar(caso['id'], None, None, "Explicación", 'explicacion', str(caso['explicacion']))
+
+    @classmethod
+    def desde_casos(cls, casos):
+        indice = cls()
+        for caso in casos:
+            indice.agregar_caso(caso)
+        return indice
+
+    def _prefijo(self, prefijo):
+        corto = len(prefijo) <= LARGO_PREFIJO_CORTO
+        if corto and prefijo in self._cortos:
+            return self._cortos[prefijo]
+        docs = self._expandir(prefijo)
+        if corto:
+            self._cortos[prefijo] = docs
+        return docs
+
+    def precalcular_cortos(self):
+        """Une de antemano los prefijos cortos del vocabulario (las primeras teclas de una búsqueda)."""
+        prefijos = {palabra[:largo] for palabra in self._postings
+                    for largo in range(1, LARGO_PREFIJO_CORTO + 1) if len(palabra) >= largo}
+        for prefijo in sorted(prefijos):
+            self._prefijo(prefijo)
+
+    def _expandir(self, prefijo):
+        if self._vocabulario is None:
+            self._vocabulario = sorted(self._postings)
+        vocab = self._vocabulario
+        # rango [prefijo, siguiente prefijo): todas las palabras que empiezan así, sin tope
+        i = bisect_left(vocab, prefijo)
+        j = bisect_left(vocab, prefijo[:-1] + chr(ord(prefijo[-1]) + 1), i)
+        if j - i == 1:
+            return self._postings[vocab[i]]
+        return sorted(set().union(*(self._postings[palabra] for palabra in vocab[i:j])))
+
+    def buscar(self, consulta, permitidos=None):
+        """
+        Doc ids que contienen todas las palabras de la consulta (la última como prefijo).
+        `permitidos` (set de doc ids) limita el resultado, p. ej. al cuaderno del jugador.
+        """
+        tokens = tokens_consulta(consulta)
+        if not tokens:
+            return sorted(permitidos) if permitidos is not None else []
+        listas = [self._postings.get(t, []) for t in tokens[:-1]]
+        listas.append(self._prefijo(tokens[-1]))
+        if permitidos is not None:
+            listas.append(sorted(permitidos))
+        listas.sort(key=len)
+        res = listas[0]
+        for otra in listas[1:]:
+            if not res:
+                break
+            res = _interseccion(res, otra)
+        return res
+
+    def fragmento(self, doc, consulta, largo=LARGO_FRAGMENTO):
+        """Recorte del texto alrededor de la primera coincidencia."""
+        texto = " ".join(self.docs[doc][5].split())
+        plegado = plegar(texto)
+        # el token completo, o su comienzo si en el texto aparece partido por un guion
+        buscados = [t for token in tokens_consulta(consulta) for t in (token, token[:6])]
+        pos = min((p for p in (plegado.find(t) for t in buscados) if p >= 0), default=0)
+        inicio = max(0, pos - largo // 3)
+        recorte = texto[inicio:inicio + largo]
+        return ("…" if inicio else "") + recorte + ("…" if inicio + largo < len(texto) else "")
+
+# ============ Índices compartidos por caso ============
+
+_INDICES_POR_CASO = {}
+
+def indice_del_caso(caso):
+    """Índice del caso; se construye una vez por id de caso y se comparte entre sesiones."""
+    indice = _INDICES_POR_CASO.get(caso['id'])
+    if indice is None:
+        indice = _INDICES_POR_CASO[caso['id']] = IndiceInvertido.desde_casos([caso])
+        indice.precalcular_cortos()
+    return indice
+
+class Cuaderno:
+    """Las pistas que un jugador ya vio, buscables con el índice compartido del caso."""
+
+    def __init__(self, caso, partida):
+        self.caso = caso
+        self.partida = partida   # el cuaderno se deriva de partida['preguntas']
+        self.indice = indice_del_caso(caso)
+
+    def vistos(self):
+        docs = set()
+        for categoria, item in self.partida['preguntas']:
+            datos = list(self.caso[CLAVES_CATEGORIA[categoria]].values())[item]
+            campo = 'pista_detallada' if datos.get('pista_detallada') else 'pista'
+            doc = self.indice.doc_de.get((self.caso['id'], categoria, item, campo))
+            if doc is not None:
+                docs.add(doc)
+        return docs
+
+    def buscar(self, consulta):
+        return self.indice.buscar(consulta, permitidos=self.vistos())
+
+def imprimir_busqueda(indice, docs, consulta, out=None):
+    if not docs:
+        print("📓 Nada en el cuaderno coincide con esa búsqueda.", file=out)
+        return
+    print(f"📓 {len(docs)} coincidencia(s):", file=out)
+    for doc in docs:
+        opcion = indice.docs[doc][3]
+        print(f" • {opcion}: {indice.fragmento(doc, consulta)}", file=out)
+
+def main(argv=None):
+    import P4_clue as clue
+    parser = argparse.ArgumentParser(description="Búsqueda de texto completo en las pistas de CLUE")
+    parser.add_argument("consulta")
+    parser.add_argument("--paquete", type=Path, help="paquete JSONL de casos generados")
+    parser.add_argument("--limite", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    casos = clue.cargar_paquete(args.paquete) if args.paquete else clue.CASOS
+    indice = IndiceInvertido.desde_casos(casos)
+    docs = indice.buscar(args.consulta)
+    print(f"{len(docs)} documento(s) en {len(casos)} caso(s)")
+    for doc in docs[:args.limite]:
+        caso_id, _, _, opcion, campo, _ = indice.docs[doc]
+        print(f"[caso {caso_id}] {opcion} ({campo}): {indice.fragmento(doc, args.consulta)}")
+
+if __name__ == "__main__":
+    main()
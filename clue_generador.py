@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generador procedural de casos — CLUE: El Carnaval Tenebroso
+Descripción:
+ - Construye casos nuevos a partir de plantillas de personajes, lugares (con varias
+   zonas cada uno) y objetos. Cada pista enuncia hechos: qué rastros llevaba un
+   sospechoso y dónde lo vieron, qué rastros aparecieron en un lugar y qué rastro
+   deja cada objeto. Las opciones falsas comparten rastros y lugares con la real,
+   así que ninguna pista sola delata la solución: hay que cruzar varias.
+ - La solución es la única combinación (personaje, objeto, lugar) en la que el rastro
+   del objeto aparece en el lugar y en el sospechoso, y el sospechoso estuvo en ese
+   lugar. Cada caso se valida con P4_clue.validar_caso y además se recorren todas
+   las combinaciones leyendo los hechos del texto de las pistas: se descarta la
+   semilla si encaja más de una (o si la que encaja no es la real).
+ - Cada semilla corresponde a una solución distinta (hay TOTAL_SOLUCIONES); el
+   paquete no repite soluciones y sigue probando semillas hasta juntar la cantidad
+   pedida.
+ - Generación y validación corren en un pool de procesos; los casos válidos se
+   escriben en streaming a un paquete JSONL (un caso por línea) conforme llegan.
+
+Uso:
+    python clue_generador.py --cantidad 5000 --salida casos_generados.jsonl
+    python P4_clue.py --paquete casos_generados.jsonl
+"""
+
+import argparse
+import json
+import random
+import sys
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+
+from P4_clue import validar_caso
+
+# Los casos generados usan ids a partir de aquí (los casos escritos a mano usan 1..N).
+ID_BASE_GENERADOS = 1000
+OPCIONES_POR_CATEGORIA = 5
+INTENTOS_UNICIDAD = 50   # sorteos de hechos por sospechoso hasta que no encaje de más
+
+# ============ Plantillas ============
+# Personajes y objetos aportan nombre, descripción corta y un rasgo (frase de ambiente
+# sin hechos). Los lugares además tienen zonas: cada zona es una opción distinta.
+# Los rasgos no deben nombrar rastros ni lugares: la validación lee los hechos del texto.
+
+PLANTILLAS_PERSONAJES = [
+    {
+        'nombre': "Madame Murk — Bruja de Humo",
+        'desc': "Ilusionista de humo morado y sombras múltiples.",
+        'rasgo': "Juró que pasó la noche practicando trucos de humo.",
+    },
+    {
+        'nombre': "Rollo Riptide — Hombre Sirena",
+        'desc': "Guardia acuático del lago, siempre húmedo.",
+        'rasgo': "Dejó charcos de agua salada por donde pasó.",
+    },
+    {
+        'nombre': "Gargant Grimm — Gárgola de Piedra",
+        'desc': "Centinela pétreo de la montaña rusa.",
+        'rasgo': "Asegura que no se movió de su nido en toda la noche.",
+    },
+    {
+        'nombre': "Cipher Claw — Hombre Sombra Hacker",
+        'desc': "Sombra que hackea sensores.",
+        'rasgo': "Dice que estuvo reparando cámaras con sus herramientas de plástico.",
+    },
+    {
+        'nombre': "Jinx Jingler — Payaso Espectral",
+        'desc': "Bromista de risas fantasmales.",
+        'rasgo': "Perdió su sombrero durante el apagón y no sabe dónde.",
+    },
+    {
+        'nombre': "Doctora Dread — Relojera Maldita",
+        'desc': "Coleccionista de relojes que nunca marcan la hora.",
+        'rasgo': "Uno de sus relojes se detuvo justo a la hora del robo.",
+    },
+    {
+        'nombre': "Barón Bramble — Espantapájaros Errante",
+        'desc': "Espantapájaros que camina cuando nadie mira.",
+        'rasgo': "Los visitantes se tomaron fotos con él casi toda la noche.",
+    },
+    {
+        'nombre': "Lady Lumen — Fantasma de Neón",
+        'desc': "Espectro que brilla con luz de feria.",
+        'rasgo': "Su resplandor parpadeó un par de veces durante el show.",
+    },
+    {
+        'nombre': "Mortimer Muffle — Mimo Silencioso",
+        'desc': "Nadie ha oído nunca su voz.",
+        'rasgo': "Contestó todas las preguntas con señas y una sonrisa pintada.",
+    },
+    {
+        'nombre': "Greta Gourd — Calabaza Parlante",
+        'desc': "Vendedora de dulces con cabeza de calabaza.",
+        'rasgo': "Su vela interior se apagó un rato, justo cuando nadie miraba.",
+    },
+    {
+        'nombre': "Zeke Zephyr — Zanquero Fantasma",
+        'desc': "Camina sobre zancos por encima de la multitud.",
+        'rasgo': "Desde lo alto lo ve todo, pero dice que esa noche no vio nada.",
+    },
+    {
+        'nombre': "Nana Noctámbula — Adivina Ciega",
+        'desc': "Lee la fortuna en hojas de té frío.",
+        'rasgo': "Predijo el robo la semana pasada y nadie le creyó.",
+    },
+]
+
+PLANTILLAS_LUGARES = [
+    {
+        'nombre': "Carpa de Magia y Apariciones",
+        'desc': "Luces púrpura y humo plateado.",
+        'zonas': ("escenario", "camerinos", "bodega de utilería"),
+        'rasgo': "Entre la utilería rota quedaba humo de espectáculo.",
+    },
+    {
+        'nombre': "Casa de los Espejos Distorsionados",
+        'desc': "Reflejos que engañan a cualquiera.",
+        'zonas': ("pasillo curvo", "sala infinita", "salida trasera"),
+        'rasgo': "Un espejo curvo estaba fuera de su marco.",
+    },
+    {
+        'nombre': "Montaña Rusa “La Serpiente Nocturna”",
+        'desc': "Vías retorcidas y gritos constantes.",
+        'zonas': ("andén", "vagón de mantenimiento", "túnel del rizo"),
+        'rasgo': "Un panel de servicio había sido forzado.",
+    },
+    {
+        'nombre': "Lago de Botes Chocones",
+        'desc': "Agua negra que absorbe la luz.",
+        'zonas': ("muelle", "bote hundido", "caseta del guardia"),
+        'rasgo': "El agua seguía agitada mucho después del cierre.",
+    },
+    {
+        'nombre': "Taller de Premios y Muñecos",
+        'desc': "Peluches de ojos cosidos.",
+        'zonas': ("mostrador", "almacén de peluches", "mesa de costura"),
+        'rasgo': "Un oso gigante tenía una costura abierta.",
+    },
+    {
+        'nombre': "Túnel del Sonido",
+        'desc': "Silencio anómalo y marcas de ondas.",
+        'zonas': ("entrada", "cámara del eco", "cuarto de bocinas"),
+        'rasgo': "Los ecos sonaban con un segundo de retraso.",
+    },
+    {
+        'nombre': "Rueda de la Fortuna Menguante",
+        'desc': "Góndolas que crujen en lo alto.",
+        'zonas': ("taquilla", "góndola más alta", "cuarto de motores"),
+        'rasgo': "Una góndola tenía la cerradura rayada.",
+    },
+    {
+        'nombre': "Cementerio de Atracciones",
+        'desc': "Juegos oxidados y niebla baja.",
+        'zonas': ("portón", "carrusel abandonado", "fosa de chatarra"),
+        'rasgo': "La tierra estaba removida en varios puntos.",
+    },
+    {
+        'nombre': "Tren Fantasma de Medianoche",
+        'desc': "Vagones que chirrían en la oscuridad.",
+        'zonas': ("estación", "último vagón", "galería de esqueletos"),
+        'rasgo': "Uno de los esqueletos había cambiado de pose.",
+    },
+    {
+        'nombre': "Puesto de Tiro al Blanco Embrujado",
+        'desc': "Patos de lata que esquivan las balas.",
+        'zonas': ("barra", "estante de premios", "trastienda"),
+        'rasgo': "Faltaba un pato de lata en la fila de arriba.",
+    },
+    {
+        'nombre': "Carrusel de Caballos Sin Cabeza",
+        'desc': "Gira solo cuando nadie lo enciende.",
+        'zonas': ("plataforma", "caseta del organillo", "eje central"),
+        'rasgo': "El organillo seguía tocando sin nadie a la manivela.",
+    },
+    {
+        'nombre': "Laberinto de Maíz Susurrante",
+        'desc': "Pasillos de maíz que cambian de lugar.",
+        'zonas': ("entrada", "claro central", "callejón sin salida"),
+        'rasgo': "Varias cañas estaban dobladas hacia el mismo lado.",
+    },
+]
+
+PLANTILLAS_OBJETOS = [
+    {
+        'nombre': "Lente Fantasmal",
+        'desc': "Cristales espectrales.",
+        'rastro': "ceniza etérea",
+        'rasgo': "Sus cristales proyectan espíritus ilusorios.",
+    },
+    {
+        'nombre': "Guante Cuántico Reversor",
+        'desc': "Pliega metal.",
+        'rastro': "polvo de metal plegado",
+        'rasgo': "Deja micropliegues regulares en todo lo que toca.",
+    },
+    {
+        'nombre': "Flauta de Retumbo Cronal",
+        'desc': "Frecuencia sub-sónica afloja tornillos.",
+        'rastro': "residuo dieléctrico negro",
+        'rasgo': "Su transductor interno vibra incluso apagado.",
+    },
+    {
+        'nombre': "Bolsa Sin Fondo",
+        'desc': "Vacío instantáneo.",
+        'rastro': "algas negras",
+        'rasgo': "Su costura huele a mar.",
+    },
+    {
+        'nombre': "Espada Samurai Maldita",
+        'desc': "Cauteriza cortes.",
+        'rastro': "micro-partículas negras",
+        'rasgo': "Sus cortes quedan lisos y sellados por calor.",
+    },
+    {
+        'nombre': "Reloj de Arena Invertido",
+        'desc': "Arena que cae hacia arriba.",
+        'rastro': "arena que flota",
+        'rasgo': "Nadie sabe cuánto tiempo le queda.",
+    },
+    {
+        'nombre': "Cadena de Eslabones Eco",
+        'desc': "Cada eslabón repite un sonido.",
+        'rastro': "óxido que susurra",
+        'rasgo': "Repite el último crujido que oyó.",
+    },
+    {
+        'nombre': "Farol de Niebla Perpetua",
+        'desc': "Niebla que nunca se disipa.",
+        'rastro': "gotas de niebla cristalizada",
+        'rasgo': "Su cristal nunca termina de enfriarse.",
+    },
+    {
+        'nombre': "Campana de Cera Hechizada",
+        'desc': "Su tañido ablanda cerraduras.",
+        'rastro': "cera azul derretida",
+        'rasgo': "Suena sola cuando alguien miente cerca.",
+    },
+    {
+        'nombre': "Pluma del Cuervo Notario",
+        'desc': "Firma contratos que nadie recuerda.",
+        'rastro': "plumas de cuervo",
+        'rasgo': "Escribe sola si se la deja sobre un papel.",
+    },
+    {
+        'nombre': "Globo de Estática Perpetua",
+        'desc': "Apaga cualquier aparato que roce.",
+        'rastro': "chispas de estática",
+        'rasgo': "Flota a media altura y nunca se desinfla.",
+    },
+    {
+        'nombre': "Tintero del Mapa Invisible",
+        'desc': "Dibuja caminos que sólo se ven de noche.",
+        'rastro': "tinta que brilla",
+        'rasgo': "Su tinta desaparece al amanecer.",
+    },
+]
+
+# Rastros que no deja ningún objeto: ruido en las pistas falsas.
+RASTROS_SUELTOS = ["confeti quemado", "aceite de palomitas", "cera de vela", "azúcar de algodón"]
+RASTROS = [p['rastro'] for p in PLANTILLAS_OBJETOS] + RASTROS_SUELTOS
+
+# Cada semilla se traduce a una solución (personaje, lugar, zona, objeto). PASO es primo
+# y mayor que TOTAL_SOLUCIONES, así que semillas consecutivas dan soluciones distintas
+# y bien repartidas hasta agotar todas.
+TOTAL_SOLUCIONES = (
+    len(PLANTILLAS_PERSONAJES)
+    * sum(len(p['zonas']) for p in PLANTILLAS_LUGARES)
+    * len(PLANTILLAS_OBJETOS)
+)
+PASO = 7919
+
+HUELLAS_PERSONAJE = [
+    "En su ropa había restos de {rastros}.",
+    "Tenía restos de {rastros} en las manos.",
+    "Sus zapatos estaban cubiertos de {rastros}.",
+]
+VISTO_EN = [
+    "Testigos ubicaron a {quien} en {lugares} esa noche.",
+    "{quien} admite que pasó por {lugares}.",
+    "Las cámaras muestran a {quien} en {lugares}.",
+]
+HUELLAS_LUGAR = [
+    "Al revisar el piso aparecieron restos de {rastros}.",
+    "Entre los escombros hallamos {rastros}.",
+    "En la cerradura quedaron restos de {rastros}.",
+]
+RASTRO_OBJETO = [
+    "Donde se usa deja {rastro}.",
+    "Quien lo usa termina cubierto de {rastro}.",
+    "Siempre deja {rastro} a su paso.",
+]
+
+APERTURAS = [
+    "¡Jinkies! Velma pasó la linterna y lo vio claro.",
+    "Shaggy gritó antes de tiempo, pero Fred confirmó la pista.",
+    "Scooby olfateó algo raro y nos llevó directo hasta ahí.",
+    "Daphne anotó cada detalle en su libreta.",
+]
+
+CIERRES = [
+    "¡Caso cerrado!",
+    "¡Otro misterio resuelto!",
+    "Scooby-Doo: “Rooo–rooo!”",
+]
+
+# ============ Generación ============
+
+def _lista(frases):
+    return frases[0] if len(frases) == 1 else f"{', '.join(frases[:-1])} y {frases[-1]}"
+
+def _nombre_corto(nombre):
+    return nombre.split(" — ")[0]
+
+def _nombre_lugar(plantilla, zona):
+    return f"{plantilla['nombre']} ({zona})"
+
+def _solucion(semilla):
+    """Traduce la semilla a (personaje, lugar, zona, objeto); biyectiva módulo TOTAL_SOLUCIONES."""
+    indice = semilla * PASO % TOTAL_SOLUCIONES
+    indice, i_objeto = divmod(indice, len(PLANTILLAS_OBJETOS))
+    i_personaje, i_zona = divmod(indice, sum(len(p['zonas']) for p in PLANTILLAS_LUGARES))
+    for lugar in PLANTILLAS_LUGARES:
+        if i_zona < len(lugar['zonas']):
+            break
+        i_zona -= len(lugar['zonas'])
+    return PLANTILLAS_PERSONAJES[i_personaje], lugar, lugar['zonas'][i_zona], PLANTILLAS_OBJETOS[i_objeto]
+
+def _opciones(rng, plantillas, real):
+    elegidas = rng.sample([p for p in plantillas if p is not real], OPCIONES_POR_CATEGORIA - 1)
+    elegidas.insert(rng.randrange(OPCIONES_POR_CATEGORIA), real)
+    return elegidas
+
+def _señuelos(rng, real, candidatos, incluir, maximo=2):
+    """Entre 1 y `maximo` elementos de `candidatos`; incluye `real` sólo si `incluir`."""
+    elegidos = rng.sample([c for c in candidatos if c != real], rng.randint(1, maximo))
+    if incluir:
+        elegidos[0] = real
+        rng.shuffle(elegidos)
+    return elegidos
+
+def _pistas(rng, personajes, lugares, objetos, real):
+    """
+    Reparte los hechos y arma el texto de cada pista. `real` es (personaje, lugar, objeto)
+    con los nombres de la solución. Cada sospechoso falso comparte con el culpable el
+    rastro (y sólo lo vieron en lugares sin ese rastro) o el lugar (sin el rastro); la
+    mitad de los lugares falsos también tiene el rastro real. Los hechos de un sospechoso
+    se vuelven a sortear (hasta INTENTOS_UNICIDAD veces) si dejan encajar una combinación
+    que no es la solución.
+    """
+    quien, donde, arma = real
+    rastros_caso = [o['rastro'] for o in objetos] + RASTROS_SUELTOS
+    rastros_objetos = {o['rastro'] for o in objetos}
+    rastro_real = next(o['rastro'] for o in objetos if o['nombre'] == arma)
+    nombres_lugares = [nombre for nombre, _ in lugares]
+
+    def con_extra(real, candidatos):
+        elegidos = [real] + rng.sample([c for c in candidatos if c != real], rng.randint(0, 1))
+        rng.shuffle(elegidos)
+        return elegidos
+
+    huellas_lugar = {
+        nombre: con_extra(rastro_real, rastros_caso) if nombre == donde
+        else _señuelos(rng, rastro_real, rastros_caso, rng.random() < 0.5)
+        for nombre in nombres_lugares
+    }
+    sin_rastro_real = [l for l in nombres_lugares if rastro_real not in huellas_lugar[l]]
+
+    def encajes(rastros, vistos):
+        return {(r, l) for l in vistos for r in rastros if r in rastros_objetos and r in huellas_lugar[l]}
+
+    pistas_personajes = {}
+    for p in personajes:
+        esperado = {(rastro_real, donde)} if p['nombre'] == quien else set()
+        for _ in range(INTENTOS_UNICIDAD):
+            if p['nombre'] == quien:
+                rastros, vistos = con_extra(rastro_real, rastros_caso), con_extra(donde, nombres_lugares)
+            elif sin_rastro_real and rng.random() < 0.5:
+                rastros = _señuelos(rng, rastro_real, rastros_caso, True)
+                vistos = rng.sample(sin_rastro_real, rng.randint(1, min(2, len(sin_rastro_real))))
+            else:
+                rastros = _señuelos(rng, rastro_real, rastros_caso, False)
+                vistos = _señuelos(rng, donde, nombres_lugares, True)
+            if encajes(rastros, vistos) == esperado:
+                break
+        pistas_personajes[p['nombre']] = " ".join([
+            p['rasgo'],
+            rng.choice(HUELLAS_PERSONAJE).format(rastros=_lista(rastros)),
+            rng.choice(VISTO_EN).format(quien=_nombre_corto(p['nombre']), lugares=_lista(vistos)),
+        ])
+
+    pistas_lugares = {
+        nombre: f"{plantilla['rasgo']} {rng.choice(HUELLAS_LUGAR).format(rastros=_lista(huellas_lugar[nombre]))}"
+        for nombre, plantilla in lugares
+    }
+    pistas_objetos = {
+        o['nombre']: f"{o['rasgo']} {rng.choice(RASTRO_OBJETO).format(rastro=o['rastro'])}"
+        for o in objetos
+    }
+    return pistas_personajes, pistas_lugares, pistas_objetos
+
+def generar_caso(semilla):
+    """Genera un caso determinista a partir de una semilla entera."""
+    rng = random.Random(semilla)
+    personaje, lugar, zona, objeto = _solucion(semilla)
+    personajes = _opciones(rng, PLANTILLAS_PERSONAJES, personaje)
+    lugares = [
+        (_nombre_lugar(p, zona if p is lugar else rng.choice(p['zonas'])), p)
+        for p in _opciones(rng, PLANTILLAS_LUGARES, lugar)
+    ]
+    objetos = _opciones(rng, PLANTILLAS_OBJETOS, objeto)
+    real = (personaje['nombre'], _nombre_lugar(lugar, zona), objeto['nombre'])
+    pistas_p, pistas_l, pistas_o = _pistas(rng, personajes, lugares, objetos, real)
+
+    quien, donde, arma = real
+    explicacion = (
+        f"{rng.choice(APERTURAS)} Sólo {arma} deja {objeto['rastro']}, y ese rastro estaba a la vez "
+        f"en {donde} y encima de {_nombre_corto(quien)}, que estuvo allí esa noche. "
+        f"{quien} usó {arma} para arrancar el Núcleo Temporal "
+        f"y esconderlo allí mientras todos miraban el espectáculo. {rng.choice(CIERRES)}"
+    )
+    caso_id = ID_BASE_GENERADOS + semilla
+    return {
+        'id': caso_id,
+        'nombre': f"CASO {caso_id}",
+        'culpable': quien,
+        'objeto_real': arma,
+        'lugar_real': donde,
+        'explicacion': explicacion,
+        'personajes': {
+            p['nombre']: {'desc': p['desc'], 'pista': pistas_p[p['nombre']], 'real': p is personaje}
+            for p in personajes
+        },
+        'lugares': {
+            nombre: {'desc': p['desc'], 'pista': pistas_l[nombre], 'real': nombre == donde}
+            for nombre, p in lugares
+        },
+        'objetos': {
+            o['nombre']: {'desc': o['desc'], 'pista': pistas_o[o['nombre']], 'real': o is objeto}
+            for o in objetos
+        },
+    }
+
+def _mencionados(texto, frases):
+    return {f for f in frases if f in texto}
+
+def combinaciones_posibles(caso):
+    """
+    Recorre todas las combinaciones (personaje, objeto, lugar) del caso y devuelve las
+    que encajan con las pistas: el rastro que deja el objeto aparece en la pista del
+    lugar y en la del personaje, y la pista del personaje lo ubica en ese lugar. Los
+    hechos se leen del texto de las pistas, no de las banderas 'real'.
+    """
+    texto = lambda datos: datos.get('pista_detallada') or datos.get('pista', "")
+    personajes = caso.get('personajes', {})
+    lugares = caso.get('lugares', {})
+    rastro_de = {}
+    for nombre, datos in caso.get('objetos', {}).items():
+        rastros = _mencionados(texto(datos), RASTROS)
+        if len(rastros) == 1:   # un objeto sin rastro (o con varios) no puede ser el arma
+            rastro_de[nombre] = rastros.pop()
+    huellas_lugar = {nombre: _mencionados(texto(datos), RASTROS) for nombre, datos in lugares.items()}
+    huellas = {nombre: _mencionados(texto(datos), RASTROS) for nombre, datos in personajes.items()}
+    vistos = {nombre: _mencionados(texto(datos), lugares) for nombre, datos in personajes.items()}
+    return [
+        (p, o, l)
+        for p in personajes
+        for o, rastro in rastro_de.items()
+        for l in lugares
+        if rastro in huellas[p] and rastro in huellas_lugar[l] and l in vistos[p]
+    ]
+
+def validar_solucion_unica(caso):
+    """
+    Además de la validación estructural, comprueba que exactamente una combinación
+    encaje con todas las pistas y que sea la solución del caso.
+    """
+    errores = validar_caso(caso)
+    posibles = combinaciones_posibles(caso)
+    real = (caso.get('culpable'), caso.get('objeto_real'), caso.get('lugar_real'))
+    if len(posibles) != 1:
+        errores.append(f"{len(posibles)} combinaciones encajan con todas las pistas (debe ser 1)")
+    elif posibles[0] != real:
+        errores.append(f"las pistas apuntan a {' / '.join(posibles[0])}, no a la solución del caso")
+    return errores
+
+def _generar_y_validar(semilla):
+    """Trabajo de cada proceso del pool: devuelve (caso, errores)."""
+    caso = generar_caso(semilla)
+    return caso, validar_solucion_unica(caso)
+
+def generar_paquete(ruta, cantidad, inicio=0, procesos=None, chunksize=64):
+    """
+    Genera `cantidad` casos con soluciones distintas en un pool de procesos y los
+    escribe en streaming a `ruta` (JSONL). Las semillas descartadas se reponen con
+    las siguientes; tras TOTAL_SOLUCIONES semillas ya no quedan soluciones nuevas y
+    el paquete puede quedar corto. Devuelve (escritos, descartados).
+    """
+    escritos = descartados = 0
+    soluciones = set()
+    siguiente, fin = inicio, inicio + TOTAL_SOLUCIONES
+    with open(ruta, "w", encoding="utf-8") as salida, Pool(procesos or cpu_count()) as pool:
+        while escritos < cantidad and siguiente < fin:
+            semillas = range(siguiente, min(fin, siguiente + cantidad - escritos))
+            siguiente = semillas.stop
+            for caso, errores in pool.imap_unordered(_generar_y_validar, semillas, chunksize=chunksize):
+                solucion = (caso['culpable'], caso['objeto_real'], caso['lugar_real'])
+                if not errores and solucion in soluciones:
+                    errores = ["solución repetida"]
+                if errores:
+                    descartados += 1
+                    print(f"[DESCARTADO] {caso['nombre']}: {'; '.join(errores)}", file=sys.stderr)
+                    continue
+                soluciones.add(solucion)
+                salida.write(json.dumps(caso, ensure_ascii=False) + "\n")
+                escritos += 1
+    if escritos < cantidad:
+        print(f"⚠️ Sólo hay {TOTAL_SOLUCIONES} soluciones posibles; se escribieron {escritos}.", file=sys.stderr)
+    return escritos, descartados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera paquetes de casos para P4_clue.py")
+    parser.add_argument("--cantidad", type=int, default=1000, help="número de casos a generar")
+    parser.add_argument("--inicio", type=int, default=0, help="primera semilla (para paquetes disjuntos)")
+    parser.add_argument("--salida", type=Path, default=Path("casos_generados.jsonl"))
+    parser.add_argument("--procesos", type=int, default=None, help="procesos del pool (por defecto: núcleos)")
+    args = parser.parse_args(argv)
+
+    escritos, descartados = generar_paquete(args.salida, args.cantidad, args.inicio, args.procesos)
+    print(f"✅ {escritos} casos escritos en {args.salida} ({descartados} descartados)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Instantáneas compactas de partidas de CLUE (guardar / reanudar)
+Descripción:
+ - Una partida es un dict: {'caso_id', 'intentos', 'acusando', 'preguntas'},
+   donde 'preguntas' es la lista de (categoría, ítem) ya consultados.
+ - codificar() la reduce a unos pocos bytes:
+       [versión][caso_id varint][intentos | acusando<<7][pregunta varint]...
+   cada pregunta ocupa 1 byte (ítem*4 + categoría) mientras el ítem sea < 32.
+ - AlmacenPartidas guarda muchas instantáneas en un SQLite (una fila por sesión),
+   con operaciones por lote para que un servidor pueda desalojar sesiones inactivas
+   a disco y rehidratarlas cuando el jugador vuelve.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+VERSION = 1
+INTENTOS_INICIALES = 5
+
+def nueva_partida(caso_id: int) -> Dict:
+    return {'caso_id': caso_id, 'intentos': INTENTOS_INICIALES, 'acusando': False, 'preguntas': []}
+
+# --------------------------
+# Codificación binaria
+# --------------------------
+def _varint(n: int) -> bytes:
+    if n < 0:
+        raise ValueError(f"varint negativo: {n}")
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _leer_varint(datos: bytes, pos: int) -> Tuple[int, int]:
+    n = desplazamiento = 0
+    while True:
+        if pos >= len(datos):
+            raise ValueError("instantánea truncada")
+        byte = datos[pos]
+        pos += 1
+        n |= (byte & 0x7F) << desplazamiento
+        if not byte & 0x80:
+            return n, pos
+        desplazamiento += 7
+
+def codificar(partida: Dict) -> bytes:
+    intentos = partida['intentos']
+    if not 0 <= intentos < 0x80:
+        raise ValueError(f"intentos fuera de rango: {intentos}")
+    out = bytearray([VERSION])
+    out += _varint(partida['caso_id'])
+    out.append(intentos | (0x80 if partida.get('acusando') else 0))
+    for categoria, item in partida['preguntas']:
+        out += _varint(item * 4 + categoria)
+    return bytes(out)
+
+def decodificar(datos: bytes) -> Dict:
+    if not datos or datos[0] != VERSION:
+        raise ValueError("versión de instantánea desconocida")
+    caso_id, pos = _leer_varint(datos, 1)
+    if pos >= len(datos):
+        raise ValueError("instantánea truncada")
+    estado = datos[pos]
+    pos += 1
+    preguntas = []
+    while pos < len(datos):
+        valor, pos = _leer_varint(datos, pos)
+        preguntas.append((valor & 3, valor >> 2))
+    return {
+        'caso_id': caso_id,
+        'intentos': estado & 0x7F,
+        'acusando': bool(estado & 0x80),
+        'preguntas': preguntas,
+    }
+
+# --------------------------
+# Almacén en disco
+# --------------------------
+class AlmacenPartidas:
+    """Instantáneas por id de sesión en un archivo SQLite (se puede usar desde varios hilos)."""
+
+    def __init__(self, ruta: Path):
+        self.ruta = Path(ruta)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(self.ruta), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS partidas ("
+            " sesion TEXT PRIMARY KEY, datos BLOB NOT NULL, actualizado REAL NOT NULL)"
+        )
+        self._con.commit()
+
+    def guardar(self, sesion: str, datos: bytes):
+        self.guardar_lote({sesion: datos})
+
+    def guardar_lote(self, lote: Dict[str, bytes]):
+        """Guarda muchas instantáneas en una sola transacción."""
+        ahora = time.time()
+        with self._lock, self._con:
+            self._con.executemany(
+                "INSERT OR REPLACE INTO partidas (sesion, datos, actualizado) VALUES (?, ?, ?)",
+                [(sesion, datos, ahora) for sesion, datos in lote.items()],
+            )
+
+    def cargar(self, sesion: str) -> Optional[bytes]:
+        with self._lock:
+            fila = self._con.execute("SELECT datos FROM partidas WHERE sesion = ?", (sesion,)).fetchone()
+        return fila[0] if fila else None
+
+    def cargar_lote(self, sesiones: Iterable[str]) -> Dict[str, bytes]:
+        sesiones = list(sesiones)
+        res = {}
+        # SQLite limita los parámetros por consulta: se consulta en bloques
+        for i in range(0, len(sesiones), 500):
+            bloque = sesiones[i:i + 500]
+            marcas = ",".join("?" * len(bloque))
+            with self._lock:
+                filas = self._con.execute(
+                    f"SELECT sesion, datos FROM partidas WHERE sesion IN ({marcas})", bloque
+                ).fetchall()
+            res.update(filas)
+        return res
+
+    def borrar(self, sesion: str):
+        with self._lock, self._con:
+            self._con.execute("DELETE FROM partidas WHERE sesion = ?", (sesion,))
+
+    def sesiones(self) -> List[str]:
+        with self._lock:
+            return [fila[0] for fila in self._con.execute("SELECT sesion FROM partidas")]
+
+    def cerrar(self):
+        with self._lock:
+            self._con.close()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor multi-sesión — CLUE: El Carnaval Tenebroso (asyncio, TCP)
+Descripción:
+ - Protocolo de líneas: el servidor envía texto y un prompt; el cliente responde
+   con una línea (número u opción), igual que en la terminal.
+ - Cada conexión es una sesión independiente con su propio caso al azar.
+ - Los casos se cargan una sola vez y se comparten en sólo lectura entre sesiones.
+ - Cada pantalla se compone en un buffer y se envía junto con su prompt en una
+   sola escritura; después se espera a drain() para respetar el backpressure.
+ - Quien juega con nombre puede desconectarse y volver: su partida se guarda como
+   instantánea compacta (clue_partidas.py) y se rehidrata al reconectar.
+
+Uso:
+    python clue_servidor.py --puerto 4000 [--paquete casos_generados.jsonl]
+    telnet 127.0.0.1 4000        (o: nc 127.0.0.1 4000)
+Prueba de carga: ver clue_carga.py
+"""
+
+import argparse
+import asyncio
+import random
+from pathlib import Path
+
+import P4_clue as clue
+
+TIEMPO_INACTIVO = 300   # segundos sin recibir una línea antes de cerrar la sesión
+LIMITE_LINEA = 1024     # bytes máximos por línea de entrada
+ANCHO_SESION = 78       # ancho de envoltura para clientes remotos
+BACKLOG = 4096          # conexiones pendientes en accept()
+INTERVALO_VOLCADO = 1.0 # segundos entre escrituras por lote de sesiones desalojadas
+LARGO_NOMBRE = 40       # caracteres máximos del nombre de detective
+
+PROMPT_NOMBRE = "Nombre de detective (ENTER = anónimo): "
+
+class SesionTerminada(Exception):
+    """El cliente cerró la conexión, quedó inactivo o envió una línea inválida."""
+
+class Sesion:
+    """Una partida de un cliente TCP; reutiliza las pantallas de P4_clue."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pantalla = clue.Pantalla(ANCHO_SESION)  # buffer de la pantalla en curso
+        self.nombre = ""
+        self.partida = None
+
+    async def escribir(self, texto=""):
+        """Envía la pantalla acumulada (más `texto`) en una sola escritura."""
+        datos = self.pantalla.vaciar() + texto
+        self.writer.write(datos.replace("\n", "\r\n").encode("utf-8"))
+        await self.writer.drain()
+
+    async def leer(self, prompt):
+        await self.escribir(prompt)
+        try:
+            linea = await asyncio.wait_for(self.reader.readline(), TIEMPO_INACTIVO)
+        except asyncio.TimeoutError:
+            if self.nombre:
+                self.writer.write(b"\r\nSesion suspendida por inactividad: vuelve con el mismo nombre.\r\n")
+            raise SesionTerminada("inactiva")
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            raise SesionTerminada(str(e))
+        if not linea:
+            raise SesionTerminada("desconectado")
+        return linea.decode("utf-8", errors="replace").strip()
+
+    async def pedir_opcion(self, prompt, opciones_validas):
+        while True:
+            eleccion = clue.resolver_opcion(await self.leer(prompt), opciones_validas)
+            if eleccion is not None:
+                return eleccion
+            print(clue.MSG_OPCION_INVALIDA, file=self.pantalla)
+
+    async def jugar(self, caso):
+        partida = self.partida
+        indices = clue.indices_del_caso(caso)  # compartidos con otras sesiones del mismo caso
+        cuaderno = clue.Cuaderno(caso, partida)
+        if partida['preguntas']:
+            clue.titulo(caso['nombre'], out=self.pantalla)
+            clue.imprimir_resumen(caso, partida, out=self.pantalla)
+        else:
+            clue.imprimir_inicio(caso, out=self.pantalla)
+
+        while partida['intentos'] > 0 and not partida['acusando']:
+            clue.imprimir_menu_principal(partida['intentos'], out=self.pantalla)
+            eleccion = await self.pedir_opcion(clue.PROMPT_MENU, clue.INDICE_MENU)
+            if eleccion == "Acusar ahora":
+                break
+            if eleccion == "Cuaderno":
+                consulta = await self.leer(clue.PROMPT_CUADERNO)
+                clue.imprimir_busqueda(cuaderno.indice, cuaderno.buscar(consulta), consulta, out=self.pantalla)
+                continue
+
+            nombre_cat, clave = clue.CATEGORIA_POR_MENU[eleccion]
+            clue.imprimir_categoria(nombre_cat, caso[clave], out=self.pantalla)
+            item = await self.pedir_opcion(clue.PROMPT_CATEGORIA, indices[clave])
+            clue.imprimir_pista(item, caso[clave], out=self.pantalla)
+            partida['preguntas'].append(
+                (clue.CLAVES_CATEGORIA.index(clave), indices[clave].opciones.index(item))
+            )
+
+            partida['intentos'] -= 1
+            if partida['intentos'] > 0:
+                await self.leer(clue.PROMPT_ENTER)
+
+        partida['acusando'] = True
+        clue.imprimir_inicio_acusacion(out=self.pantalla)
+        elegidos = []
+        for clave, encabezado, prompt in clue.PASOS_ACUSACION:
+            clue.imprimir_lista(encabezado, indices[clave].opciones, out=self.pantalla)
+            elegidos.append(await self.pedir_opcion(prompt, indices[clave]))
+
+        clue.imprimir_veredicto(caso, clue.es_correcto(caso, *elegidos), out=self.pantalla)
+        await self.escribir()
+
+class ServidorClue:
+    """
+    Acepta conexiones y lanza una Sesion por cada una sobre los casos compartidos.
+    Las sesiones con nombre que se desconectan o quedan inactivas se desalojan como
+    instantáneas (clue_partidas) y se escriben a disco por lotes; al volver con el
+    mismo nombre, la partida se rehidrata.
+    """
+
+    def __init__(self, casos, almacen=None):
+        self.casos = tuple(casos)  # compartidos; las sesiones nunca los modifican
+        self.casos_por_id = {c['id']: c for c in self.casos}
+        self.almacen = almacen
+        self.pendientes = {}       # nombre → instantánea desalojada aún no escrita
+        self.en_juego = set()      # nombres con una conexión activa
+        self.tareas = set()        # tareas de las sesiones abiertas (se cancelan al detener)
+        self.activas = 0
+        self.atendidas = 0
+
+    async def _en_hilo(self, funcion, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, funcion, *args)
+
+    async def rehidratar(self, nombre):
+        datos = self.pendientes.pop(nombre, None)
+        if datos is None and self.almacen is not None:
+            datos = await self._en_hilo(self.almacen.cargar, nombre)
+        if datos is None:
+            return None
+        try:
+            partida = clue.decodificar(datos)
+        except ValueError:
+            return None
+        return partida if partida['caso_id'] in self.casos_por_id else None
+
+    async def volcar_pendientes(self):
+        if self.pendientes and self.almacen is not None:
+            lote, self.pendientes = self.pendientes, {}
+            await self._en_hilo(self.almacen.guardar_lote, lote)
+
+    async def _volcado_periodico(self):
+        while True:
+            await asyncio.sleep(INTERVALO_VOLCADO)
+            await self.volcar_pendientes()
+
+    async def cerrar_sesiones(self):
+        """Cancela las sesiones abiertas y espera a que dejen su instantánea en pendientes."""
+        tareas = list(self.tareas)
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+    async def atender(self, reader, writer):
+        tarea = asyncio.current_task()
+        self.tareas.add(tarea)
+        self.activas += 1
+        self.atendidas += 1
+        sesion = Sesion(reader, writer)
+        terminada = False
+        try:
+            nombre = (await sesion.leer(PROMPT_NOMBRE))[:LARGO_NOMBRE]
+            if nombre and nombre not in self.en_juego:
+                sesion.nombre = nombre
+                self.en_juego.add(nombre)
+                sesion.partida = await self.rehidratar(nombre)
+            if sesion.partida is None:
+                sesion.partida = clue.nueva_partida(random.choice(self.casos)['id'])
+            await sesion.jugar(self.casos_por_id[sesion.partida['caso_id']])
+            terminada = True
+        except (SesionTerminada, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass   # el servidor se detiene (cerrar_sesiones): la partida se guarda abajo
+        finally:
+            self.tareas.discard(tarea)
+            self.activas -= 1
+            if sesion.nombre:
+                self.en_juego.discard(sesion.nombre)
+                if terminada:
+                    self.pendientes.pop(sesion.nombre, None)
+                    if self.almacen is not None:
+                        await self._en_hilo(self.almacen.borrar, sesion.nombre)
+                elif sesion.partida is not None:
+                    self.pendientes[sesion.nombre] = clue.codificar(sesion.partida)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def iniciar(self, host, puerto):
+        servidor = await asyncio.start_server(
+            self.atender, host, puerto, limit=LIMITE_LINEA, backlog=BACKLOG
+        )
+        print(f"🕵️  Servidor CLUE escuchando en {host}:{puerto} ({len(self.casos)} casos)")
+        volcado = asyncio.create_task(self._volcado_periodico())
+        try:
+            await asyncio.get_running_loop().create_future()   # hasta Ctrl-C (cancelación)
+        finally:
+            # orden de cierre: dejar de aceptar, terminar las sesiones (sus finally dejan
+            # las partidas en pendientes) y recién entonces el último volcado
+            volcado.cancel()
+            servidor.close()
+            await self.cerrar_sesiones()
+            await servidor.wait_closed()
+            await self.volcar_pendientes()
+
+def servir(host="127.0.0.1", puerto=4000, paquete=None, ruta_partidas=clue.RUTA_PARTIDAS):
+    casos = clue.cargar_paquete(paquete) if paquete else clue.CASOS
+    almacen = clue.AlmacenPartidas(ruta_partidas)
+    try:
+        asyncio.run(ServidorClue(casos, almacen).iniciar(host, puerto))
+    except KeyboardInterrupt:
+        print("\nServidor detenido.")
+    finally:
+        almacen.cerrar()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor TCP multi-sesión de CLUE")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=4000)
+    parser.add_argument("--paquete", type=Path, help="paquete JSONL de casos generados")
+    args = parser.parse_args(argv)
+    servir(args.host, args.puerto, args.paquete)
+
+if __name__ == "__main__":
+    main()
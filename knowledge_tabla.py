@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generado por P3_akinator.py a partir de knowledge.json. No editar a mano:
+# se vuelve a compilar solo cuando cambia el SHA-256 de la base.
+# NODES[n] = (pregunta o None, hijo si No, hijo si Sí, resultado); 0..31 = patrones de 5 bits.
+
+FORMAT = 2
+SHA256 = 'dbd46200ffbec093297e0da52319d4fb9be17251f425067152038176c3b08910'
+NODES = ((None, -1, -1, ('unico', (27,))),
+ (None, -1, -1, ('unico', (23,))),
+ (None, -1, -1, ('unico', (19,))),
+ (None, -1, -1, ('unico', (5,))),
+ (None, -1, -1, ('unico', (29,))),
+ (None, -1, -1, ('unico', (9,))),
+ (None, -1, -1, ('unico', (24,))),
+ (None, -1, -1, ('unico', (11,))),
+ ('¿El coche tiene un aleron gigante?', 32, 33, ('varios', (18, 32))),
+ ('¿El coche fue diseñado originalmente para competir en Le Mans?', 34, 35, ('varios', (16, 17))),
+ ('¿El coche utiliza un motor rotativo (Wankel)?', 36, 37, ('varios', (21, 22))),
+ (None, -1, -1, ('cercanos', ((1, 0), (1, 5), (1, 16), (1, 17), (1, 21), (1, 22)))),
+ (None, -1, -1, ('unico', (13,))),
+ (None, -1, -1, ('cercanos', ((1, 1), (1, 9), (1, 13), (1, 16), (1, 17), (2, 2)))),
+ (None, -1, -1, ('unico', (20,))),
+ (None, -1, -1, ('cercanos', ((1, 2), (1, 11), (1, 20), (2, 0), (2, 1), (2, 5)))),
+ (None, -1, -1, ('unico', (8,))),
+ (None, -1, -1, ('unico', (7,))),
+ (None, -1, -1, ('unico', (15,))),
+ (None, -1, -1, ('unico', (14,))),
+ (None, -1, -1, ('unico', (26,))),
+ (None, -1, -1, ('unico', (12,))),
+ (None, -1, -1, ('unico', (28,))),
+ (None, -1, -1, ('unico', (6,))),
+ (None, -1, -1, ('unico', (10,))),
+ ('¿El coche tiene un asiento central en el habitáculo?', 38, 39, ('varios', (3, 4))),
+ (None, -1, -1, ('unico', (25,))),
+ (None, -1, -1, ('unico', (0,))),
+ (None, -1, -1, ('unico', (31,))),
+ (None, -1, -1, ('unico', (1,))),
+ (None, -1, -1, ('unico', (30,))),
+ (None, -1, -1, ('unico', (2,))),
+ (None, -1, -1, ('unico', (18,))),
+ (None, -1, -1, ('unico', (32,))),
+ (None, -1, -1, ('unico', (17,))),
+ (None, -1, -1, ('unico', (16,))),
+ (None, -1, -1, ('unico', (21,))),
+ (None, -1, -1, ('unico', (22,))),
+ (None, -1, -1, ('unico', (4,))),
+ (None, -1, -1, ('unico', (3,))))
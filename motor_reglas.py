@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de reglas con encadenamiento hacia adelante (red tipo Rete)
+Compartido por los dos sistemas expertos (P3_akinator y P4_clue).
+
+- Un HECHO es una tupla: ("respuesta", 2, 1), ("acusa", "lugar", "Lago de Botes Chocones").
+- Un PATRÓN es una tupla que puede tener variables ("?x"): ("candidato", "?i").
+- Una REGLA tiene condiciones (patrones) y conclusiones (patrones que se afirman con
+  las variables ligadas cuando todas las condiciones se cumplen).
+
+La red se compila una vez (MotorReglas) y cada partida usa su propia memoria de
+trabajo (MotorReglas.nueva_memoria()), así varias sesiones comparten la red:
+- Red alfa: cada patrón se reduce a su "forma" (posiciones con constantes) y sus
+  valores; un hecho se despacha con un acceso a diccionario por forma, no por regla.
+- Red beta: los nodos de unión se comparten entre reglas con el mismo prefijo de
+  condiciones, así que los emparejamientos parciales se calculan una sola vez.
+- Afirmar un hecho sólo propaga por los nodos alcanzados: el costo es incremental y
+  no depende del número total de reglas.
+Nota: una memoria creada antes de agregar una regla no ve esa regla.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+def es_variable(x) -> bool:
+    return isinstance(x, str) and x.startswith("?")
+
+def _unificar(patron: Tuple, hecho: Tuple, ligaduras: Dict) -> Optional[Dict]:
+    """Extiende `ligaduras` para que `patron` coincida con `hecho`, o None si no es posible."""
+    nuevas = None
+    for p, v in zip(patron, hecho):
+        if not es_variable(p):
+            continue
+        actual = ligaduras.get(p) if nuevas is None else nuevas.get(p)
+        if actual is None:
+            if nuevas is None:
+                nuevas = dict(ligaduras)
+            nuevas[p] = v
+        elif actual != v:
+            return None
+    return ligaduras if nuevas is None else nuevas
+
+def instanciar(patron: Tuple, ligaduras: Dict) -> Tuple:
+    return tuple(ligaduras[p] if es_variable(p) else p for p in patron)
+
+class Regla:
+    __slots__ = ("nombre", "condiciones", "conclusiones")
+
+    def __init__(self, nombre: str, condiciones: Sequence[Tuple], conclusiones: Sequence[Tuple]):
+        self.nombre = nombre
+        self.condiciones = tuple(condiciones)
+        self.conclusiones = tuple(conclusiones)
+
+    def __repr__(self):
+        return f"Regla({self.nombre!r})"
+
+class _NodoAlfa:
+    __slots__ = ("id", "sucesores")
+
+    def __init__(self, id_: int):
+        self.id = id_
+        self.sucesores: List["_NodoUnion"] = []   # ordenados de más profundo a menos
+
+class _NodoUnion:
+    __slots__ = ("id", "padre", "alfa", "patron", "profundidad", "hijos", "reglas")
+
+    def __init__(self, id_: int, padre, alfa, patron, profundidad: int):
+        self.id = id_
+        self.padre = padre
+        self.alfa = alfa
+        self.patron = patron
+        self.profundidad = profundidad
+        self.hijos: List["_NodoUnion"] = []
+        self.reglas: List[Regla] = []
+
+def _forma(patron: Tuple) -> Tuple[Tuple[int, ...], Tuple]:
+    posiciones = tuple(i for i, p in enumerate(patron) if not es_variable(p))
+    return posiciones, tuple(patron[i] for i in posiciones)
+
+class MotorReglas:
+    """Red Rete compilada a partir de las reglas; inmutable mientras se juega."""
+
+    def __init__(self):
+        self.reglas: List[Regla] = []
+        self._formas: Dict[int, List[Tuple[int, ...]]] = {}   # largo → formas registradas
+        self._alfas: Dict[Tuple, _NodoAlfa] = {}              # (largo, forma, valores) → nodo
+        self._uniones: Dict[Tuple, _NodoUnion] = {}           # (id padre, patrón) → nodo
+        self._contador = 0
+        self.raiz = _NodoUnion(self._nuevo_id(), None, None, None, 0)
+
+    def _nuevo_id(self) -> int:
+        self._contador += 1
+        return self._contador
+
+    def _alfa_para(self, patron: Tuple) -> _NodoAlfa:
+        largo = len(patron)
+        forma, valores = _forma(patron)
+        clave = (largo, forma, valores)
+        alfa = self._alfas.get(clave)
+        if alfa is None:
+            alfa = self._alfas[clave] = _NodoAlfa(self._nuevo_id())
+            formas = self._formas.setdefault(largo, [])
+            if forma not in formas:
+                formas.append(forma)
+        return alfa
+
+    def agregar_regla(self, nombre: str, condiciones: Sequence[Tuple], conclusiones: Sequence[Tuple]) -> Regla:
+        if not condiciones:
+            raise ValueError(f"La regla {nombre!r} no tiene condiciones")
+        regla = Regla(nombre, condiciones, conclusiones)
+        nodo = self.raiz
+        for patron in regla.condiciones:
+            clave = (nodo.id, patron)
+            hijo = self._uniones.get(clave)
+            if hijo is None:
+                alfa = self._alfa_para(patron)
+                hijo = _NodoUnion(self._nuevo_id(), nodo, alfa, patron, nodo.profundidad + 1)
+                self._uniones[clave] = hijo
+                nodo.hijos.append(hijo)
+                # de más profundo a menos: evita activar dos veces el mismo hecho
+                # cuando aparece en dos condiciones de una regla
+                alfa.sucesores.append(hijo)
+                alfa.sucesores.sort(key=lambda n: -n.profundidad)
+            nodo = hijo
+        nodo.reglas.append(regla)
+        self.reglas.append(regla)
+        return regla
+
+    def alfas_de(self, hecho: Tuple) -> Iterable[_NodoAlfa]:
+        largo = len(hecho)
+        for forma in self._formas.get(largo, ()):
+            alfa = self._alfas.get((largo, forma, tuple(hecho[i] for i in forma)))
+            if alfa is not None:
+                yield alfa
+
+    def nueva_memoria(self) -> "MemoriaTrabajo":
+        return MemoriaTrabajo(self)
+
+    @property
+    def nodos_union(self) -> int:
+        return len(self._uniones)
+
+class MemoriaTrabajo:
+    """Hechos y emparejamientos parciales de una partida sobre un MotorReglas."""
+
+    def __init__(self, motor: MotorReglas):
+        self.motor = motor
+        self.hechos = set()
+        self._alfa: Dict[int, List[Tuple]] = {}
+        self._beta: Dict[int, List[Dict]] = {motor.raiz.id: [{}]}
+        self.agenda = deque()
+        self.disparadas: List[Tuple[Regla, Dict]] = []
+
+    def afirmar(self, hecho: Tuple) -> bool:
+        """Agrega un hecho y propaga sólo por los nodos que lo aceptan. False si ya existía."""
+        hecho = tuple(hecho)
+        if hecho in self.hechos:
+            return False
+        self.hechos.add(hecho)
+        for alfa in self.motor.alfas_de(hecho):
+            self._alfa.setdefault(alfa.id, []).append(hecho)
+            for nodo in alfa.sucesores:
+                for token in self._beta.get(nodo.padre.id, ()):
+                    ligaduras = _unificar(nodo.patron, hecho, token)
+                    if ligaduras is not None:
+                        self._activar(nodo, ligaduras)
+        return True
+
+    def _activar(self, nodo: _NodoUnion, token: Dict):
+        self._beta.setdefault(nodo.id, []).append(token)
+        for regla in nodo.reglas:
+            self.agenda.append((regla, token))
+        for hijo in nodo.hijos:
+            for hecho in self._alfa.get(hijo.alfa.id, ()):
+                ligaduras = _unificar(hijo.patron, hecho, token)
+                if ligaduras is not None:
+                    self._activar(hijo, ligaduras)
+
+    def ejecutar(self, limite: int = 100000) -> int:
+        """Dispara las reglas activadas hasta que no queden (o hasta `limite`). Devuelve cuántas."""
+        disparos = 0
+        while self.agenda and disparos < limite:
+            regla, ligaduras = self.agenda.popleft()
+            self.disparadas.append((regla, ligaduras))
+            for conclusion in regla.conclusiones:
+                self.afirmar(instanciar(conclusion, ligaduras))
+            disparos += 1
+        return disparos
+
+    def consultar(self, patron: Tuple) -> List[Dict]:
+        """Ligaduras de todos los hechos que coinciden con `patron`, en orden de llegada."""
+        patron = tuple(patron)
+        forma, valores = _forma(patron)
+        alfa = self.motor._alfas.get((len(patron), forma, valores))
+        if alfa is not None:
+            candidatos = self._alfa.get(alfa.id, ())
+        else:
+            candidatos = [h for h in self.hechos if len(h) == len(patron)]
+        res = []
+        for hecho in candidatos:
+            if all(es_variable(p) or p == v for p, v in zip(patron, hecho)):
+                ligaduras = _unificar(patron, hecho, {})
+                if ligaduras is not None:
+                    res.append(ligaduras)
+        return res